@@ -0,0 +1,50 @@
+"""
+Shared query parameters for the analysis endpoints.
+
+/analyze and /report accept the same project parameters and manual overrides,
+so both resolve to the same cached analysis for a given project.
+"""
+from fastapi import Query
+from typing import Optional
+from app.schemas.models import ProjectParams, ManualOverrides, ApplicationType, PropertyType
+
+
+def project_params(
+    application_type: ApplicationType = Query(ApplicationType.extension, description="Type of planning application"),
+    property_type: PropertyType = Query(PropertyType.semi_detached, description="Type of property"),
+    num_storeys: int = Query(1, ge=1, le=5, description="Number of storeys (1-5)"),
+    estimated_floor_area_m2: float = Query(30.0, ge=1, le=10000, description="Estimated floor area in m²"),
+) -> ProjectParams:
+    return ProjectParams(
+        application_type=application_type,
+        property_type=property_type,
+        num_storeys=num_storeys,
+        estimated_floor_area_m2=estimated_floor_area_m2,
+    )
+
+
+def manual_overrides(
+    # When provided, the manual value is used instead of the DB-fetched value.
+    manual_flood_zone: Optional[int] = Query(None, ge=1, le=3, description="Override flood zone (1-3)"),
+    manual_conservation: Optional[bool] = Query(None, description="Override conservation area flag"),
+    manual_greenbelt: Optional[bool] = Query(None, description="Override greenbelt flag"),
+    manual_article4: Optional[bool] = Query(None, description="Override Article 4 zone flag"),
+    manual_approval_rate: Optional[float] = Query(None, ge=0, le=1, description="Override local approval rate (0-1)"),
+    manual_decision_days: Optional[float] = Query(None, ge=0, description="Override avg decision time (days)"),
+    manual_nearby_apps: Optional[int] = Query(None, ge=0, description="Override similar applications nearby count"),
+    manual_price_m2: Optional[float] = Query(None, ge=0, description="Override avg price per m²"),
+    manual_price_trend: Optional[float] = Query(None, ge=-1, le=10, description="Override 24-month price trend"),
+    manual_epc: Optional[str] = Query(None, pattern="^[A-Ga-g]$", description="Override avg EPC rating (A-G)"),
+) -> ManualOverrides:
+    return ManualOverrides(
+        flood_zone=manual_flood_zone,
+        in_conservation_area=manual_conservation,
+        in_greenbelt=manual_greenbelt,
+        in_article4_zone=manual_article4,
+        local_approval_rate=manual_approval_rate,
+        avg_decision_time_days=manual_decision_days,
+        similar_applications_nearby=manual_nearby_apps,
+        avg_price_per_m2=manual_price_m2,
+        price_trend_24m=manual_price_trend,
+        avg_epc_rating=manual_epc.upper() if manual_epc is not None else None,
+    )
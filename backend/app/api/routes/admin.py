@@ -0,0 +1,43 @@
+import logging
+from fastapi import APIRouter, Depends, HTTPException, Query
+from app.middleware.auth import verify_admin_token
+from app.services import model_registry
+from app.schemas.models import ModelReloadResponse, StatsResponse
+from app import cache, http_clients, resilience, singleflight
+
+log = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+@router.get("/admin/stats", response_model=StatsResponse)
+async def stats(_admin: None = Depends(verify_admin_token)):
+    """Cache, single-flight, HTTP pool and circuit breaker counters for this worker."""
+    return StatsResponse(
+        cache=cache.stats(),
+        singleflight=singleflight.stats(),
+        http_pools=http_clients.stats(),
+        circuit_breakers=resilience.stats(),
+    )
+
+
+@router.post("/admin/model/reload", response_model=ModelReloadResponse)
+async def reload_model(
+    force: bool = Query(False, description="Reload even if the current version is already active"),
+    _admin: None = Depends(verify_admin_token),
+):
+    """
+    Swap in the registry's current model version without a restart. Only the
+    worker serving this request reloads now; the others pick the version up
+    on their next registry poll (ML_WATCH_INTERVAL_SECONDS).
+    """
+    try:
+        previous, version = await model_registry.reload_model(force=force)
+    except Exception as e:
+        log.warning("Approval model reload failed: %s", e)
+        raise HTTPException(status_code=500, detail=f"Model reload failed; still serving the previous model: {e}")
+    return ModelReloadResponse(
+        reloaded=force or version != previous,
+        model_version=version,
+        previous_version=previous,
+    )
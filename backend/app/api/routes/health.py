@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 from app.db.database import get_pool
-from app.services.ml import is_model_loaded
+from app.services.model_registry import model_version
 from app.schemas.models import HealthResponse
 
 router = APIRouter()
@@ -18,6 +18,7 @@ async def health():
 
     return HealthResponse(
         status="ok" if db_connected else "degraded",
-        model_loaded=is_model_loaded(),
+        model_loaded=model_version() is not None,
+        model_version=model_version(),
         db_connected=db_connected,
     )
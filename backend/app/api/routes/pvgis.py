@@ -1,17 +1,33 @@
 from fastapi import APIRouter, Query, HTTPException
 import httpx
+from app.cache import pvgis_tiles
+from app.http_clients import get_client
+from app.singleflight import SingleFlight
 
 router = APIRouter()
 
+_flight = SingleFlight("pvgis")
+
 
 @router.get('/pvgis')
 async def proxy_pvgis(lat: float = Query(...), lon: float = Query(...), peakpower: int = Query(4), loss: int = Query(14)):
-    url = f"https://re.jrc.ec.europa.eu/api/v5_2/PVcalc?lat={lat}&lon={lon}&peakpower={peakpower}&loss={loss}&outputformat=json"
+    # Nearby plots share one PVGIS call: the request is made for the centre of
+    # the geohash cell and cached per cell + system parameters.
+    cell = pvgis_tiles.cell(lat, lon, peakpower=peakpower, loss=loss)
+    cached = pvgis_tiles.get(cell)
+    if cached is not None:
+        return cached
+    data = await _flight.do(cell.key, lambda: _fetch_pvgis(cell.lat, cell.lon, peakpower, loss))
+    pvgis_tiles.set(cell, data)
+    return data
+
+
+async def _fetch_pvgis(lat: float, lon: float, peakpower: int, loss: int) -> dict:
+    params = {"lat": lat, "lon": lon, "peakpower": peakpower, "loss": loss, "outputformat": "json"}
     try:
-        async with httpx.AsyncClient(timeout=10.0) as client:
-            resp = await client.get(url)
-            if resp.status_code != 200:
-                raise HTTPException(status_code=502, detail='PVGIS upstream error')
-            return resp.json()
+        resp = await get_client("pvgis").get("/api/v5_2/PVcalc", params=params)
+        if resp.status_code != 200:
+            raise HTTPException(status_code=502, detail='PVGIS upstream error')
+        return resp.json()
     except httpx.RequestError:
         raise HTTPException(status_code=502, detail='PVGIS request failed')
@@ -0,0 +1,155 @@
+"""
+Cache for the analysis pipeline, split into two tiers:
+
+  - location tier: LocationProfile per postcode (geocode, constraints,
+    planning, market and schools data) — the expensive part of /analyze
+  - analysis tier: AnalyzeResponse per postcode + project params + overrides
+    (and model version), so /report reuses the result for the project the
+    user actually analysed
+
+Each tier sits on a pluggable backend (see backends.py): a bounded
+per-process LRU by default, or a SQLite WAL file shared by all workers so a
+/report routed to another worker still hits.
+
+Location entries follow a soft/hard TTL: younger than the soft TTL they are
+fresh; between soft and hard they are returned marked stale so the caller
+can refresh them in the background; past the hard TTL they are gone. A profile with degraded sections is kept
+in its own short-lived tier (cache_degraded_ttl_seconds) and served as
+fresh until it expires; it never replaces a complete profile, which is
+served in its place while that one is still within its hard TTL.
+Analysis entries are derived from a location entry and cheap to rebuild, so
+they simply expire at the soft TTL. A background sweeper drops expired
+entries that are never read again so one-off postcodes don't stay resident.
+
+Upstream responses for Overpass and PVGIS are cached separately per
+geohash cell (see tiles.py), with their own TTL and limits.
+"""
+import asyncio
+import logging
+import time
+
+from app.cache.backends import CacheBackend, MemoryBackend, SqliteBackend
+from app.cache.tiles import TileCache, TilePayload
+from app.config import settings
+from app.schemas.models import AnalyzeResponse, LocationProfile, ProjectParams, ManualOverrides
+from app.services.model_registry import model_version
+
+log = logging.getLogger(__name__)
+
+
+def _make_backend(
+    namespace: str,
+    model: type,
+    ttl_seconds: int,
+    kind: str = settings.cache_backend,
+    sqlite_path: str = settings.cache_sqlite_path,
+    max_entries: int = settings.cache_max_entries,
+    max_bytes: int = settings.cache_max_bytes,
+) -> CacheBackend:
+    if kind == "sqlite":
+        return SqliteBackend(sqlite_path, namespace, model, ttl_seconds, max_entries)
+    if kind == "memory":
+        return MemoryBackend(ttl_seconds, max_entries, max_bytes)
+    raise ValueError(f"Unknown cache backend: {kind!r}")
+
+
+def _make_tile_cache(namespace: str, precision: int) -> TileCache:
+    backend = _make_backend(
+        namespace, TilePayload, settings.tile_cache_ttl_seconds,
+        kind=settings.tile_cache_backend,
+        sqlite_path=settings.tile_cache_sqlite_path,
+        max_entries=settings.tile_cache_max_entries,
+        max_bytes=settings.tile_cache_max_bytes,
+    )
+    return TileCache(namespace, precision, backend)
+
+
+_locations = _make_backend("location", LocationProfile, settings.cache_hard_ttl_seconds)
+_degraded_locations = _make_backend("location_degraded", LocationProfile, settings.cache_degraded_ttl_seconds)
+_analyses = _make_backend("analysis", AnalyzeResponse, settings.cache_soft_ttl_seconds)
+
+# Geohash 7 cells are ~150 x 95 m in England. PVGIS solar data has a
+# resolution of several km, so its coarser geohash 6 cells (~1.2 x 0.6 km) lose nothing.
+overpass_tiles = _make_tile_cache("overpass", precision=7)
+pvgis_tiles = _make_tile_cache("pvgis", precision=6)
+_sweeper: asyncio.Task | None = None
+
+
+def set_location(postcode: str, data: LocationProfile) -> None:
+    if data.degraded_sections:
+        _degraded_locations.set(postcode_key(postcode), data)
+    else:
+        _locations.set(postcode_key(postcode), data)
+
+
+def get_location(postcode: str) -> tuple[LocationProfile, bool] | None:
+    """Return (profile, is_stale), or None once the entry is past its hard TTL."""
+    key = postcode_key(postcode)
+    # A recent degraded fetch means a refresh was just tried; don't retry it until that expires
+    retried = _degraded_locations.get(key)
+    entry = _locations.get(key)
+    if entry is None:
+        return (retried[0], False) if retried is not None else None
+    data, stored_at = entry
+    return data, retried is None and time.time() - stored_at > settings.cache_soft_ttl_seconds
+
+
+def set_analysis(key: str, data: AnalyzeResponse) -> None:
+    _analyses.set(key, data)
+
+
+def get_analysis(key: str) -> AnalyzeResponse | None:
+    entry = _analyses.get(key)
+    return entry[0] if entry is not None else None
+
+
+def analysis_key(postcode: str, project: ProjectParams, overrides: ManualOverrides) -> str:
+    """Key an analysis by postcode plus every input that changes its scoring, including the model."""
+    return "|".join([
+        # A model reload makes earlier scores stale, also in a shared SQLite cache
+        model_version() or "rules",
+        postcode_key(postcode),
+        project.model_dump_json(),
+        overrides.model_dump_json(exclude_none=True),
+    ])
+
+
+def stats() -> dict[str, dict[str, int]]:
+    return {
+        "location": _locations.stats(),
+        "location_degraded": _degraded_locations.stats(),
+        "analysis": _analyses.stats(),
+        "overpass_tiles": overpass_tiles.backend.stats(),
+        "pvgis_tiles": pvgis_tiles.backend.stats(),
+    }
+
+
+def start_sweeper() -> None:
+    global _sweeper
+    if _sweeper is None:
+        _sweeper = asyncio.create_task(_sweep_loop())
+
+
+async def stop_sweeper() -> None:
+    global _sweeper
+    if _sweeper is not None:
+        _sweeper.cancel()
+        try:
+            await _sweeper
+        except asyncio.CancelledError:
+            pass
+        _sweeper = None
+
+
+async def _sweep_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.cache_sweep_interval_seconds)
+        # SQLite deletes touch disk, so keep them off the event loop
+        backends = [_locations, _degraded_locations, _analyses, overpass_tiles.backend, pvgis_tiles.backend]
+        removed = await asyncio.to_thread(lambda: sum(b.sweep() for b in backends))
+        if removed:
+            log.debug("Cache sweep removed %d expired entries", removed)
+
+
+def postcode_key(postcode: str) -> str:
+    return postcode.replace(" ", "").upper()
@@ -0,0 +1,195 @@
+"""
+Storage backends for the analysis cache.
+
+  - MemoryBackend: per-process LRU holding model objects directly
+  - SqliteBackend: SQLite file in WAL mode, shared by every worker on the host.
+                   Values are stored as zlib-compressed JSON.
+
+Both are bounded by entry count, drop expired entries on sweep(), and keep
+per-process hit/miss counters. get() returns the value with the time it was
+stored so callers can apply their own freshness rules inside the TTL.
+Timestamps are wall-clock so entries written by one worker age correctly
+when read by another.
+"""
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from pydantic import BaseModel
+
+
+class CacheBackend(ABC):
+    """Key → model store with a per-entry TTL."""
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @abstractmethod
+    def get(self, key: str) -> tuple[BaseModel, float] | None:
+        """Return (value, stored_at) for an unexpired entry."""
+
+    @abstractmethod
+    def set(self, key: str, data: BaseModel) -> None:
+        ...
+
+    @abstractmethod
+    def sweep(self) -> int:
+        """Drop every expired entry. Returns the number removed."""
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+
+class MemoryBackend(CacheBackend):
+    """
+    LRU cache with a per-entry TTL, a maximum entry count and a byte budget.
+
+    Entry size is approximated by the length of the model's JSON
+    serialisation, measured once on insert.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int, max_bytes: int):
+        super().__init__(ttl_seconds, max_entries)
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[str, tuple[BaseModel, float, int]] = OrderedDict()
+        self._bytes = 0
+
+    def get(self, key: str) -> tuple[BaseModel, float] | None:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        data, ts, _ = entry
+        if time.time() - ts > self.ttl_seconds:
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return data, ts
+
+    def set(self, key: str, data: BaseModel) -> None:
+        size = len(data.model_dump_json())
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (data, time.time(), size)
+        self._bytes += size
+        # Evict least recently used until both limits hold (always keep the new entry)
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self._bytes > self.max_bytes
+        ):
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+    def sweep(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        expired = [k for k, (_, ts, _) in self._entries.items() if ts < cutoff]
+        for key in expired:
+            self._remove(key)
+        self.expirations += len(expired)
+        return len(expired)
+
+    def stats(self) -> dict[str, int]:
+        return {"entries": len(self._entries), "bytes": self._bytes, **super().stats()}
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._bytes -= size
+
+
+class SqliteBackend(CacheBackend):
+    """
+    Cross-process cache in a local SQLite file.
+
+    WAL mode lets every worker read concurrently while one writes, and a hit
+    is a primary-key lookup plus decompress + parse — tens of microseconds
+    for an AnalyzeResponse. Tiers share the file, separated by namespace.
+    Size is bounded by entry count only; the oldest entries are trimmed on sweep().
+    """
+
+    def __init__(self, path: str, namespace: str, model: type[BaseModel], ttl_seconds: float, max_entries: int):
+        super().__init__(ttl_seconds, max_entries)
+        self.namespace = namespace
+        self.model = model
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key       TEXT NOT NULL,
+                value     BLOB NOT NULL,
+                stored_at REAL NOT NULL,
+                PRIMARY KEY (namespace, key)
+            ) WITHOUT ROWID
+        """)
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS cache_entries_stored_at_idx ON cache_entries (namespace, stored_at)"
+        )
+
+    def get(self, key: str) -> tuple[BaseModel, float] | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, stored_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return self.model.model_validate_json(zlib.decompress(row[0])), row[1]
+
+    def set(self, key: str, data: BaseModel) -> None:
+        value = zlib.compress(data.model_dump_json().encode(), 1)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, stored_at) VALUES (?, ?, ?, ?)",
+                (self.namespace, key, value, time.time()),
+            )
+
+    def sweep(self) -> int:
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = self._conn.execute(
+                "DELETE FROM cache_entries WHERE namespace = ? AND stored_at < ?",
+                (self.namespace, cutoff),
+            ).rowcount
+            evicted = self._conn.execute("""
+                DELETE FROM cache_entries
+                WHERE namespace = ? AND key IN (
+                    SELECT key FROM cache_entries WHERE namespace = ?
+                    ORDER BY stored_at DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.namespace, self.namespace, self.max_entries)).rowcount
+        self.expirations += expired
+        self.evictions += evicted
+        return expired
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            entries, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(value)), 0) FROM cache_entries WHERE namespace = ?",
+                (self.namespace,),
+            ).fetchone()
+        return {"entries": entries, "bytes": size, **super().stats()}
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,87 @@
+"""
+Response cache for spatial upstream queries, keyed by a geohash cell.
+
+Neighbouring postcodes send near-identical Overpass and PVGIS requests.
+Quantising the query point to a geohash cell (plus any query parameters)
+lets every caller inside a cell share one upstream fetch. The upstream is
+queried at the cell centre, so callers that need exact per-point values
+(e.g. school distances) pad the query and recompute from the cached elements.
+"""
+import math
+from typing import Any
+from pydantic import BaseModel
+
+from app.cache.backends import CacheBackend
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+# Approximate metres per degree of latitude
+_M_PER_DEG = 111_320
+
+
+class TilePayload(BaseModel):
+    """Wrapper so arbitrary JSON responses can sit on the model-based cache backends."""
+    data: Any
+
+
+def geohash_cell(lat: float, lon: float, precision: int) -> tuple[str, float, float, float, float]:
+    """Return (geohash, centre_lat, centre_lon, half_height_deg, half_width_deg) for the cell containing a point."""
+    lat_lo, lat_hi, lon_lo, lon_hi = -90.0, 90.0, -180.0, 180.0
+    chars, bits, ch, even = [], 0, 0, True
+    while len(chars) < precision:
+        if even:
+            mid = (lon_lo + lon_hi) / 2
+            if lon >= mid:
+                ch, lon_lo = (ch << 1) | 1, mid
+            else:
+                ch, lon_hi = ch << 1, mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                ch, lat_lo = (ch << 1) | 1, mid
+            else:
+                ch, lat_hi = ch << 1, mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[ch])
+            bits, ch = 0, 0
+    return (
+        "".join(chars),
+        (lat_lo + lat_hi) / 2,
+        (lon_lo + lon_hi) / 2,
+        (lat_hi - lat_lo) / 2,
+        (lon_hi - lon_lo) / 2,
+    )
+
+
+class TileCell:
+    def __init__(self, key: str, lat: float, lon: float, half_diagonal_m: float):
+        self.key = key
+        self.lat = lat
+        self.lon = lon
+        self.half_diagonal_m = half_diagonal_m
+
+
+class TileCache:
+    """Cache of upstream responses per (geohash cell, query params)."""
+
+    def __init__(self, namespace: str, precision: int, backend: CacheBackend):
+        self.namespace = namespace
+        self.precision = precision
+        self.backend = backend
+
+    def cell(self, lat: float, lon: float, **params) -> TileCell:
+        gh, c_lat, c_lon, half_lat, half_lon = geohash_cell(lat, lon, self.precision)
+        key = ":".join([gh, *(f"{k}={v}" for k, v in sorted(params.items()))])
+        # Longitude degrees shrink with latitude; a flat approximation is plenty at cell scale
+        half_h = half_lat * _M_PER_DEG
+        half_w = half_lon * _M_PER_DEG * math.cos(math.radians(c_lat))
+        return TileCell(key, c_lat, c_lon, math.hypot(half_h, half_w))
+
+    def get(self, cell: TileCell) -> Any | None:
+        entry = self.backend.get(cell.key)
+        return entry[0].data if entry is not None else None
+
+    def set(self, cell: TileCell, data: Any) -> None:
+        self.backend.set(cell.key, TilePayload(data=data))
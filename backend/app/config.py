@@ -12,6 +12,77 @@ class Settings(BaseSettings):
     ibex_base_url: str = "https://ibex.seractech.co.uk"
     frontend_url: str = "http://localhost:3000"
 
+    # Local ONSPD lookup built by scripts/build_postcode_index.py (optional)
+    postcode_index_path: str = "data/postcodes/postcodes.idx"
+
+    # Query Overpass for schools when the GIAS schools table hasn't been loaded
+    schools_overpass_fallback: bool = True
+
+    # Analysis cache (limits apply to each tier separately).
+    # "memory" is per worker; "sqlite" shares entries between workers via a WAL file.
+    cache_backend: str = "memory"
+    cache_sqlite_path: str = "data/cache/analysis.sqlite3"
+    # Location data older than the soft TTL is served while a background task
+    # refreshes it; only entries past the hard TTL make a request wait.
+    cache_soft_ttl_seconds: int = 300
+    cache_hard_ttl_seconds: int = 24 * 60 * 60
+    # A profile with degraded sections is kept only briefly, so a slow
+    # component is not re-fetched on every request but recovers quickly.
+    cache_degraded_ttl_seconds: int = 60
+    cache_max_entries: int = 5000
+    cache_max_bytes: int = 64 * 1024 * 1024
+    cache_sweep_interval_seconds: int = 60
+
+    # Overpass / PVGIS responses cached per geohash cell. Set the backend to
+    # "sqlite" to persist them on disk across restarts.
+    tile_cache_backend: str = "memory"
+    tile_cache_sqlite_path: str = "data/cache/tiles.sqlite3"
+    tile_cache_ttl_seconds: int = 7 * 24 * 60 * 60
+    tile_cache_max_entries: int = 20000
+    tile_cache_max_bytes: int = 128 * 1024 * 1024
+
+    # Answer constraint lookups from in-memory STRtrees (needs shapely) instead
+    # of PostGIS. Loaded from the snapshot written by
+    # scripts/build_constraint_snapshot.py if present, else from the database.
+    constraint_engine: bool = False
+    constraint_snapshot_path: str = "data/constraints/constraints.snap"
+
+    # Memory-mapped price_paid column store written by
+    # scripts/export_price_store.py (optional; market metrics use SQL without it)
+    price_store_path: str = "data/price_paid/price_paid.store"
+
+    # Serve the planning metrics from an in-process column store of
+    # planning_applications, rebuilt from the database on this interval.
+    planning_store: bool = False
+    planning_store_refresh_seconds: int = 60 * 60
+
+    # Profiles from the nightly feature store (scripts/build_feature_store.py)
+    # older than this are ignored in favour of the live pipeline.
+    feature_store_max_age_hours: int = 36
+
+    # Approval model inference: "sklearn" (planning_model.pkl), "booster"
+    # (native XGBoost on planning_model.json/.ubj), "numpy" (pure-NumPy trees
+    # from planning_model.json) or "auto" to pick the fastest available.
+    ml_backend: str = "auto"
+    # Poll ml/registry for a new current version this often (0 disables);
+    # POST /api/v1/admin/model/reload triggers a reload immediately.
+    ml_watch_interval_seconds: int = 30
+    # Token for the X-Admin-Token header on /admin endpoints (unset disables them)
+    admin_token: str = ""
+
+    # Latency budget for fetching a location on /analyze. Components that
+    # miss it (or whose circuit breaker is open) are returned degraded.
+    analyze_budget_seconds: float = 1.5
+    # Every component still gets at least this long, even if geocoding used
+    # most of the budget, so a request can overrun the budget by up to this.
+    analyze_component_min_seconds: float = 0.3
+    # Per-component circuit breakers: open once the failure rate over the last
+    # `window` calls reaches `failure_rate`, then probe again after `open_seconds`.
+    breaker_window: int = 20
+    breaker_failure_rate: float = 0.5
+    breaker_min_calls: int = 5
+    breaker_open_seconds: float = 30.0
+
     class Config:
         env_file = ".env"
 
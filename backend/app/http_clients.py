@@ -0,0 +1,108 @@
+"""
+Shared, pooled HTTP clients — one per upstream API.
+
+Creating an httpx.AsyncClient per call means a fresh TCP + TLS handshake to
+every upstream on every request. Clients are instead created once in the
+app lifespan and reused, each with its own connection limits, keep-alive
+and timeout. HTTP/2 (httpx[http2]) is enabled where the upstream supports
+it, so concurrent requests to one host share a connection.
+"""
+import httpx
+
+UPSTREAMS: dict[str, dict] = {
+    "postcodes": {
+        "base_url": "https://api.postcodes.io",
+        "timeout": 10.0,
+        "max_connections": 20,
+        "http2": True,
+    },
+    "epc": {
+        "base_url": "https://epc.opendatacommunities.org",
+        "timeout": 10.0,
+        "max_connections": 10,
+        "http2": True,
+    },
+    "overpass": {
+        "base_url": "https://overpass-api.de",
+        "timeout": 14.0,
+        "max_connections": 4,   # Overpass rate-limits per IP; keep the pool small
+        "http2": False,
+    },
+    "pvgis": {
+        "base_url": "https://re.jrc.ec.europa.eu",
+        "timeout": 10.0,
+        "max_connections": 10,
+        "http2": False,
+    },
+}
+
+KEEPALIVE_EXPIRY_SECONDS = 30.0
+
+_clients: dict[str, httpx.AsyncClient] = {}
+_transports: dict[str, httpx.AsyncHTTPTransport] = {}
+_requests: dict[str, int] = {name: 0 for name in UPSTREAMS}
+
+
+def _make_client(name: str) -> httpx.AsyncClient:
+    cfg = UPSTREAMS[name]
+    limits = httpx.Limits(
+        max_connections=cfg["max_connections"],
+        max_keepalive_connections=cfg["max_connections"],
+        keepalive_expiry=KEEPALIVE_EXPIRY_SECONDS,
+    )
+    transport = httpx.AsyncHTTPTransport(
+        limits=limits,
+        http2=cfg["http2"],
+        retries=1,   # retry once on connection failures (not on HTTP errors)
+    )
+
+    async def _count(request: httpx.Request):
+        _requests[name] += 1
+
+    _transports[name] = transport
+    return httpx.AsyncClient(
+        base_url=cfg["base_url"],
+        timeout=cfg["timeout"],
+        transport=transport,
+        event_hooks={"request": [_count]},
+    )
+
+
+async def start():
+    for name in UPSTREAMS:
+        if name not in _clients:
+            _clients[name] = _make_client(name)
+
+
+async def close():
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
+    _transports.clear()
+
+
+def get_client(name: str) -> httpx.AsyncClient:
+    """Return the pooled client for an upstream, creating it if the lifespan hasn't (e.g. scripts)."""
+    client = _clients.get(name)
+    if client is None:
+        client = _clients[name] = _make_client(name)
+    return client
+
+
+def stats() -> dict[str, dict[str, int]]:
+    """Requests sent per upstream, plus connection counts where the pool exposes them."""
+    result = {}
+    for name in UPSTREAMS:
+        result[name] = {"requests": _requests[name], **_connection_counts(_transports.get(name))}
+    return result
+
+
+def _connection_counts(transport: httpx.AsyncHTTPTransport | None) -> dict[str, int]:
+    # httpx has no public pool state; httpcore's pool is private and may change
+    # between releases, so leave the counts out rather than fail /admin/stats
+    try:
+        connections = list(transport._pool.connections)
+        idle = sum(1 for c in connections if c.is_idle())
+    except Exception:
+        return {}
+    return {"connections": len(connections), "idle": idle, "active": len(connections) - idle}
@@ -4,17 +4,35 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
 from app.db.database import get_pool, close_pool
-from app.services.ml import load_model
-from app.api.routes import analyze, report, health, upload, pvgis
+from app.services import model_registry
+from app.services.geocoding import load_postcode_index
+from app.services.market import load_price_store
+from app.services.constraint_engine import load_engine
+from app.services.constraints import check_layers
+from app.services import planning_store
+from app import cache, http_clients
+from app.api.routes import analyze, report, health, upload, pvgis, admin
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    await get_pool()
-    load_model()
+    pool = await get_pool()
+    await http_clients.start()
+    model_registry.load_model()
+    load_postcode_index()
+    load_price_store()
+    await check_layers(pool)
+    await load_engine(pool)
+    await planning_store.load_store(pool)
+    cache.start_sweeper()
+    model_registry.start_watcher()
     yield
     # Shutdown
+    await model_registry.stop_watcher()
+    await planning_store.stop_refresher()
+    await cache.stop_sweeper()
+    await http_clients.close()
     await close_pool()
 
 
@@ -37,4 +55,5 @@ app.include_router(health.router, prefix="/api/v1")
 app.include_router(analyze.router, prefix="/api/v1")
 app.include_router(report.router, prefix="/api/v1")
 app.include_router(upload.router, prefix="/api/v1")
+app.include_router(admin.router, prefix="/api/v1")
 app.include_router(pvgis.router, prefix="/api")
@@ -1,9 +1,11 @@
+import secrets
 from fastapi import HTTPException, Security
-from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+from fastapi.security import APIKeyHeader, HTTPAuthorizationCredentials, HTTPBearer
 import jwt as pyjwt
 from app.config import settings
 
 bearer_scheme = HTTPBearer()
+admin_token_scheme = APIKeyHeader(name="X-Admin-Token", auto_error=False)
 
 
 def verify_jwt(credentials: HTTPAuthorizationCredentials = Security(bearer_scheme)) -> dict:
@@ -40,3 +42,10 @@ def verify_jwt(credentials: HTTPAuthorizationCredentials = Security(bearer_schem
         raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
     except pyjwt.PyJWTError as e:
         raise HTTPException(status_code=401, detail=f"Invalid token: {e}")
+
+
+def verify_admin_token(token: str | None = Security(admin_token_scheme)) -> None:
+    if not settings.admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if token is None or not secrets.compare_digest(token, settings.admin_token):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
@@ -0,0 +1,174 @@
+"""
+Latency budget and circuit breakers for the upstream calls behind /analyze.
+
+A request gets one Deadline covering geocoding and every data component.
+Each component call goes through guarded(), which bounds it by what is left
+of the deadline, but never less than analyze_component_min_seconds, and by
+its own circuit breaker. A component only counts a timeout against its
+breaker after it had that slice; when earlier steps (geocoding, the feature
+store probe) used up the whole budget, it is skipped without touching the
+breaker, so a slow upstream cannot trip the breakers of healthy ones.
+Breaker states:
+
+  - closed:    calls pass through; outcomes are kept in a rolling window
+  - open:      the failure rate over the window crossed the threshold, so
+               calls are rejected immediately for breaker_open_seconds
+  - half-open: after that, a single probe call is let through; success
+               closes the breaker, failure re-opens it
+
+A component that is rejected or misses the deadline raises Unavailable and
+the caller fills that section from cache or defaults instead of failing
+the whole request, so response time stays bounded while an upstream is down.
+"""
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable
+
+from app.config import settings
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+_breakers: dict[str, "CircuitBreaker"] = {}
+
+
+class Unavailable(Exception):
+    """A component was skipped because its breaker is open or it missed the deadline."""
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        window: int = settings.breaker_window,
+        failure_rate: float = settings.breaker_failure_rate,
+        min_calls: int = settings.breaker_min_calls,
+        open_seconds: float = settings.breaker_open_seconds,
+    ):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._outcomes: deque[bool] = deque(maxlen=window)   # True = failed
+        self._opened_at = 0.0
+        self._probing = False
+        self.calls = 0
+        self.failures = 0
+        self.rejected = 0
+        self.trips = 0
+
+    def allow(self) -> bool:
+        """Whether a call may go ahead now. In half-open state only one probe runs at a time."""
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.open_seconds:
+                self.rejected += 1
+                return False
+            self.state = HALF_OPEN
+        if self.state == HALF_OPEN:
+            if self._probing:
+                self.rejected += 1
+                return False
+            self._probing = True
+        self.calls += 1
+        return True
+
+    def record(self, ok: bool | None) -> None:
+        """Record a call outcome. None (cancelled by the caller) only frees a half-open probe."""
+        if self.state == HALF_OPEN:
+            self._probing = False
+            if ok:
+                self.state = CLOSED
+                self._outcomes.clear()
+            elif ok is False:
+                self.failures += 1
+                self._trip()
+            return
+        if ok is None:
+            return
+        if not ok:
+            self.failures += 1
+        self._outcomes.append(not ok)
+        if len(self._outcomes) >= self.min_calls and sum(self._outcomes) / len(self._outcomes) >= self.failure_rate:
+            self._trip()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "calls": self.calls,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "trips": self.trips,
+        }
+
+    def _trip(self) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.trips += 1
+
+
+def get_breaker(name: str) -> CircuitBreaker:
+    breaker = _breakers.get(name)
+    if breaker is None:
+        breaker = _breakers[name] = CircuitBreaker(name)
+    return breaker
+
+
+async def guarded(
+    name: str,
+    aw: Awaitable[Any],
+    deadline: Deadline,
+    expected: tuple[type[BaseException], ...] = (),
+) -> Any:
+    """
+    Await `aw` within the remaining budget (at least the per-component
+    minimum), behind the breaker for `name`.
+
+    Exceptions in `expected` (e.g. ValueError for an unknown postcode) mean
+    the upstream answered, so they propagate without counting as failures.
+    """
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        # Spent before this component started: not its upstream's fault
+        _close(aw)
+        raise Unavailable(f"{name}: budget spent before it started")
+    breaker = get_breaker(name)
+    if not breaker.allow():
+        _close(aw)
+        raise Unavailable(f"{name}: circuit open")
+
+    ok: bool | None = None
+    try:
+        timeout = max(remaining, settings.analyze_component_min_seconds)
+        result = await asyncio.wait_for(aw, timeout=timeout)
+        ok = True
+        return result
+    except expected:
+        ok = True
+        raise
+    except asyncio.TimeoutError as e:
+        ok = False
+        raise Unavailable(f"{name}: missed the deadline") from e
+    except Exception:
+        ok = False
+        raise
+    finally:
+        breaker.record(ok)
+
+
+def _close(aw: Awaitable[Any]) -> None:
+    if asyncio.iscoroutine(aw):
+        aw.close()   # never scheduled; avoid a "never awaited" warning
+
+
+def stats() -> dict[str, dict[str, Any]]:
+    return {name: breaker.stats() for name, breaker in _breakers.items()}
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, ConfigDict
 from datetime import datetime
-from typing import Optional
+from typing import Any, Optional
 from enum import Enum
 
 
@@ -31,6 +31,20 @@ class ProjectParams(BaseModel):
     estimated_floor_area_m2: float = 30.0  # m²
 
 
+class ManualOverrides(BaseModel):
+    """User overrides for model features. None means use the fetched value."""
+    flood_zone: Optional[int] = None
+    in_conservation_area: Optional[bool] = None
+    in_greenbelt: Optional[bool] = None
+    in_article4_zone: Optional[bool] = None
+    local_approval_rate: Optional[float] = None
+    avg_decision_time_days: Optional[float] = None
+    similar_applications_nearby: Optional[int] = None
+    avg_price_per_m2: Optional[float] = None
+    price_trend_24m: Optional[float] = None
+    avg_epc_rating: Optional[str] = None
+
+
 class Location(BaseModel):
     lat: float
     lon: float
@@ -92,6 +106,19 @@ class ViabilityBreakdown(BaseModel):
     project_complexity_penalty: float = 0
 
 
+class LocationProfile(BaseModel):
+    """Project-independent data for a postcode — the expensive part of /analyze."""
+    postcode: str
+    location: Location
+    constraints: Constraints
+    planning_metrics: PlanningMetrics
+    market_metrics: MarketMetrics
+    nearby_schools: list[NearbySchool]
+    # Components that failed or missed the latency budget and were filled with
+    # defaults: any of "constraints", "planning", "market", "epc", "schools"
+    degraded_sections: list[str] = []
+
+
 class AnalyzeResponse(BaseModel):
     postcode: str
     project_params: ProjectParams
@@ -99,10 +126,18 @@ class AnalyzeResponse(BaseModel):
     constraints: Constraints
     planning_metrics: PlanningMetrics
     market_metrics: MarketMetrics
-    ml_prediction: MLPrediction
-    viability_score: float              # 0 – 100
-    viability_breakdown: ViabilityBreakdown
+    # None when a section the model needs is degraded and not overridden
+    ml_prediction: Optional[MLPrediction] = None
+    viability_score: Optional[float] = None     # 0 – 100
+    viability_breakdown: Optional[ViabilityBreakdown] = None
     nearby_schools: list[NearbySchool]
+    degraded_sections: list[str] = []
+
+
+class AnalyzeChunk(BaseModel):
+    """One fragment of a streamed /analyze/stream response: `data` holds a subset of AnalyzeResponse fields."""
+    section: str            # location | constraints | planning | market | schools | prediction | error
+    data: dict[str, Any]
 
 
 class PlanningReport(BaseModel):
@@ -123,4 +158,21 @@ class HealthResponse(BaseModel):
 
     status: str
     model_loaded: bool
+    model_version: Optional[str] = None
     db_connected: bool
+
+
+class StatsResponse(BaseModel):
+    """Operational counters; admin only, as they show which upstreams are failing."""
+    cache: dict[str, dict[str, int]]
+    singleflight: dict[str, dict[str, int]]
+    http_pools: dict[str, dict[str, int]]
+    circuit_breakers: dict[str, dict[str, int | str]]
+
+
+class ModelReloadResponse(BaseModel):
+    model_config = ConfigDict(protected_namespaces=())
+
+    reloaded: bool
+    model_version: Optional[str]
+    previous_version: Optional[str]
@@ -0,0 +1,434 @@
+"""
+Analysis pipeline shared by /analyze and /report.
+
+Work is split into two tiers:
+  - location: geocoding plus the PostGIS, EPC and schools lookups. Slow, and
+    independent of the project, so it is cached per postcode and served
+    stale-while-revalidate: a stale profile is returned immediately while a
+    background task fetches a fresh one.
+  - scoring:  overrides, ML prediction and viability for one project. Pure
+    CPU work taking milliseconds, re-run for every parameter combination.
+
+A location fetch runs under a latency budget (settings.analyze_budget_seconds)
+with a circuit breaker per component (see app/resilience.py). A component
+that fails or misses the budget is filled with placeholders and listed in
+degraded_sections. The placeholders are for display only: if a section the
+model reads is degraded (and not fully covered by manual overrides), the
+prediction and viability score are left out rather than computed from them.
+A degraded profile is cached for settings.cache_degraded_ttl_seconds, so a
+slow component is retried soon but not on every request.
+
+Before any of that, a location-tier miss checks the nightly feature store
+(app/services/feature_store.py): a covered postcode with a fresh
+precomputed profile needs one keyed lookup and no fetches at all.
+
+stream_analysis() runs the same pipeline but yields each section as soon as
+it is ready, for the NDJSON /analyze/stream endpoint.
+"""
+import asyncio
+import logging
+from typing import Any, AsyncIterator
+from fastapi import HTTPException
+
+from app.config import settings
+from app.db.database import get_pool
+from app.services.geocoding import geocode_postcode
+from app.services.location_query import get_location_data
+from app.services.market import get_epc_rating
+from app.services.schools import get_nearby_schools
+from app.services.ml import predict_approval
+from app.services import feature_store
+from app.services.viability import compute_viability
+from app.schemas.models import (
+    AnalyzeResponse, LocationProfile, Location, Constraints,
+    PlanningMetrics, MarketMetrics, MLPrediction, ViabilityBreakdown, NearbySchool,
+    ProjectParams, ManualOverrides, AnalyzeChunk,
+)
+from app.singleflight import SingleFlight
+from app import cache, resilience
+
+# Concurrent requests for the same analysis / postcode share one execution
+_analysis_flight = SingleFlight("analysis")
+_location_flight = SingleFlight("location")
+_refreshes: set[asyncio.Task] = set()
+
+log = logging.getLogger(__name__)
+
+# Display placeholders for location components that are unavailable; never scored
+_SECTION_DEFAULTS = {
+    "constraints": {"flood_zone": 1, "in_conservation_area": False, "in_greenbelt": False, "in_article4_zone": False},
+    "planning": {"local_approval_rate": 0.0, "avg_decision_time_days": 0.0, "similar_applications_nearby": 0, "recent_applications": []},
+    "market": {"avg_price_per_m2": 0.0, "price_trend_24m": 0.0, "comparable_sales": []},
+    "epc": "N/A",
+    "schools": [],
+}
+
+# Override fields that stand in for each degraded section the model reads.
+# EPC is not here: an unknown rating is scored as in training, like "N/A".
+_MODEL_SECTIONS = {
+    "constraints": ("flood_zone", "in_conservation_area", "in_greenbelt", "in_article4_zone"),
+    "planning": ("local_approval_rate", "avg_decision_time_days", "similar_applications_nearby"),
+    "market": ("avg_price_per_m2", "price_trend_24m"),
+}
+
+# Sections each fetched component provides. Constraints, planning and sales
+# metrics come from one PostGIS round trip, so they succeed or degrade together.
+_COMPONENT_SECTIONS = {
+    "postgis": ("constraints", "planning", "market"),
+    "epc": ("epc",),
+    "schools": ("schools",),
+}
+
+
+async def run_analysis(postcode: str, project: ProjectParams, overrides: ManualOverrides) -> AnalyzeResponse:
+    """Return the analysis for a postcode and project, reusing cached tiers where possible."""
+    key = cache.analysis_key(postcode, project, overrides)
+    cached = cache.get_analysis(key)
+    if cached is not None:
+        return cached
+    return await _analysis_flight.do(key, lambda: _analyse(key, postcode, project, overrides))
+
+
+async def _analyse(key: str, postcode: str, project: ProjectParams, overrides: ManualOverrides) -> AnalyzeResponse:
+    profile = await get_location_profile(postcode)
+    result = score_location(profile, project, overrides)
+    if not result.degraded_sections:
+        cache.set_analysis(key, result)
+    return result
+
+
+async def get_location_profile(postcode: str) -> LocationProfile:
+    """Fetch (or reuse) the project-independent data for a postcode."""
+    cached = cache.get_location(postcode)
+    if cached is not None:
+        profile, stale = cached
+        if stale:
+            _refresh_in_background(postcode)
+        return profile
+    return await _location_flight.do(cache.postcode_key(postcode), lambda: _fetch_location_profile(postcode))
+
+
+def _refresh_in_background(postcode: str) -> None:
+    """Re-fetch a stale profile without making the current request wait for it."""
+    async def _refresh():
+        try:
+            # Joins an in-flight fetch if one is already running for this postcode
+            await _location_flight.do(cache.postcode_key(postcode), lambda: _fetch_location_profile(postcode))
+        except Exception as e:
+            log.warning("Background refresh failed for %s: %s", postcode, e)
+
+    task = asyncio.create_task(_refresh())
+    # Hold a reference until done so the task isn't garbage-collected mid-flight
+    _refreshes.add(task)
+    task.add_done_callback(_refreshes.discard)
+
+
+async def _fetch_location_profile(postcode: str) -> LocationProfile:
+    async for _, value in _location_events(postcode):
+        pass
+    return value
+
+
+async def _location_events(postcode: str) -> AsyncIterator[tuple[str, Any]]:
+    """
+    Fetch a location profile, yielding each section as soon as it is ready:
+    ("location", Location) first, then "constraints", "planning", "market"
+    and "schools" in completion order, and finally ("profile", LocationProfile).
+    """
+    deadline = resilience.Deadline(settings.analyze_budget_seconds)
+
+    # 0. Precomputed profile from the nightly feature store, if it has a fresh one
+    stored = await _stored_profile(postcode, deadline)
+    if stored is not None:
+        yield "location", stored.location
+        yield "constraints", stored.constraints
+        yield "planning", stored.planning_metrics
+        yield "market", stored.market_metrics
+        yield "schools", stored.nearby_schools
+        cache.set_location(postcode, stored)
+        yield "profile", stored
+        return
+
+    # 1. Geocode — nothing else can run without a location, so this one fails the request
+    try:
+        geo = await resilience.guarded("geocode", geocode_postcode(postcode), deadline, expected=(ValueError,))
+    except ValueError:
+        raise HTTPException(
+            status_code=404,
+            detail=f"We couldn't find the postcode '{postcode}'. Please check it's a valid UK postcode and try again.",
+        )
+    except resilience.Unavailable as e:
+        raise HTTPException(status_code=503, detail=f"Geocoding service unavailable: {e}")
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Geocoding service error: {e}")
+
+    location = Location(lat=geo.lat, lon=geo.lon, district=geo.district, ward=geo.ward)
+    yield "location", location
+
+    pool = await get_pool()
+
+    # 2. Fetch every component concurrently within what is left of the budget
+    fetches = {
+        "postgis": get_location_data(pool, geo.lat, geo.lon),
+        "epc": get_epc_rating(pool, postcode),
+        "schools": get_nearby_schools(pool, geo.lat, geo.lon),
+    }
+    tasks = {
+        asyncio.ensure_future(resilience.guarded(name, aw, deadline)): name
+        for name, aw in fetches.items()
+    }
+    raw, sections, degraded = {}, {}, []
+    try:
+        pending = set(tasks)
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                component = tasks[task]
+                names = _COMPONENT_SECTIONS[component]
+                try:
+                    result = task.result()
+                    values = result if component == "postgis" else {component: result}
+                except Exception as e:
+                    log.warning("Serving %s degraded for %s: %s", component, postcode, e or type(e).__name__)
+                    values = {name: _SECTION_DEFAULTS[name] for name in names}
+                    degraded.extend(names)
+                raw.update(values)
+
+                for name in names:
+                    # Market metrics combine the sales figures with the EPC rating
+                    if name in ("market", "epc"):
+                        if "market" not in raw or "epc" not in raw:
+                            continue
+                        name = "market"
+                        sections[name] = MarketMetrics(**raw["market"], avg_epc_rating=raw["epc"])
+                    elif name == "constraints":
+                        sections[name] = Constraints(**raw[name])
+                    elif name == "planning":
+                        sections[name] = PlanningMetrics(**raw[name])
+                    else:
+                        sections[name] = [NearbySchool(**s) for s in raw[name]]
+                    yield name, sections[name]
+    finally:
+        # Only has work to do if the consumer stopped early
+        for task in tasks:
+            task.cancel()
+
+    profile = LocationProfile(
+        postcode=postcode.upper().strip(),
+        location=location,
+        constraints=sections["constraints"],
+        planning_metrics=sections["planning"],
+        market_metrics=sections["market"],
+        nearby_schools=sections["schools"],
+        degraded_sections=sorted(degraded),
+    )
+    cache.set_location(postcode, profile)
+    yield "profile", profile
+
+
+async def _stored_profile(postcode: str, deadline: resilience.Deadline) -> LocationProfile | None:
+    """The feature store's profile for a postcode; None (use the live pipeline) on a miss or any failure."""
+    try:
+        pool = await get_pool()
+        return await resilience.guarded("feature_store", feature_store.get_profile(pool, postcode), deadline)
+    except Exception as e:
+        log.warning("Feature store lookup failed for %s: %s", postcode, e or type(e).__name__)
+        return None
+
+
+async def stream_analysis(postcode: str, project: ProjectParams, overrides: ManualOverrides) -> AsyncIterator[AnalyzeChunk]:
+    """
+    Yield the analysis as AnalyzeChunk fragments: location first, then each
+    location section as it arrives, then the prediction and viability score.
+    Cached tiers are served exactly as run_analysis would, just chunked.
+    """
+    key = cache.analysis_key(postcode, project, overrides)
+    result = cache.get_analysis(key)
+    sent: set[str] = set()
+
+    if result is None:
+        cached = cache.get_location(postcode)
+        if cached is not None:
+            profile, stale = cached
+            if stale:
+                _refresh_in_background(postcode)
+        else:
+            async for section, value in _stream_location(postcode):
+                if section == "profile":
+                    profile = value
+                    continue
+                yield _section_chunk(section, value, postcode, project, overrides)
+                sent.add(section)
+        result = score_location(profile, project, overrides)
+        if not result.degraded_sections:
+            cache.set_analysis(key, result)
+
+    for section, fields in _CHUNK_FIELDS.items():
+        if section not in sent:
+            yield AnalyzeChunk(section=section, data=result.model_dump(mode="json", include=set(fields)))
+
+
+async def _stream_location(postcode: str) -> AsyncIterator[tuple[str, Any]]:
+    """
+    Stream _location_events for a postcode through the location single-flight.
+    If a fetch for the postcode is already running, this joins it and only
+    the final ("profile", ...) event is yielded.
+    """
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def fetch() -> LocationProfile:
+        async for section, value in _location_events(postcode):
+            if section != "profile":
+                events.put_nowait((section, value))
+        return value
+
+    flight = asyncio.ensure_future(_location_flight.do(cache.postcode_key(postcode), fetch))
+    try:
+        while not flight.done():
+            getter = asyncio.ensure_future(events.get())
+            await asyncio.wait({getter, flight}, return_when=asyncio.FIRST_COMPLETED)
+            if getter.done():
+                yield getter.result()
+            else:
+                getter.cancel()
+        while not events.empty():
+            yield events.get_nowait()
+        yield "profile", flight.result()
+    finally:
+        # The shared fetch is shielded; this only stops waiting for it
+        flight.cancel()
+
+
+# AnalyzeResponse fields carried by each streamed chunk, in emission order
+_CHUNK_FIELDS = {
+    "location": ("postcode", "project_params", "location"),
+    "constraints": ("constraints",),
+    "planning": ("planning_metrics",),
+    "market": ("market_metrics",),
+    "schools": ("nearby_schools",),
+    "prediction": ("ml_prediction", "viability_score", "viability_breakdown", "degraded_sections"),
+}
+
+
+def _section_chunk(section: str, value: Any, postcode: str, project: ProjectParams, overrides: ManualOverrides) -> AnalyzeChunk:
+    """Build the chunk for a freshly fetched section, with manual overrides applied."""
+    if section == "location":
+        data = {
+            "postcode": postcode.upper().strip(),
+            "project_params": project.model_dump(mode="json"),
+            "location": value.model_dump(mode="json"),
+        }
+    elif section == "constraints":
+        data = {"constraints": _override_constraints(value, overrides).model_dump(mode="json")}
+    elif section == "planning":
+        data = {"planning_metrics": _override_planning(value, overrides).model_dump(mode="json")}
+    elif section == "market":
+        data = {"market_metrics": _override_market(value, overrides).model_dump(mode="json")}
+    else:
+        data = {"nearby_schools": [s.model_dump(mode="json") for s in value]}
+    return AnalyzeChunk(section=section, data=data)
+
+
+def score_location(profile: LocationProfile, project: ProjectParams, overrides: ManualOverrides) -> AnalyzeResponse:
+    """
+    Apply manual overrides to a location profile, then run the ML model and
+    viability score. Both are None if a section they read is degraded and
+    the overrides don't replace all of its fields.
+    """
+    # Manual values win over fetched ones; downstream response objects reflect the overrides
+    constraints = _override_constraints(profile.constraints, overrides)
+    planning = _override_planning(profile.planning_metrics, overrides)
+    market = _override_market(profile.market_metrics, overrides)
+
+    if not _scorable(profile.degraded_sections, overrides):
+        return AnalyzeResponse(
+            postcode=profile.postcode,
+            project_params=project,
+            location=profile.location,
+            constraints=constraints,
+            planning_metrics=planning,
+            market_metrics=market,
+            nearby_schools=profile.nearby_schools,
+            degraded_sections=profile.degraded_sections,
+        )
+
+    approval_prob = predict_approval(
+        flood_zone=constraints.flood_zone,
+        in_conservation_area=constraints.in_conservation_area,
+        in_greenbelt=constraints.in_greenbelt,
+        in_article4_zone=constraints.in_article4_zone,
+        local_approval_rate=planning.local_approval_rate,
+        avg_decision_time_days=planning.avg_decision_time_days,
+        similar_applications_nearby=planning.similar_applications_nearby,
+        avg_price_per_m2=market.avg_price_per_m2,
+        price_trend_24m=market.price_trend_24m,
+        avg_epc_rating=market.avg_epc_rating,
+        application_type=project.application_type.value,
+        property_type=project.property_type.value,
+        num_storeys=project.num_storeys,
+        estimated_floor_area_m2=project.estimated_floor_area_m2,
+    )
+
+    viability_score, viability_breakdown = compute_viability(
+        approval_probability=approval_prob,
+        flood_zone=constraints.flood_zone,
+        in_conservation_area=constraints.in_conservation_area,
+        in_greenbelt=constraints.in_greenbelt,
+        in_article4_zone=constraints.in_article4_zone,
+        avg_price_per_m2=market.avg_price_per_m2,
+        price_trend_24m=market.price_trend_24m,
+        application_type=project.application_type.value,
+        num_storeys=project.num_storeys,
+        estimated_floor_area_m2=project.estimated_floor_area_m2,
+    )
+
+    return AnalyzeResponse(
+        postcode=profile.postcode,
+        project_params=project,
+        location=profile.location,
+        constraints=constraints,
+        planning_metrics=planning,
+        market_metrics=market,
+        ml_prediction=MLPrediction(approval_probability=approval_prob),
+        viability_score=viability_score,
+        viability_breakdown=ViabilityBreakdown(**viability_breakdown),
+        nearby_schools=profile.nearby_schools,
+        degraded_sections=profile.degraded_sections,
+    )
+
+
+def _scorable(degraded_sections: list[str], overrides: ManualOverrides) -> bool:
+    return all(
+        getattr(overrides, field) is not None
+        for section in degraded_sections
+        for field in _MODEL_SECTIONS.get(section, ())
+    )
+
+
+def _override_constraints(c: Constraints, overrides: ManualOverrides) -> Constraints:
+    return Constraints(
+        flood_zone=_pick(overrides.flood_zone, c.flood_zone),
+        in_conservation_area=_pick(overrides.in_conservation_area, c.in_conservation_area),
+        in_greenbelt=_pick(overrides.in_greenbelt, c.in_greenbelt),
+        in_article4_zone=_pick(overrides.in_article4_zone, c.in_article4_zone),
+    )
+
+
+def _override_planning(p: PlanningMetrics, overrides: ManualOverrides) -> PlanningMetrics:
+    return p.model_copy(update={
+        "local_approval_rate": _pick(overrides.local_approval_rate, p.local_approval_rate),
+        "avg_decision_time_days": _pick(overrides.avg_decision_time_days, p.avg_decision_time_days),
+        "similar_applications_nearby": _pick(overrides.similar_applications_nearby, p.similar_applications_nearby),
+    })
+
+
+def _override_market(m: MarketMetrics, overrides: ManualOverrides) -> MarketMetrics:
+    return m.model_copy(update={
+        "avg_price_per_m2": _pick(overrides.avg_price_per_m2, m.avg_price_per_m2),
+        "price_trend_24m": _pick(overrides.price_trend_24m, m.price_trend_24m),
+        "avg_epc_rating": _pick(overrides.avg_epc_rating, m.avg_epc_rating),
+    })
+
+
+def _pick(manual, fetched):
+    return manual if manual is not None else fetched
@@ -0,0 +1,222 @@
+"""
+In-process planning constraint lookups.
+
+The four constraint layers only change with the monthly ingests, so instead
+of a PostGIS probe per request the layers can be held in memory: one
+shapely STRtree per layer over prepared geometries. A point lookup is then
+a few microseconds of CPU. lookup_many() answers a whole array of points
+with vectorised tree queries and predicate tests, for batch and portfolio
+analysis.
+
+Geometries are read from the same tables the SQL path prefers
+(flood_coverage and the *_subdivided layers, else the raw layers), either
+straight from PostGIS at startup or from a snapshot file written by
+scripts/build_constraint_snapshot.py. Points are tested with intersects,
+as the SQL path does on the subdivided pieces.
+
+Snapshot layout (little-endian):
+    8 bytes   magic b"PPCON001"
+    4 bytes   header length (uint32)
+    header    JSON: per layer the source table, piece count and array offsets
+    arrays    8-byte aligned, per layer:
+                lengths  uint32   WKB length of each piece
+                wkb      bytes    the pieces' WKB, concatenated
+                zones    int16    flood zone of each piece (flood layer only)
+
+shapely (2.0 or later, see requirements-optional.txt) is optional: without
+it the engine never loads and every lookup goes to PostGIS.
+"""
+import json
+import logging
+import struct
+import numpy as np
+import asyncpg
+from pathlib import Path
+
+try:
+    import shapely
+except ImportError:  # optional dependency
+    shapely = None
+
+from app.config import settings
+
+log = logging.getLogger(__name__)
+
+MAGIC = b"PPCON001"
+
+# result key -> tables to load it from, in order of preference
+LAYERS = {
+    "flood_zone": ("flood_coverage", "flood_zones"),
+    "in_conservation_area": ("conservation_areas_subdivided", "conservation_areas"),
+    "in_greenbelt": ("greenbelt_areas_subdivided", "greenbelt_areas"),
+    "in_article4_zone": ("article4_zones_subdivided", "article4_zones"),
+}
+
+_FLOOD = "flood_zone"
+
+_engine: "ConstraintEngine | None" = None
+
+
+class _Layer:
+    def __init__(self, source: str, geoms: np.ndarray, zones: np.ndarray | None):
+        shapely.prepare(geoms)
+        self.source = source
+        self.geoms = geoms
+        self.zones = zones
+        self.tree = shapely.STRtree(geoms)
+
+
+class ConstraintEngine:
+    def __init__(self, layers: dict[str, tuple[str, list[bytes], np.ndarray | None]]):
+        """`layers` maps each LAYERS key to (source table, WKB pieces, flood zones or None)."""
+        self._layers = {
+            key: _Layer(source, shapely.from_wkb(np.array(wkb, dtype=object)), zones)
+            for key, (source, wkb, zones) in layers.items()
+        }
+
+    @property
+    def pieces(self) -> dict[str, int]:
+        return {key: len(layer.geoms) for key, layer in self._layers.items()}
+
+    def lookup(self, lon: float, lat: float) -> dict:
+        """Constraints at one point, in the shape constraints.get_constraints returns."""
+        point = shapely.points(lon, lat)
+        result = {}
+        for key, layer in self._layers.items():
+            candidates = layer.tree.query(point)
+            hits = candidates[shapely.intersects_xy(layer.geoms[candidates], lon, lat)]
+            if key == _FLOOD:
+                result[key] = int(layer.zones[hits].max()) if len(hits) else 1
+            else:
+                result[key] = bool(len(hits))
+        return result
+
+    def lookup_many(self, lons: np.ndarray, lats: np.ndarray) -> list[dict]:
+        """Constraints at every point, one tree query and one predicate pass per layer."""
+        lons = np.asarray(lons, dtype=np.float64)
+        lats = np.asarray(lats, dtype=np.float64)
+        points = shapely.points(lons, lats)
+        columns = {}
+        for key, layer in self._layers.items():
+            # Bounding-box candidates as (point index, piece index) pairs, then the exact test
+            point_idx, piece_idx = layer.tree.query(points)
+            hit = shapely.intersects_xy(layer.geoms[piece_idx], lons[point_idx], lats[point_idx])
+            point_idx, piece_idx = point_idx[hit], piece_idx[hit]
+            if key == _FLOOD:
+                zone = np.ones(len(points), dtype=np.int16)
+                np.maximum.at(zone, point_idx, layer.zones[piece_idx])
+                columns[key] = zone.tolist()
+            else:
+                flag = np.zeros(len(points), dtype=bool)
+                flag[point_idx] = True
+                columns[key] = flag.tolist()
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+    @classmethod
+    async def from_postgis(cls, pool: asyncpg.Pool) -> "ConstraintEngine":
+        layers = {}
+        for key, tables in LAYERS.items():
+            layers[key] = await _fetch_layer(pool, key, tables)
+        return cls(layers)
+
+    @classmethod
+    def from_snapshot(cls, path: str | Path) -> "ConstraintEngine":
+        data = Path(path).read_bytes()
+        if data[:8] != MAGIC:
+            raise ValueError(f"{path} is not a constraint snapshot")
+        (header_len,) = struct.unpack_from("<I", data, 8)
+        header = json.loads(data[12:12 + header_len])
+
+        layers = {}
+        for key, meta in header["layers"].items():
+            count, offsets = meta["count"], meta["offsets"]
+            lengths = np.frombuffer(data, dtype="<u4", count=count, offset=offsets["lengths"])
+            ends = np.cumsum(lengths, dtype=np.int64) + offsets["wkb"]
+            starts = ends - lengths
+            wkb = [data[s:e] for s, e in zip(starts.tolist(), ends.tolist())]
+            zones = None
+            if "zones" in offsets:
+                zones = np.frombuffer(data, dtype="<i2", count=count, offset=offsets["zones"]).copy()
+            layers[key] = (meta["source"], wkb, zones)
+        return cls(layers)
+
+    def write_snapshot(self, path: str | Path) -> None:
+        """
+        Write the loaded layers to a snapshot file that from_snapshot() reads
+        back. The WKB is re-encoded from the geometries, so the engine doesn't
+        have to keep a second copy of every layer around for this.
+        """
+        arrays: list[tuple[str, str, bytes]] = []
+        header = {"layers": {}}
+        for key, layer in self._layers.items():
+            wkb = shapely.to_wkb(layer.geoms, byte_order=1).tolist()
+            header["layers"][key] = {"source": layer.source, "count": len(wkb), "offsets": {}}
+            arrays.append((key, "lengths", np.array([len(b) for b in wkb], dtype="<u4").tobytes()))
+            arrays.append((key, "wkb", b"".join(wkb)))
+            if layer.zones is not None:
+                arrays.append((key, "zones", np.asarray(layer.zones, dtype="<i2").tobytes()))
+
+        # Offsets depend on the header length, so size the header with placeholder offsets first
+        for key, name, _ in arrays:
+            header["layers"][key]["offsets"][name] = 0
+        header_len = len(json.dumps(header).encode()) + 16 * len(arrays)
+        offset = _align(12 + header_len)
+        for key, name, blob in arrays:
+            header["layers"][key]["offsets"][name] = offset
+            offset = _align(offset + len(blob))
+        header_bytes = json.dumps(header).encode().ljust(header_len)
+
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = Path(f"{path}.tmp")
+        with open(tmp, "wb") as f:
+            f.write(MAGIC)
+            f.write(struct.pack("<I", header_len))
+            f.write(header_bytes)
+            for key, name, blob in arrays:
+                f.seek(header["layers"][key]["offsets"][name])
+                f.write(blob)
+        # Atomic swap so a starting worker never reads a half-written file
+        tmp.replace(path)
+
+
+async def _fetch_layer(pool: asyncpg.Pool, key: str, tables: tuple[str, ...]) -> tuple[str, list[bytes], np.ndarray | None]:
+    zone_column = ", zone_number" if key == _FLOOD else ""
+    for table in tables:
+        try:
+            rows = await pool.fetch(f"SELECT ST_AsBinary(geom) AS wkb{zone_column} FROM {table} WHERE geom IS NOT NULL")
+        except asyncpg.UndefinedTableError:
+            continue
+        zones = np.array([r["zone_number"] for r in rows], dtype=np.int16) if zone_column else None
+        return table, [bytes(r["wkb"]) for r in rows], zones
+    raise LookupError(f"none of {', '.join(tables)} exist")
+
+
+async def load_engine(pool: asyncpg.Pool):
+    """Load the engine if enabled: from the snapshot file when present, else from PostGIS."""
+    global _engine
+    if not settings.constraint_engine:
+        return
+    if shapely is None:
+        log.warning("CONSTRAINT_ENGINE is on but shapely is not installed; constraints use PostGIS")
+        return
+    path = Path(settings.constraint_snapshot_path)
+    try:
+        if path.exists():
+            _engine = ConstraintEngine.from_snapshot(path)
+            origin = str(path)
+        else:
+            _engine = await ConstraintEngine.from_postgis(pool)
+            origin = "PostGIS"
+    except Exception as e:
+        log.warning("Constraint engine not loaded (%s); constraints use PostGIS", e)
+        return
+    log.info("Loaded constraint engine from %s: %s", origin, _engine.pieces)
+
+
+def get_engine() -> "ConstraintEngine | None":
+    return _engine
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
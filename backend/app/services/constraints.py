@@ -1,35 +1,135 @@
+import asyncio
 import asyncpg
+import logging
+
+from app.services.constraint_engine import get_engine
+
+log = logging.getLogger(__name__)
+
+# Which optional derived tables exist, set independently by check_layers at startup
+# (scripts/build_flood_coverage.py and scripts/subdivide_layers.py build them)
+_flood_coverage_available = True
+_subdivided_available = True
+
+_SUBDIVIDED_LAYERS = ("conservation_areas_subdivided", "greenbelt_areas_subdivided", "article4_zones_subdivided")
+
+# $1 = lon, $2 = lat (PostGIS uses (lon, lat) order in ST_MakePoint).
+# Also embedded in the combined location query (location_query.py).
+# Format with {flood} (_FLOOD_ZONES or _FLOOD_COVERAGE) and layer suffix ""
+# for the raw layers or "_subdivided" for the small-piece copies.
+_CONSTRAINTS_TEMPLATE = """
+    SELECT
+        COALESCE(
+            ({flood}),
+            1
+        ) AS flood_zone,
+
+        EXISTS(
+            SELECT 1 FROM conservation_areas{suffix}
+            WHERE {test}(geom, ST_SetSRID(ST_MakePoint($1, $2), 4326))
+        ) AS in_conservation_area,
+
+        EXISTS(
+            SELECT 1 FROM greenbelt_areas{suffix}
+            WHERE {test}(geom, ST_SetSRID(ST_MakePoint($1, $2), 4326))
+        ) AS in_greenbelt,
+
+        EXISTS(
+            SELECT 1 FROM article4_zones{suffix}
+            WHERE {test}(geom, ST_SetSRID(ST_MakePoint($1, $2), 4326))
+        ) AS in_article4_zone
+"""
+
+# Raw RoFRS bands overlap: find every band containing the point and keep the highest
+_FLOOD_ZONES = """
+    SELECT zone_number FROM flood_zones
+    WHERE ST_Contains(geom, ST_SetSRID(ST_MakePoint($1, $2), 4326))
+    ORDER BY zone_number DESC LIMIT 1
+"""
+
+# flood_coverage (scripts/build_flood_coverage.py) is non-overlapping, so this
+# matches one piece; MAX only settles a point lying on an edge between two.
+_FLOOD_COVERAGE = """
+    SELECT MAX(zone_number) FROM flood_coverage
+    WHERE ST_Intersects(geom, ST_SetSRID(ST_MakePoint($1, $2), 4326))
+"""
+
+# Pieces of one feature share edges, and a point on a shared edge is not
+# *contained* by either piece, so the subdivided layers test with ST_Intersects.
+# Keyed by (flood_coverage built, subdivided layers built).
+_QUERIES = {
+    (flood_coverage, subdivided): _CONSTRAINTS_TEMPLATE.format(
+        flood=_FLOOD_COVERAGE if flood_coverage else _FLOOD_ZONES,
+        suffix="_subdivided" if subdivided else "",
+        test="ST_Intersects" if subdivided else "ST_Contains",
+    )
+    for flood_coverage in (False, True)
+    for subdivided in (False, True)
+}
+
+CONSTRAINTS_SQL = _QUERIES[False, False]
+CONSTRAINTS_SUBDIVIDED_SQL = _QUERIES[True, True]
 
 
 async def get_constraints(pool: asyncpg.Pool, lat: float, lon: float) -> dict:
     """
     Query PostGIS layers for planning constraints at a given lat/lon.
     Returns flood zone (1/2/3), conservation area, greenbelt, article4 flags.
+    Answered in memory when the constraint engine is loaded.
     """
-    query = """
-        SELECT
-            COALESCE(
-                (SELECT zone_number FROM flood_zones
-                 WHERE ST_Contains(geom, ST_SetSRID(ST_MakePoint($1, $2), 4326))
-                 ORDER BY zone_number DESC LIMIT 1),
-                1
-            ) AS flood_zone,
-
-            EXISTS(
-                SELECT 1 FROM conservation_areas
-                WHERE ST_Contains(geom, ST_SetSRID(ST_MakePoint($1, $2), 4326))
-            ) AS in_conservation_area,
-
-            EXISTS(
-                SELECT 1 FROM greenbelt_areas
-                WHERE ST_Contains(geom, ST_SetSRID(ST_MakePoint($1, $2), 4326))
-            ) AS in_greenbelt,
-
-            EXISTS(
-                SELECT 1 FROM article4_zones
-                WHERE ST_Contains(geom, ST_SetSRID(ST_MakePoint($1, $2), 4326))
-            ) AS in_article4_zone
+    engine = get_engine()
+    if engine is not None:
+        return engine.lookup(lon, lat)
+    try:
+        row = await pool.fetchrow(constraints_sql(), lon, lat)
+    except asyncpg.UndefinedTableError:
+        if not await layers_missing(pool):
+            raise
+        return await get_constraints(pool, lat, lon)
+    return constraints_from_row(row)
+
+
+async def get_constraints_batch(pool: asyncpg.Pool, points: list[tuple[float, float]]) -> list[dict]:
+    """get_constraints for many (lat, lon) points, vectorised in memory when the engine is loaded."""
+    engine = get_engine()
+    if engine is not None:
+        return engine.lookup_many([lon for _, lon in points], [lat for lat, _ in points])
+    return list(await asyncio.gather(*(get_constraints(pool, lat, lon) for lat, lon in points)))
+
+
+def constraints_sql() -> str:
+    """The constraint query for the optional layers that exist: flood coverage and subdivided layers once built, else the raw ones."""
+    return _QUERIES[_flood_coverage_available, _subdivided_available]
+
+
+async def check_layers(pool: asyncpg.Pool) -> None:
+    """Look up which optional layers exist (to_regclass) and pick the query to match. Called at startup."""
+    global _flood_coverage_available, _subdivided_available
+    async with pool.acquire() as conn:
+        _flood_coverage_available = await conn.fetchval("SELECT to_regclass('flood_coverage') IS NOT NULL")
+        _subdivided_available = all([
+            await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", table) for table in _SUBDIVIDED_LAYERS
+        ])
+    if not _flood_coverage_available:
+        log.warning("flood_coverage not found; using the raw flood_zones (run scripts/build_flood_coverage.py)")
+    if not _subdivided_available:
+        log.warning("Subdivided constraint layers not found; using the raw layers (run scripts/subdivide_layers.py)")
+
+
+async def layers_missing(pool: asyncpg.Pool) -> bool:
+    """
+    After an UndefinedTableError, re-check the optional layers. True if one the
+    current query uses has gone, so a retry with constraints_sql() can succeed.
     """
-    # PostGIS uses (lon, lat) order in ST_MakePoint
-    row = await pool.fetchrow(query, lon, lat)
-    return dict(row)
+    before = (_flood_coverage_available, _subdivided_available)
+    await check_layers(pool)
+    return (_flood_coverage_available, _subdivided_available) != before
+
+
+def constraints_from_row(row) -> dict:
+    return {
+        "flood_zone": row["flood_zone"],
+        "in_conservation_area": row["in_conservation_area"],
+        "in_greenbelt": row["in_greenbelt"],
+        "in_article4_zone": row["in_article4_zone"],
+    }
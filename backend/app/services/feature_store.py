@@ -0,0 +1,117 @@
+"""
+Precomputed per-postcode location profiles.
+
+scripts/build_feature_store.py runs nightly over every postcode in the
+coverage area and writes a new version of postcode_features: the full
+LocationProfile as JSON (location, constraints, planning and market
+metrics, schools) plus the ten model features as plain columns for
+inspection and training. Once a version is complete it is marked live in
+postcode_feature_versions and older versions are dropped.
+
+On a location-cache miss the analysis pipeline asks here first, so a
+covered postcode costs one primary-key lookup instead of geocoding and the
+PostGIS, EPC and schools fetches. Postcodes missing from the live version,
+or built longer ago than FEATURE_STORE_MAX_AGE_HOURS, return None and go
+through the live pipeline.
+"""
+import asyncpg
+import logging
+from datetime import datetime, timedelta, timezone
+
+from app.config import settings
+from app.schemas.models import LocationProfile
+
+log = logging.getLogger(__name__)
+
+# Flipped off the first time postcode_features turns out not to exist
+_available = True
+
+CREATE_TABLES_SQL = """
+    CREATE TABLE IF NOT EXISTS postcode_feature_versions (
+        version SERIAL PRIMARY KEY,
+        started_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        built_at TIMESTAMPTZ,               -- set when the build finishes
+        postcodes INTEGER,
+        live BOOLEAN NOT NULL DEFAULT FALSE
+    );
+    CREATE UNIQUE INDEX IF NOT EXISTS postcode_feature_versions_live_idx
+        ON postcode_feature_versions (live) WHERE live;
+
+    CREATE TABLE IF NOT EXISTS postcode_features (
+        version INTEGER NOT NULL REFERENCES postcode_feature_versions ON DELETE CASCADE,
+        postcode TEXT NOT NULL,             -- normalised: no space, upper case
+        computed_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+        lat DOUBLE PRECISION,
+        lon DOUBLE PRECISION,
+        district TEXT,
+        ward TEXT,
+        -- Model features, as predict_approval takes them
+        flood_zone INTEGER,
+        in_conservation_area BOOLEAN,
+        in_greenbelt BOOLEAN,
+        in_article4_zone BOOLEAN,
+        local_approval_rate DOUBLE PRECISION,
+        avg_decision_time_days DOUBLE PRECISION,
+        similar_applications_nearby INTEGER,
+        avg_price_per_m2 DOUBLE PRECISION,
+        price_trend_24m DOUBLE PRECISION,
+        avg_epc_rating TEXT,
+        profile JSONB NOT NULL,             -- LocationProfile
+        PRIMARY KEY (postcode, version)
+    );
+"""
+
+# $1 = normalised postcode
+_LOOKUP_SQL = """
+    SELECT f.profile::text AS profile, f.computed_at
+    FROM postcode_feature_versions v
+    JOIN postcode_features f ON f.version = v.version
+    WHERE v.live AND f.postcode = $1
+"""
+
+
+def postcode_key(postcode: str) -> str:
+    return postcode.replace(" ", "").upper()
+
+
+async def get_profile(pool: asyncpg.Pool, postcode: str) -> LocationProfile | None:
+    """The live precomputed profile for a postcode, or None if it is missing or stale."""
+    global _available
+    if not _available:
+        return None
+    try:
+        row = await pool.fetchrow(_LOOKUP_SQL, postcode_key(postcode))
+    except asyncpg.UndefinedTableError:
+        log.warning("postcode_features not found; run scripts/build_feature_store.py")
+        _available = False
+        return None
+    if row is None:
+        return None
+    if datetime.now(timezone.utc) - row["computed_at"] > timedelta(hours=settings.feature_store_max_age_hours):
+        return None
+    profile = LocationProfile.model_validate_json(row["profile"])
+    # Echo the postcode as the caller wrote it, as the live pipeline does
+    return profile.model_copy(update={"postcode": postcode.upper().strip()})
+
+
+def feature_columns(profile: LocationProfile) -> dict:
+    """The postcode_features columns (besides version and postcode) for a profile."""
+    c, p, m = profile.constraints, profile.planning_metrics, profile.market_metrics
+    return {
+        "lat": profile.location.lat,
+        "lon": profile.location.lon,
+        "district": profile.location.district,
+        "ward": profile.location.ward,
+        "flood_zone": c.flood_zone,
+        "in_conservation_area": c.in_conservation_area,
+        "in_greenbelt": c.in_greenbelt,
+        "in_article4_zone": c.in_article4_zone,
+        "local_approval_rate": p.local_approval_rate,
+        "avg_decision_time_days": p.avg_decision_time_days,
+        "similar_applications_nearby": p.similar_applications_nearby,
+        "avg_price_per_m2": m.avg_price_per_m2,
+        "price_trend_24m": m.price_trend_24m,
+        # Unknown ratings are NULL here; the profile keeps the "N/A" the API would give
+        "avg_epc_rating": m.avg_epc_rating if m.avg_epc_rating != "N/A" else None,
+        "profile": profile.model_dump_json(),
+    }
@@ -1,4 +1,13 @@
-import httpx
+import logging
+from pathlib import Path
+from app.config import settings
+from app.http_clients import get_client
+from app.services.postcode_index import PostcodeIndex
+from app.singleflight import coalesce
+
+log = logging.getLogger(__name__)
+
+_index: PostcodeIndex | None = None
 
 
 class GeocodeResult:
@@ -9,24 +18,62 @@ class GeocodeResult:
         self.ward = ward
 
 
+def load_postcode_index() -> bool:
+    """
+    Map the local ONSPD index if it has been built; otherwise every lookup
+    goes to postcodes.io. Returns whether the index was loaded.
+    """
+    global _index
+    path = Path(settings.postcode_index_path)
+    if path.exists():
+        _index = PostcodeIndex(path)
+        log.info("Loaded postcode index with %d postcodes from %s", _index.count, path)
+    else:
+        log.info("No postcode index at %s; geocoding via postcodes.io", path)
+    return _index is not None
+
+
+def lookup_local(postcode: str) -> GeocodeResult | None:
+    """The postcode from the local index; None if the index isn't loaded or doesn't know it."""
+    if _index is None:
+        return None
+    hit = _index.lookup(postcode)
+    if hit is None:
+        return None
+    lat, lon, district, ward = hit
+    return GeocodeResult(lat=lat, lon=lon, district=district, ward=ward)
+
+
 async def geocode_postcode(postcode: str) -> GeocodeResult:
     """
-    Convert a UK postcode to WGS84 lat/lon using postcodes.io.
+    Convert a UK postcode to WGS84 lat/lon.
+
+    Resolved from the local ONSPD index when loaded (microseconds, no network);
+    postcodes.io is only called for postcodes the index doesn't know.
+    """
+    local = lookup_local(postcode)
+    if local is not None:
+        return local
+    return await _geocode_remote(postcode)
+
+
+@coalesce("geocode", key=lambda postcode: postcode.replace(" ", "").upper())
+async def _geocode_remote(postcode: str) -> GeocodeResult:
+    """
+    Geocode via postcodes.io.
 
     Free, no API key required, returns lat/lon directly.
     Docs: https://postcodes.io
     """
     clean = postcode.replace(" ", "").upper()
-    url = f"https://api.postcodes.io/postcodes/{clean}"
-
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(url, timeout=10)
-        if resp.status_code == 404:
-            raise ValueError(f"Postcode not found: {postcode}")
-        if resp.status_code == 400:
-            raise ValueError(f"Invalid postcode: {postcode}")
-        resp.raise_for_status()
-        data = resp.json()
+
+    resp = await get_client("postcodes").get(f"/postcodes/{clean}")
+    if resp.status_code == 404:
+        raise ValueError(f"Postcode not found: {postcode}")
+    if resp.status_code == 400:
+        raise ValueError(f"Invalid postcode: {postcode}")
+    resp.raise_for_status()
+    data = resp.json()
 
     result = data["result"]
     return GeocodeResult(
@@ -0,0 +1,139 @@
+"""
+British National Grid cells shared by the per-cell aggregate tables
+(planning_cell_months, price_cell_months). A point's cell is
+(floor(easting / CELL_M), floor(northing / CELL_M)); the build scripts
+use the same size.
+"""
+import numpy as np
+
+CELL_M = 100
+
+
+def cell_disc_sql(x: str, y: str, radius: str) -> str:
+    """
+    SELECT of cell_x, cell_y for every cell whose centre lies within `radius`
+    metres of the BNG point (x, y). All three are SQL expressions, so this
+    can be joined LATERAL against a table's own coordinates.
+    """
+    return f"""
+        SELECT gx AS cell_x, gy AS cell_y
+        FROM generate_series(FLOOR(({x} - {radius}) / {CELL_M})::int, FLOOR(({x} + {radius}) / {CELL_M})::int) AS gx,
+             generate_series(FLOOR(({y} - {radius}) / {CELL_M})::int, FLOOR(({y} + {radius}) / {CELL_M})::int) AS gy
+        WHERE ((gx + 0.5) * {CELL_M} - {x}) ^ 2 + ((gy + 0.5) * {CELL_M} - {y}) ^ 2 <= ({radius}) ^ 2
+    """
+
+
+def in_cell_disc_sql(px: str, py: str, x: str, y: str, radius: str) -> str:
+    """
+    SQL condition: the cell containing BNG point (px, py) is one of the
+    cells cell_disc_sql(x, y, radius) selects. Lets a query over raw rows
+    count exactly what the per-cell aggregates do.
+    """
+    return f"""
+        ((FLOOR({px} / {CELL_M}) + 0.5) * {CELL_M} - {x}) ^ 2
+        + ((FLOOR({py} / {CELL_M}) + 0.5) * {CELL_M} - {y}) ^ 2 <= ({radius}) ^ 2
+    """
+
+
+def in_cell_disc(px: np.ndarray, py: np.ndarray, x: float, y: float, radius: float) -> np.ndarray:
+    """in_cell_disc_sql over arrays of BNG points: True where the point's cell centre is within `radius` of (x, y)."""
+    dx = (np.floor(px / CELL_M) + 0.5) * CELL_M - x
+    dy = (np.floor(py / CELL_M) + 0.5) * CELL_M - y
+    return dx * dx + dy * dy <= radius * radius
+
+
+def cells_within_sql(radius: str) -> str:
+    """
+    CTEs `pt` (the query point $1 = lon, $2 = lat in BNG metres) and `cells`
+    (cell_x, cell_y of every cell whose centre lies within `radius` metres
+    of it). `radius` is a SQL expression, e.g. "500" or "$3::float8".
+    """
+    return f"""
+        pt AS (
+            SELECT ST_X(g) AS x, ST_Y(g) AS y
+            FROM ST_Transform(ST_SetSRID(ST_MakePoint($1, $2), 4326), 27700) AS g
+        ),
+        cells AS (
+            SELECT c.cell_x, c.cell_y
+            FROM pt CROSS JOIN LATERAL ({cell_disc_sql("pt.x", "pt.y", radius)}) c
+        )
+    """
+
+
+# WGS84 -> OSGB36 datum shift: the inverse of the +towgs84 Helmert
+# parameters in PostGIS's definition of EPSG:27700 (position vector
+# convention; translations in m, rotations in arc-seconds, scale in ppm).
+_TOWGS84 = (446.448, -125.157, 542.06, 0.15, 0.247, 0.842, -20.489)
+
+_WGS84_A, _WGS84_F = 6378137.0, 1 / 298.257223563
+_AIRY_A, _AIRY_B = 6377563.396, 6356256.909
+
+# National Grid transverse Mercator projection
+_F0 = 0.9996012717
+_LAT0, _LON0 = np.radians(49.0), np.radians(-2.0)
+_E0, _N0 = 400000.0, -100000.0
+
+
+def wgs84_to_bng(lat, lon) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorised WGS84 lat/lon (degrees) -> British National Grid (easting,
+    northing) in metres. This is the same Helmert shift and projection
+    ST_Transform(..., 27700) applies when no OSTN grid is installed, so
+    points land within millimetres of the geom_bng columns.
+    """
+    lat = np.radians(np.asarray(lat, dtype=np.float64))
+    lon = np.radians(np.asarray(lon, dtype=np.float64))
+
+    # Geodetic -> cartesian on the WGS84 ellipsoid (height 0)
+    e2 = _WGS84_F * (2 - _WGS84_F)
+    nu = _WGS84_A / np.sqrt(1 - e2 * np.sin(lat) ** 2)
+    x1 = nu * np.cos(lat) * np.cos(lon)
+    y1 = nu * np.cos(lat) * np.sin(lon)
+    z1 = nu * (1 - e2) * np.sin(lat)
+
+    # Helmert shift to OSGB36 (the inverse transform: every parameter negated)
+    tx, ty, tz, rx, ry, rz, s = _TOWGS84
+    tx, ty, tz = -tx, -ty, -tz
+    rx, ry, rz = (np.radians(-r / 3600) for r in (rx, ry, rz))
+    s = 1 - s * 1e-6
+    x2 = tx + s * x1 - rz * y1 + ry * z1
+    y2 = ty + rz * x1 + s * y1 - rx * z1
+    z2 = tz - ry * x1 + rx * y1 + s * z1
+
+    # Cartesian -> geodetic on the Airy 1830 ellipsoid
+    e2 = 1 - (_AIRY_B / _AIRY_A) ** 2
+    p = np.sqrt(x2 ** 2 + y2 ** 2)
+    lat = np.arctan2(z2, p * (1 - e2))
+    for _ in range(10):
+        nu = _AIRY_A / np.sqrt(1 - e2 * np.sin(lat) ** 2)
+        lat = np.arctan2(z2 + e2 * nu * np.sin(lat), p)
+    lon = np.arctan2(y2, x2)
+
+    # Transverse Mercator (Ordnance Survey formulae)
+    a, b = _AIRY_A, _AIRY_B
+    n = (a - b) / (a + b)
+    sin_lat, cos_lat, tan_lat = np.sin(lat), np.cos(lat), np.tan(lat)
+    nu = a * _F0 / np.sqrt(1 - e2 * sin_lat ** 2)
+    rho = a * _F0 * (1 - e2) / (1 - e2 * sin_lat ** 2) ** 1.5
+    eta2 = nu / rho - 1
+
+    d_lat, s_lat = lat - _LAT0, lat + _LAT0
+    m = b * _F0 * (
+        (1 + n + 1.25 * n ** 2 + 1.25 * n ** 3) * d_lat
+        - (3 * n + 3 * n ** 2 + 2.625 * n ** 3) * np.sin(d_lat) * np.cos(s_lat)
+        + (1.875 * n ** 2 + 1.875 * n ** 3) * np.sin(2 * d_lat) * np.cos(2 * s_lat)
+        - (35 / 24) * n ** 3 * np.sin(3 * d_lat) * np.cos(3 * s_lat)
+    )
+    i = m + _N0
+    ii = nu / 2 * sin_lat * cos_lat
+    iii = nu / 24 * sin_lat * cos_lat ** 3 * (5 - tan_lat ** 2 + 9 * eta2)
+    iiia = nu / 720 * sin_lat * cos_lat ** 5 * (61 - 58 * tan_lat ** 2 + tan_lat ** 4)
+    iv = nu * cos_lat
+    v = nu / 6 * cos_lat ** 3 * (nu / rho - tan_lat ** 2)
+    vi = nu / 120 * cos_lat ** 5 * (
+        5 - 18 * tan_lat ** 2 + tan_lat ** 4 + 14 * eta2 - 58 * tan_lat ** 2 * eta2
+    )
+    d_lon = lon - _LON0
+    northing = i + ii * d_lon ** 2 + iii * d_lon ** 4 + iiia * d_lon ** 6
+    easting = _E0 + iv * d_lon + v * d_lon ** 3 + vi * d_lon ** 5
+    return easting, northing
@@ -0,0 +1,221 @@
+"""
+Inference backends for the approval model.
+
+Every backend loads from one model directory (a registry version, see
+model_registry.py) and exposes predict(X) -> P(approved) per row (float32),
+for a float64 feature matrix in model_registry.FEATURE_COLS order:
+
+  - sklearn: the joblib-pickled XGBClassifier (planning_model.pkl). Each
+    call goes through sklearn's input validation and builds a DMatrix.
+  - booster: the native XGBoost Booster loaded from planning_model.json or
+    .ubj, fed with inplace_predict. No sklearn wrapper and no DMatrix.
+  - numpy: the trees from planning_model.json flattened into arrays and
+    evaluated level by level for every row and tree at once. It does not
+    import xgboost at serve time.
+
+The numpy evaluator follows XGBoost's CPU predictor exactly. Features are
+compared as float32 (`x < split`, NaN takes the default branch). Leaf
+values are summed onto the base margin in tree order in float32. The
+sigmoid is XGBoost's float32 one, with glibc's expf.
+scripts/benchmark_inference.py verifies that all three backends return
+identical probabilities.
+
+ML_BACKEND=auto uses booster when the JSON/UBJ model exists and xgboost is
+installed, numpy when only the JSON model and not xgboost is available,
+and sklearn otherwise.
+"""
+import json
+import math
+from decimal import Decimal, localcontext
+import joblib
+import numpy as np
+from pathlib import Path
+
+BACKENDS = ("sklearn", "booster", "numpy")
+
+
+class SklearnBackend:
+    name = "sklearn"
+
+    def __init__(self, model):
+        self._model = model
+
+    @classmethod
+    def load(cls, model_dir: Path) -> "SklearnBackend":
+        return cls(joblib.load(model_dir / "planning_model.pkl"))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self._model.predict_proba(X)[:, 1]
+
+
+class BoosterBackend:
+    name = "booster"
+
+    def __init__(self, booster):
+        self._booster = booster
+
+    @classmethod
+    def load(cls, model_dir: Path) -> "BoosterBackend":
+        import xgboost
+
+        booster = xgboost.Booster()
+        booster.load_model(str(_native_model_path(model_dir)))
+        return cls(booster)
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self._booster.inplace_predict(X)
+
+
+class NumpyTreeBackend:
+    name = "numpy"
+
+    def __init__(self, model: dict):
+        """`model` is a parsed XGBoost JSON model (binary:logistic, numerical splits only)."""
+        learner = model["learner"]
+        objective = learner["objective"]["name"]
+        if objective != "binary:logistic":
+            raise ValueError(f"numpy backend only supports binary:logistic, not {objective}")
+        trees = learner["gradient_booster"]["model"]["trees"]
+
+        # All trees' nodes in one set of arrays; child indices are made global.
+        # Leaves point to themselves, so extra descent steps leave them in place.
+        offsets = np.cumsum([0] + [len(t["left_children"]) for t in trees])
+        left, right, feature, threshold, default_left = [], [], [], [], []
+        depth = 0
+        for t, offset in zip(trees, offsets):
+            lc = np.asarray(t["left_children"], dtype=np.int64)
+            rc = np.asarray(t["right_children"], dtype=np.int64)
+            if np.any(np.asarray(t.get("split_type", [0] * len(lc))) != 0):
+                raise ValueError("numpy backend does not support categorical splits")
+            is_leaf = lc == -1
+            own = np.arange(len(lc)) + offset
+            left.append(np.where(is_leaf, own, lc + offset))
+            right.append(np.where(is_leaf, own, rc + offset))
+            feature.append(np.where(is_leaf, 0, np.asarray(t["split_indices"], dtype=np.int64)))
+            # For leaves split_conditions holds the leaf value
+            threshold.append(np.asarray(t["split_conditions"], dtype=np.float32))
+            default_left.append(np.asarray(t["default_left"], dtype=bool))
+            depth = max(depth, _tree_depth(lc, rc))
+
+        # children[2 * node + went_left]: right child, then left child
+        self._children = np.stack([np.concatenate(right), np.concatenate(left)], axis=1).ravel().astype(np.int32)
+        self._feature = np.concatenate(feature).astype(np.int32)
+        self._threshold = np.concatenate(threshold)
+        self._default_left = np.concatenate(default_left)
+        self._roots = offsets[:-1].astype(np.int32)
+        self._depth = depth
+        # base_score is a probability; XGBoost starts from -logf(1 / p - 1), all in float32
+        base_score = np.float32(learner["learner_model_param"]["base_score"])
+        self._base_margin = np.float32(-math.log(np.float32(1.0) / base_score - np.float32(1.0)))
+
+    @classmethod
+    def load(cls, model_dir: Path) -> "NumpyTreeBackend":
+        with open(model_dir / "planning_model.json") as f:
+            return cls(json.load(f))
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        n_rows, n_features = X.shape
+        flat = X.ravel()
+        row_base = (np.arange(n_rows, dtype=np.int32) * np.int32(n_features))[:, None]
+        # One node per (row, tree), all descending one level per step
+        node = np.repeat(self._roots[None, :], n_rows, axis=0)
+        for _ in range(self._depth):
+            value = flat.take(row_base + self._feature.take(node))
+            # NaN < split is False, so missing values go left only by default
+            go_left = (value < self._threshold.take(node)) | (np.isnan(value) & self._default_left.take(node))
+            node = self._children.take(2 * node + go_left)
+
+        # base + leaf_0 + leaf_1 + ... in float32, in tree order (cumsum is sequential)
+        leaves = self._threshold.take(node)
+        terms = np.concatenate([np.full((n_rows, 1), self._base_margin, dtype=np.float32), leaves], axis=1)
+        margin = np.cumsum(terms, axis=1, dtype=np.float32)[:, -1]
+        return _sigmoid(margin)
+
+
+def _sigmoid(margin: np.ndarray) -> np.ndarray:
+    """XGBoost's float32 sigmoid: 1 / (expf(min(-x, 88.7)) + 1 + 1e-16)."""
+    x = np.minimum(-margin, np.float32(88.7))
+    denom = _expf(x) + np.float32(1.0) + np.float32(1e-16)
+    return np.float32(1.0) / denom
+
+
+# glibc's expf, which XGBoost calls. It is not correctly rounded, so neither
+# np.exp in float32 nor rounding the float64 exp reproduces it bit for bit:
+# 2^(k/32) from a table times a cubic in the remainder, evaluated in float64.
+_EXP2_BITS = 5
+_N = 1 << _EXP2_BITS
+_SHIFT = float.fromhex("0x1.8p+52")
+_INV_LN2_N = float.fromhex("0x1.71547652b82fep+0") * _N
+_C0 = float.fromhex("0x1.c6af84b912394p-5") / _N / _N / _N
+_C1 = float.fromhex("0x1.ebfce50fac4f3p-3") / _N / _N
+_C2 = float.fromhex("0x1.62e42ff0c52d6p-1") / _N
+_EXPF_UNDERFLOW = np.float32(float.fromhex("-0x1.9fe368p6"))
+
+
+def _exp2_table() -> np.ndarray:
+    # 2^(i/32) correctly rounded to float64, as the glibc table holds them
+    with localcontext() as ctx:
+        ctx.prec = 50
+        values = np.array([float((Decimal(i) / _N * Decimal(2).ln()).exp()) for i in range(_N)])
+    return values.view(np.uint64) - (np.arange(_N, dtype=np.uint64) << np.uint64(52 - _EXP2_BITS))
+
+
+_EXP2_TABLE = _exp2_table()
+
+
+def _expf(x: np.ndarray) -> np.ndarray:
+    # Below the underflow bound expf is 0; clamp so the table arithmetic cannot wrap
+    underflow = x < _EXPF_UNDERFLOW
+    z = _INV_LN2_N * np.maximum(x, _EXPF_UNDERFLOW).astype(np.float64)
+    kd = z + _SHIFT
+    ki = kd.view(np.uint64)
+    r = z - (kd - _SHIFT)
+    s = (_EXP2_TABLE[ki % np.uint64(_N)] + (ki << np.uint64(52 - _EXP2_BITS))).view(np.float64)
+    y = (_C0 * r + _C1) * (r * r) + (_C2 * r + 1.0)
+    return np.where(underflow, np.float32(0.0), (y * s).astype(np.float32))
+
+
+def _tree_depth(left: np.ndarray, right: np.ndarray) -> int:
+    depth, frontier = 0, [0]
+    while True:
+        frontier = [c for n in frontier for c in (left[n], right[n]) if c != -1]
+        if not frontier:
+            return depth
+        depth += 1
+
+
+def _native_model_path(model_dir: Path) -> Path:
+    for name in ("planning_model.ubj", "planning_model.json"):
+        if (model_dir / name).exists():
+            return model_dir / name
+    raise FileNotFoundError(f"no planning_model.ubj or planning_model.json in {model_dir}")
+
+
+def _xgboost_installed() -> bool:
+    try:
+        import xgboost  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def load_backend(kind: str, model_dir: Path):
+    """Load the named backend ("auto" picks one as described above); None if there is no model file for it."""
+    has_json = (model_dir / "planning_model.json").exists()
+    has_native = has_json or (model_dir / "planning_model.ubj").exists()
+    if kind == "auto":
+        if has_native and _xgboost_installed():
+            kind = "booster"
+        elif has_json:
+            kind = "numpy"
+        else:
+            kind = "sklearn"
+
+    if kind == "sklearn":
+        return SklearnBackend.load(model_dir) if (model_dir / "planning_model.pkl").exists() else None
+    if kind == "booster":
+        return BoosterBackend.load(model_dir) if has_native else None
+    if kind == "numpy":
+        return NumpyTreeBackend.load(model_dir) if has_json else None
+    raise ValueError(f"unknown ML backend {kind!r}; expected auto or one of {', '.join(BACKENDS)}")
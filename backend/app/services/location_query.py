@@ -0,0 +1,79 @@
+"""
+Constraints, planning metrics and sales metrics for a point in one round trip.
+
+The individual services each run their own statements (five in total), and
+against a remote database every one pays a pool checkout and a network round
+trip. This composes the same SQL into a single statement returning one row:
+scalar columns for the aggregates plus JSON arrays for the recent
+applications and comparable sales.
+
+asyncpg prepares the statement on first use and keeps it in each
+connection's statement cache, so later calls skip parsing and planning.
+"""
+import json
+import asyncpg
+
+from app.services import constraints, market, planning
+from app.services.constraint_engine import get_engine
+from app.services.constraints import constraints_from_row
+from app.services.planning_store import get_store
+from app.services.planning import RECENT_APPLICATIONS_SQL, PLANNING_RADIUS_M, planning_from_rows
+from app.services.market import COMPARABLE_SALES_SQL, sales_from_rows
+
+
+def location_profile_sql(with_constraints: bool = True, with_planning: bool = True, with_market: bool = True) -> str | None:
+    """
+    Compose the statement from the services' current fragments. Every
+    fragment takes $1 = lon, $2 = lat; the planning aggregate also takes $3 = radius.
+    Sections answered in process (constraint engine, planning and price
+    stores) are left out; None if every section is.
+    """
+    columns, sources = [], []
+    if with_constraints:
+        columns.append("c.*")
+        sources.append(f"({constraints.constraints_sql()}) c")
+    if with_planning:
+        columns += ["pm.*", f"(SELECT COALESCE(json_agg(r), '[]'::json) FROM ({RECENT_APPLICATIONS_SQL}) r) AS recent_applications"]
+        sources.append(f"({planning.metrics_sql()}) pm")
+    if with_market:
+        columns += ["pr.*", f"(SELECT COALESCE(json_agg(s), '[]'::json) FROM ({COMPARABLE_SALES_SQL}) s) AS comparable_sales"]
+        sources.append(f"({market.metrics_sql()}) pr")
+    if not sources:
+        return None
+    return f"""
+        SELECT
+            {", ".join(columns)}
+        FROM
+            {", ".join(sources)}
+    """
+
+
+async def get_location_data(pool: asyncpg.Pool, lat: float, lon: float) -> dict[str, dict]:
+    """Return {"constraints", "planning", "market"} dicts in the shape the individual services return."""
+    engine, planning_store, price_store = get_engine(), get_store(), market.get_price_store()
+    sql = location_profile_sql(engine is None, planning_store is None, price_store is None)
+    row = None
+    if sql is not None:
+        # $3 only appears in the planning aggregate
+        args = (lon, lat) if planning_store is not None else (lon, lat, float(PLANNING_RADIUS_M))
+        try:
+            row = await pool.fetchrow(sql, *args)
+        except asyncpg.UndefinedTableError as e:
+            # An optional aggregate table isn't built yet: retry with its live fragment
+            if not (await constraints.layers_missing(pool) or planning.cells_missing(e) or market.cells_missing(e)):
+                raise
+            return await get_location_data(pool, lat, lon)
+
+    if engine is not None:
+        constraints_data = engine.lookup(lon, lat)
+    else:
+        constraints_data = constraints_from_row(row)
+    if planning_store is not None:
+        planning_data = planning_from_rows(*planning_store.rows(lat, lon, PLANNING_RADIUS_M))
+    else:
+        planning_data = planning_from_rows(row, json.loads(row["recent_applications"]))
+    if price_store is not None:
+        market_data = sales_from_rows(*price_store.rows(lat, lon))
+    else:
+        market_data = sales_from_rows(row, json.loads(row["comparable_sales"]))
+    return {"constraints": constraints_data, "planning": planning_data, "market": market_data}
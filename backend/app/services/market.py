@@ -2,7 +2,20 @@ import asyncio
 import asyncpg
 import base64
 import httpx
+import logging
+from pathlib import Path
 from app.config import settings
+from app.http_clients import get_client
+from app.services.grid import CELL_M, cells_within_sql, in_cell_disc_sql
+from app.services.price_store import PriceStore
+from app.singleflight import coalesce
+
+log = logging.getLogger(__name__)
+
+# Flipped off the first time price_cell_months turns out not to exist
+_cells_available = True
+
+_price_store: PriceStore | None = None
 
 
 def _epc_auth_header() -> str:
@@ -12,83 +25,181 @@ def _epc_auth_header() -> str:
     return f"Basic {encoded}"
 
 
-async def get_market_metrics(pool: asyncpg.Pool, lat: float, lon: float, postcode: str) -> dict:
-    """
-    Fetch avg price per m2, 24-month price trend from Price Paid Data,
-    avg EPC rating from the EPC API, and 5 recent comparable sales.
-    """
-    price_data, epc_rating, comps = await asyncio.gather(
-        _get_price_metrics(pool, lon, lat),
-        _get_epc_rating(postcode),
-        _get_comparable_sales(pool, lon, lat),
+# The price aggregates cover whole calendar months ending with the current
+# one, over the 100 m grid cells whose centre lies within 500m
+# (app/services/grid.py). The price store, the training features and both
+# queries below use this definition.
+
+# From the raw sales, until price_cell_months is built. The 500m radius is
+# in metres on geom_bng (British National Grid) so the GIST index is used;
+# the extra cell width takes in every sale whose cell centre is within it.
+# Averages are integer sums over counts, as the prefix sums give them.
+# $1 = lon, $2 = lat. Also embedded in the combined location query (location_query.py).
+PRICE_METRICS_SQL = f"""
+    WITH pt AS (
+        SELECT g, ST_X(g) AS x, ST_Y(g) AS y, DATE_TRUNC('month', NOW())::date AS m
+        FROM ST_Transform(ST_SetSRID(ST_MakePoint($1, $2), 4326), 27700) AS g
+    ),
+    totals AS (
+        SELECT
+            SUM(p.price::bigint)::float / NULLIF(COUNT(*), 0) AS avg_24,
+            SUM(p.price::bigint) FILTER (WHERE p.sale_date >= pt.m - INTERVAL '11 months')::float /
+                NULLIF(COUNT(*) FILTER (WHERE p.sale_date >= pt.m - INTERVAL '11 months'), 0) AS avg_recent,
+            SUM(p.price::bigint) FILTER (WHERE p.sale_date < pt.m - INTERVAL '11 months')::float /
+                NULLIF(COUNT(*) FILTER (WHERE p.sale_date < pt.m - INTERVAL '11 months'), 0) AS avg_prior
+        FROM price_paid p, pt
+        WHERE ST_DWithin(p.geom_bng, pt.g, {500 + CELL_M})
+          AND {in_cell_disc_sql("ST_X(p.geom_bng)", "ST_Y(p.geom_bng)", "pt.x", "pt.y", "500")}
+          AND p.sale_date >= pt.m - INTERVAL '23 months'
+          AND p.sale_date < pt.m + INTERVAL '1 month'
+          AND p.price IS NOT NULL
     )
-    return {**price_data, "avg_epc_rating": epc_rating, "comparable_sales": comps}
+    SELECT
+        avg_24 / 100.0 AS avg_price_per_m2,
+        (avg_recent - avg_prior) / NULLIF(avg_prior, 0) AS price_trend_24m
+    FROM totals
+"""
 
 
-async def _get_price_metrics(pool: asyncpg.Pool, lon: float, lat: float) -> dict:
-    query = """
-        SELECT
-            AVG(price) / 100.0 AS avg_price_per_m2,
-            (
-                AVG(price) FILTER (WHERE sale_date >= NOW() - INTERVAL '12 months') -
-                AVG(price) FILTER (WHERE sale_date BETWEEN NOW() - INTERVAL '24 months' AND NOW() - INTERVAL '12 months')
-            ) /
-            NULLIF(
-                AVG(price) FILTER (WHERE sale_date BETWEEN NOW() - INTERVAL '24 months' AND NOW() - INTERVAL '12 months'),
-                0
-            ) AS price_trend_24m
-        FROM price_paid
-        WHERE ST_DWithin(
-            geom::geography,
-            ST_SetSRID(ST_MakePoint($1, $2), 4326)::geography,
-            500
-        )
-        AND sale_date >= NOW() - INTERVAL '24 months'
+def _prefix_at(cutoff: str) -> str:
+    """Running totals of the current cell up to and including the month `cutoff`."""
+    return f"""
+        SELECT cum_sales AS n, cum_price_sum AS s
+        FROM price_cell_months m
+        WHERE m.cell_x = cells.cell_x AND m.cell_y = cells.cell_y AND m.month <= {cutoff}
+        ORDER BY m.month DESC
+        LIMIT 1
     """
-    row = await pool.fetchrow(query, lon, lat)
-    return {
-        "avg_price_per_m2": round(float(row["avg_price_per_m2"] or 0.0), 2),
-        "price_trend_24m": round(float(row["price_trend_24m"] or 0.0), 4),
-    }
 
 
-async def _get_comparable_sales(pool: asyncpg.Pool, lon: float, lat: float) -> list[dict]:
-    """Return up to 5 most recent property sales within 500m."""
-    query = """
+# Same columns from the per-cell monthly prefix sums (scripts/build_price_cells.py):
+# each window is the difference of two running totals, so a cell costs three
+# index probes however many sales it has.
+# $1 = lon, $2 = lat
+PRICE_CELL_METRICS_SQL = f"""
+    WITH {cells_within_sql("500")},
+    windows AS (
         SELECT
-            COALESCE(postcode, 'Unknown') AS postcode,
-            price,
-            TO_CHAR(sale_date, 'YYYY-MM-DD') AS sale_date
-        FROM price_paid
-        WHERE ST_DWithin(
-            geom::geography,
-            ST_SetSRID(ST_MakePoint($1, $2), 4326)::geography,
-            500
-        )
-        AND sale_date IS NOT NULL
-        ORDER BY sale_date DESC
-        LIMIT 5
+            COALESCE(hi.n, 0) - COALESCE(lo.n, 0)   AS n_24,
+            COALESCE(hi.s, 0) - COALESCE(lo.s, 0)   AS s_24,
+            COALESCE(hi.n, 0) - COALESCE(mid.n, 0)  AS n_recent,
+            COALESCE(hi.s, 0) - COALESCE(mid.s, 0)  AS s_recent,
+            COALESCE(mid.n, 0) - COALESCE(lo.n, 0)  AS n_prior,
+            COALESCE(mid.s, 0) - COALESCE(lo.s, 0)  AS s_prior
+        FROM cells
+        CROSS JOIN (SELECT DATE_TRUNC('month', NOW())::date AS m) b
+        LEFT JOIN LATERAL ({_prefix_at("b.m")}) hi ON TRUE
+        LEFT JOIN LATERAL ({_prefix_at("b.m - INTERVAL '12 months'")}) mid ON TRUE
+        LEFT JOIN LATERAL ({_prefix_at("b.m - INTERVAL '24 months'")}) lo ON TRUE
+    ),
+    totals AS (
+        SELECT
+            SUM(s_24)::float / NULLIF(SUM(n_24), 0)         AS avg_24,
+            SUM(s_recent)::float / NULLIF(SUM(n_recent), 0) AS avg_recent,
+            SUM(s_prior)::float / NULLIF(SUM(n_prior), 0)   AS avg_prior
+        FROM windows
+    )
+    SELECT
+        avg_24 / 100.0 AS avg_price_per_m2,
+        (avg_recent - avg_prior) / NULLIF(avg_prior, 0) AS price_trend_24m
+    FROM totals
+"""
+
+# Up to 5 most recent property sales within 500m
+COMPARABLE_SALES_SQL = """
+    SELECT
+        COALESCE(postcode, 'Unknown') AS postcode,
+        price,
+        TO_CHAR(sale_date, 'YYYY-MM-DD') AS sale_date
+    FROM price_paid
+    WHERE ST_DWithin(
+        geom_bng,
+        ST_Transform(ST_SetSRID(ST_MakePoint($1, $2), 4326), 27700),
+        500
+    )
+    AND sale_date IS NOT NULL
+    ORDER BY sale_date DESC, id DESC
+    LIMIT 5
+"""
+
+
+async def get_sales_metrics(pool: asyncpg.Pool, lat: float, lon: float) -> dict:
+    """
+    Fetch avg price per m2, 24-month price trend and 5 recent comparable sales
+    from Price Paid Data. The EPC rating is a separate component (get_epc_rating)
+    because it may call the live EPC API. Answered from the memory-mapped
+    price store when it has been exported.
     """
-    rows = await pool.fetch(query, lon, lat)
-    return [
-        {
-            "postcode": row["postcode"],
-            "price": float(row["price"]),
-            "sale_date": row["sale_date"],
-        }
-        for row in rows
-    ]
+    if _price_store is not None:
+        return sales_from_rows(*_price_store.rows(lat, lon))
+    try:
+        price_row, comp_rows = await asyncio.gather(
+            pool.fetchrow(metrics_sql(), lon, lat),
+            pool.fetch(COMPARABLE_SALES_SQL, lon, lat),
+        )
+    except asyncpg.UndefinedTableError as e:
+        if not cells_missing(e):
+            raise
+        return await get_sales_metrics(pool, lat, lon)
+    return sales_from_rows(price_row, comp_rows)
+
+
+def load_price_store():
+    """Map the price_paid column store if it has been exported; otherwise market metrics come from SQL."""
+    global _price_store
+    path = Path(settings.price_store_path)
+    if path.exists():
+        try:
+            _price_store = PriceStore(path)
+        except ValueError as e:
+            log.warning("%s; market metrics via PostGIS", e)
+            return
+        log.info("Loaded price store with %d sales (built %s) from %s", _price_store.count, _price_store.built, path)
+    else:
+        log.info("No price store at %s; market metrics via PostGIS", path)
+
+
+def get_price_store() -> PriceStore | None:
+    return _price_store
+
+
+def metrics_sql() -> str:
+    """The price aggregate query to use: per-cell prefix sums once built, else the same cells from the raw sales."""
+    return PRICE_CELL_METRICS_SQL if _cells_available else PRICE_METRICS_SQL
+
+
+def cells_missing(error: asyncpg.UndefinedTableError) -> bool:
+    """If `error` is about price_cell_months, fall back to the live query for good and return True."""
+    global _cells_available
+    if not _cells_available or "price_cell_months" not in str(error):
+        return False
+    log.warning("price_cell_months not found; run scripts/build_price_cells.py")
+    _cells_available = False
+    return True
+
+
+def sales_from_rows(price_row, comp_rows) -> dict:
+    return {
+        "avg_price_per_m2": round(float(price_row["avg_price_per_m2"] or 0.0), 2),
+        "price_trend_24m": round(float(price_row["price_trend_24m"] or 0.0), 4),
+        "comparable_sales": [
+            {
+                "postcode": r["postcode"],
+                "price": float(r["price"]),
+                "sale_date": r["sale_date"],
+            }
+            for r in comp_rows
+        ],
+    }
 
 
 async def _fetch_epc_rows(client: httpx.AsyncClient, postcode_query: str, headers: dict) -> list:
     """Hit the EPC API for a given postcode string; return rows list (may be empty)."""
-    url = "https://epc.opendatacommunities.org/api/v1/domestic/search"
     try:
         resp = await client.get(
-            url,
+            "/api/v1/domestic/search",
             params={"postcode": postcode_query, "size": 50},
             headers=headers,
-            timeout=10,
         )
         if resp.status_code != 200 or not resp.content:
             return []
@@ -97,39 +208,87 @@ async def _fetch_epc_rows(client: httpx.AsyncClient, postcode_query: str, header
         return []
 
 
-async def _get_epc_rating(postcode: str) -> str:
+_RATING_SCORES = {"A": 7, "B": 6, "C": 5, "D": 4, "E": 3, "F": 2, "G": 1}
+_SCORE_RATINGS = {v: k for k, v in _RATING_SCORES.items()}
+
+# Flipped off the first time the bulk tables turn out not to exist, so an
+# un-ingested database doesn't pay for a failing query on every request.
+_epc_bulk_available = True
+
+
+async def get_epc_rating(pool: asyncpg.Pool, postcode: str) -> str:
     """
-    Fetch average EPC rating from the DLUHC EPC API.
-    Tries the full postcode first; falls back to just the outward code
-    (e.g. 'SW9') if the full postcode returns no certificates.
+    Average EPC rating for a postcode.
+
+    Read from the precomputed bulk tables (scripts/ingest_epc.py) when the
+    postcode or its outward code is there; only postcodes missing from the
+    bulk data go to the live EPC API.
+    """
+    postcode = postcode.strip().upper()
+    rating = await get_bulk_epc_rating(pool, postcode)
+    if rating is not None:
+        return rating
+    return await _get_live_epc_rating(postcode, _outward_code(postcode))
+
+
+async def get_bulk_epc_rating(pool: asyncpg.Pool, postcode: str) -> str | None:
+    """
+    Indexed lookup of the mean rating per full postcode, falling back to the
+    outward code; None if neither is in the bulk tables (or they don't exist).
     """
+    global _epc_bulk_available
+    if not _epc_bulk_available:
+        return None
     postcode = postcode.strip().upper()
-    # outward code = everything before the final space (or last 3 chars stripped)
+    postcode_key, outward = postcode.replace(" ", ""), _outward_code(postcode)
+    query = """
+        SELECT COALESCE(
+            (SELECT mean_score FROM epc_postcode_ratings WHERE postcode = $1),
+            (SELECT mean_score FROM epc_outward_ratings WHERE outward = $2)
+        ) AS mean_score
+    """
+    try:
+        mean_score = await pool.fetchval(query, postcode_key, outward)
+    except asyncpg.UndefinedTableError:
+        _epc_bulk_available = False
+        return None
+    if mean_score is None:
+        return None
+    return _SCORE_RATINGS.get(round(mean_score), "N/A")
+
+
+def _outward_code(postcode: str) -> str:
+    # Everything before the final space (or last 3 chars stripped)
     parts = postcode.split()
-    outward = parts[0] if len(parts) >= 2 else postcode[:-3].strip()
+    return parts[0] if len(parts) >= 2 else postcode[:-3].strip()
+
 
+@coalesce("epc", key=lambda postcode, outward: postcode)
+async def _get_live_epc_rating(postcode: str, outward: str) -> str:
+    """
+    Fetch average EPC rating from the DLUHC EPC API.
+    Tries the full postcode first; falls back to just the outward code
+    (e.g. 'SW9') if the full postcode returns no certificates.
+    """
     headers = {
         "Authorization": _epc_auth_header(),
         "Accept": "application/json",
     }
 
-    rating_map = {"A": 7, "B": 6, "C": 5, "D": 4, "E": 3, "F": 2, "G": 1}
-    reverse_map = {v: k for k, v in rating_map.items()}
-
-    async with httpx.AsyncClient() as client:
-        # 1st attempt: full postcode (e.g. "SW9 8JH")
-        rows = await _fetch_epc_rows(client, postcode, headers)
+    client = get_client("epc")
+    # 1st attempt: full postcode (e.g. "SW9 8JH")
+    rows = await _fetch_epc_rows(client, postcode, headers)
 
-        # 2nd attempt: outward code only (e.g. "SW9") — gives district-level average
-        if not rows:
-            rows = await _fetch_epc_rows(client, outward, headers)
+    # 2nd attempt: outward code only (e.g. "SW9") — gives district-level average
+    if not rows:
+        rows = await _fetch_epc_rows(client, outward, headers)
 
     if not rows:
         return "N/A"
 
-    scores = [rating_map.get(r.get("current-energy-rating", ""), 0) for r in rows]
+    scores = [_RATING_SCORES.get(r.get("current-energy-rating", ""), 0) for r in rows]
     valid = [s for s in scores if s > 0]
     if not valid:
         return "N/A"
     avg = round(sum(valid) / len(valid))
-    return reverse_map.get(avg, "N/A")
+    return _SCORE_RATINGS.get(avg, "N/A")
@@ -1,9 +1,7 @@
-import joblib
 import numpy as np
-from pathlib import Path
 
-_model = None
-MODEL_PATH = Path(__file__).parent.parent.parent / "ml" / "planning_model.pkl"
+from app.services.model_registry import get_active
+from app.services.rounding import round_array
 
 # Risk multipliers for user-provided project parameters
 _APP_TYPE_RISK = {
@@ -25,15 +23,7 @@ _PROPERTY_TYPE_RISK = {
     "land": 0.01,
 }
 
-
-def load_model():
-    global _model
-    if MODEL_PATH.exists():
-        _model = joblib.load(MODEL_PATH)
-
-
-def is_model_loaded() -> bool:
-    return _model is not None
+_EPC_SCORE = {"A": 7, "B": 6, "C": 5, "D": 4, "E": 3, "F": 2, "G": 1, "N/A": 4}
 
 
 def predict_approval(
@@ -58,8 +48,7 @@ def predict_approval(
     Falls back to a rule-based estimate if the model is not yet trained.
     User project parameters adjust the final probability.
     """
-    epc_map = {"A": 7, "B": 6, "C": 5, "D": 4, "E": 3, "F": 2, "G": 1, "N/A": 4}
-    epc_score = epc_map.get(avg_epc_rating, 4)
+    epc_score = _EPC_SCORE.get(avg_epc_rating, 4)
 
     features = np.array([[
         flood_zone,
@@ -74,8 +63,10 @@ def predict_approval(
         epc_score,
     ]])
 
-    if _model is not None:
-        prob = float(_model.predict_proba(features)[0][1])
+    # Read once: a reload may swap the model while this request is scoring
+    model = get_active()
+    if model is not None:
+        prob = float(model.backend.predict(features)[0])
     else:
         # Rule-based fallback until model is trained
         prob = local_approval_rate
@@ -112,3 +103,79 @@ def predict_approval(
     prob = max(0.0, min(1.0, prob))
 
     return round(prob, 4)
+
+
+def predict_approval_batch(
+    flood_zone,
+    in_conservation_area,
+    in_greenbelt,
+    in_article4_zone,
+    local_approval_rate,
+    avg_decision_time_days,
+    similar_applications_nearby,
+    avg_price_per_m2,
+    price_trend_24m,
+    avg_epc_rating,
+    application_type="extension",
+    property_type="semi_detached",
+    num_storeys=1,
+    estimated_floor_area_m2=30.0,
+) -> np.ndarray:
+    """
+    predict_approval over many rows at once. Every argument is a column
+    (array-like) or a scalar applied to every row. One backend predict call
+    scores the whole matrix and the adjustments are NumPy operations in the
+    scalar path's order, so each result equals predict_approval's exactly.
+    """
+    columns = np.broadcast_arrays(
+        np.asarray(flood_zone), np.asarray(in_conservation_area), np.asarray(in_greenbelt),
+        np.asarray(in_article4_zone), np.asarray(local_approval_rate), np.asarray(avg_decision_time_days),
+        np.asarray(similar_applications_nearby), np.asarray(avg_price_per_m2), np.asarray(price_trend_24m),
+        np.asarray(avg_epc_rating, dtype=object), np.asarray(application_type, dtype=object),
+        np.asarray(property_type, dtype=object), np.asarray(num_storeys), np.asarray(estimated_floor_area_m2),
+    )
+    (flood_zone, conservation, greenbelt, article4, approval_rate, decision_days, nearby,
+     price, trend, epc, app_type, prop_type, storeys, area) = (np.atleast_1d(c) for c in columns)
+    conservation = conservation.astype(bool)
+    greenbelt = greenbelt.astype(bool)
+    article4 = article4.astype(bool)
+
+    features = np.column_stack([
+        flood_zone,
+        conservation.astype(int),
+        greenbelt.astype(int),
+        article4.astype(int),
+        approval_rate,
+        decision_days,
+        nearby,
+        price,
+        trend,
+        _lookup(_EPC_SCORE, epc, 4),
+    ]).astype(np.float64)
+
+    model = get_active()
+    if model is not None:
+        prob = model.backend.predict(features).astype(np.float64)
+    else:
+        # Rule-based fallback until model is trained
+        prob = approval_rate.astype(np.float64)
+        prob = prob - np.where(flood_zone == 3, 0.15, np.where(flood_zone == 2, 0.07, 0.0))
+        prob = prob - np.where(conservation, 0.10, 0.0)
+        prob = prob - np.where(greenbelt, 0.12, 0.0)
+        prob = prob - np.where(article4, 0.08, 0.0)
+
+    # ── Apply user project parameter adjustments (same order as predict_approval) ──
+    prob = prob + _lookup(_APP_TYPE_RISK, app_type, 0.0)
+    prob = prob + _lookup(_PROPERTY_TYPE_RISK, prop_type, 0.0)
+    prob = prob - np.where(storeys > 1, (storeys - 1) * 0.04, 0.0)
+    prob = prob - np.where(area > 50, np.minimum(0.10, (area - 50) / 500), 0.0)
+    prob = prob - np.where(conservation & (app_type == "listed_building"), 0.08, 0.0)
+    prob = np.maximum(0.0, np.minimum(1.0, prob))
+
+    return round_array(prob, 4)
+
+
+def _lookup(table: dict, keys: np.ndarray, default):
+    """table.get(key, default) for every key, one dict lookup per distinct key."""
+    distinct, inverse = np.unique(keys.astype(str), return_inverse=True)
+    return np.array([table.get(k, default) for k in distinct.tolist()])[inverse.reshape(keys.shape)]
@@ -0,0 +1,231 @@
+"""
+Versioned registry of approval models, and the model currently serving.
+
+scripts/train_model.py publishes each trained model as a new version:
+
+    ml/registry/
+        CURRENT                   name of the version to serve (optional)
+        20261017T020000Z/
+            planning_model.pkl    sklearn XGBClassifier
+            planning_model.json   native booster (booster / numpy backends)
+            metadata.json         features, AUC, training-data hash, creation time
+
+A version directory is written under a temporary name and renamed into
+place, and CURRENT is replaced in one rename, so a reader never sees a
+half-written model. Without CURRENT the newest version is served; with an
+empty registry, a legacy ml/planning_model.pkl is served as "unversioned".
+
+Loading happens off the event loop: the new version's backend is loaded
+(see inference.py), its feature list checked against FEATURE_COLS and a
+dummy row predicted to warm it, and only then swapped in with one
+assignment. Requests in flight finish on the model they started with and
+nothing waits on the load. If the load fails, the old model keeps serving.
+
+Reloads are triggered by POST /api/v1/admin/model/reload (the worker that
+serves the request) and by a watcher polling the registry every
+ML_WATCH_INTERVAL_SECONDS (every worker). The active version is shown
+on /health and is part of the analysis cache key.
+"""
+import asyncio
+import json
+import logging
+import joblib
+import numpy as np
+from datetime import datetime, timezone
+from pathlib import Path
+
+from app.config import settings
+from app.services.inference import load_backend
+
+log = logging.getLogger(__name__)
+
+MODEL_DIR = Path(__file__).parent.parent.parent / "ml"
+REGISTRY_DIR = MODEL_DIR / "registry"
+CURRENT_FILE = REGISTRY_DIR / "CURRENT"
+UNVERSIONED = "unversioned"
+
+# Model input columns, in order; predict_approval builds its rows the same way
+FEATURE_COLS = [
+    "flood_zone",
+    "in_conservation_area",
+    "in_greenbelt",
+    "in_article4_zone",
+    "local_approval_rate",
+    "avg_decision_time_days",
+    "similar_applications_nearby",
+    "avg_price_per_m2",
+    "price_trend_24m",
+    "epc_score",
+]
+
+_active: "LoadedModel | None" = None
+# Last version that failed to load; the watcher doesn't retry it until CURRENT changes
+_failed_version: str | None = None
+_reload_lock = asyncio.Lock()
+_watcher: asyncio.Task | None = None
+
+
+class LoadedModel:
+    def __init__(self, version: str, backend, metadata: dict):
+        self.version = version
+        self.backend = backend
+        self.metadata = metadata
+
+
+def versions() -> list[str]:
+    """Complete versions in the registry, oldest first (names sort by creation time)."""
+    if not REGISTRY_DIR.is_dir():
+        return []
+    return sorted(
+        d.name for d in REGISTRY_DIR.iterdir()
+        if d.is_dir() and not d.name.startswith(".") and (d / "metadata.json").exists()
+    )
+
+
+def current_version() -> str | None:
+    """The version that should be serving: CURRENT, else the newest, else the legacy model if any."""
+    if CURRENT_FILE.exists():
+        return CURRENT_FILE.read_text().strip()
+    available = versions()
+    if available:
+        return available[-1]
+    return UNVERSIONED if (MODEL_DIR / "planning_model.pkl").exists() else None
+
+
+def version_dir(version: str) -> Path:
+    return MODEL_DIR if version == UNVERSIONED else REGISTRY_DIR / version
+
+
+def read_metadata(version: str) -> dict:
+    if version == UNVERSIONED:
+        return {"version": UNVERSIONED, "features": FEATURE_COLS}
+    with open(version_dir(version) / "metadata.json") as f:
+        return json.load(f)
+
+
+def load_version(version: str) -> LoadedModel:
+    """Load, check and warm one version. Blocking; raises if it cannot serve."""
+    directory = version_dir(version)
+    if not directory.is_dir():
+        raise FileNotFoundError(f"model version {version} not found in {REGISTRY_DIR}")
+    metadata = read_metadata(version)
+    if metadata.get("features") != FEATURE_COLS:
+        raise ValueError(f"model version {version} was trained on {metadata.get('features')}, expected {FEATURE_COLS}")
+    backend = load_backend(settings.ml_backend, directory)
+    if backend is None:
+        raise FileNotFoundError(f"no model file for the {settings.ml_backend} backend in {directory}")
+    # First predict pays for lazy initialisation (thread pools, caches); keep it off the request path
+    backend.predict(np.zeros((1, len(FEATURE_COLS))))
+    return LoadedModel(version, backend, metadata)
+
+
+def load_model() -> None:
+    """Load the current version at startup; the rule-based fallback serves if there is none."""
+    global _active
+    version = current_version()
+    if version is None:
+        log.warning("No trained approval model; using the rule-based fallback")
+        return
+    try:
+        _active = load_version(version)
+    except Exception as e:
+        log.warning("Approval model %s not loaded (%s); using the rule-based fallback", version, e)
+        return
+    log.info("Approval model %s loaded (%s backend)", version, _active.backend.name)
+
+
+async def reload_model(force: bool = False) -> tuple[str | None, str | None]:
+    """
+    Swap in the current version if it differs from the active one and has not
+    already failed to load (or always, with force). Returns (previous version,
+    active version); raises if the new version fails to load, leaving the
+    previous one serving.
+    """
+    global _active, _failed_version
+    async with _reload_lock:
+        previous = _active.version if _active is not None else None
+        version = current_version()
+        if version is None or (version in (previous, _failed_version) and not force):
+            return previous, previous
+        try:
+            model = await asyncio.to_thread(load_version, version)
+        except Exception:
+            _failed_version = version
+            raise
+        _active, _failed_version = model, None
+        log.info("Approval model %s swapped in (was %s, %s backend)", version, previous, model.backend.name)
+        return previous, version
+
+
+def start_watcher() -> None:
+    global _watcher
+    if settings.ml_watch_interval_seconds > 0 and _watcher is None:
+        _watcher = asyncio.create_task(_watch_loop())
+
+
+async def stop_watcher() -> None:
+    global _watcher
+    if _watcher is not None:
+        _watcher.cancel()
+        try:
+            await _watcher
+        except asyncio.CancelledError:
+            pass
+        _watcher = None
+
+
+async def _watch_loop() -> None:
+    while True:
+        await asyncio.sleep(settings.ml_watch_interval_seconds)
+        try:
+            await reload_model()
+        except Exception as e:
+            # Keep serving the active model; this version is skipped until CURRENT changes
+            log.warning("Approval model reload failed: %s", e)
+
+
+def get_active() -> LoadedModel | None:
+    return _active
+
+
+def model_version() -> str | None:
+    return _active.version if _active is not None else None
+
+
+def new_version_name() -> str:
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def write_version(model, metadata: dict, promote: bool = True) -> str:
+    """
+    Publish a trained XGBClassifier as a new version: pickle, native booster
+    and metadata.json (given fields plus version and created_at). With
+    promote, CURRENT is pointed at it so running servers pick it up.
+    """
+    version = new_version_name()
+    final = REGISTRY_DIR / version
+    if final.exists():
+        raise FileExistsError(f"model version {version} already exists")
+    tmp = REGISTRY_DIR / f".{version}.tmp"
+    tmp.mkdir(parents=True)
+    joblib.dump(model, tmp / "planning_model.pkl")
+    model.get_booster().save_model(str(tmp / "planning_model.json"))
+    metadata = {
+        "version": version,
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        **metadata,
+    }
+    (tmp / "metadata.json").write_text(json.dumps(metadata, indent=2) + "\n")
+    # Atomic publish: the version appears complete or not at all
+    tmp.rename(final)
+    if promote:
+        set_current(version)
+    return version
+
+
+def set_current(version: str) -> None:
+    if not (REGISTRY_DIR / version / "metadata.json").exists():
+        raise FileNotFoundError(f"model version {version} not found in {REGISTRY_DIR}")
+    tmp = REGISTRY_DIR / ".CURRENT.tmp"
+    tmp.write_text(version + "\n")
+    tmp.replace(CURRENT_FILE)
@@ -1,47 +1,115 @@
 import asyncio
 import asyncpg
+import logging
 
+from app.services.grid import CELL_M, cells_within_sql, in_cell_disc_sql
+from app.services.planning_store import get_store
 
-async def get_planning_metrics(pool: asyncpg.Pool, lat: float, lon: float, radius_m: int = 500) -> dict:
+log = logging.getLogger(__name__)
+
+# Radius for the approval-rate / decision-time aggregates
+PLANNING_RADIUS_M = 500
+
+# Flipped off the first time planning_cell_months turns out not to exist
+_cells_available = True
+
+# The planning aggregates count the applications decided in whole calendar
+# months from five years ago to date, in the 100 m grid cells whose centre
+# lies within the radius (app/services/grid.py). The store, the training
+# features and both queries below use this definition.
+
+# From the per-cell monthly aggregates (scripts/build_planning_cells.py):
+# an index probe per cell, however many applications are loaded.
+# $1 = lon, $2 = lat, $3 = radius in metres
+PLANNING_CELL_METRICS_SQL = f"""
+    WITH {cells_within_sql("$3::float8")}
+    SELECT
+        SUM(m.approved)::float / NULLIF(SUM(m.applications), 0) AS local_approval_rate,
+        SUM(m.decision_days_sum)::float / NULLIF(SUM(m.decision_days_count), 0) AS avg_decision_time_days,
+        COALESCE(SUM(m.applications), 0)::int AS similar_applications_nearby
+    FROM cells
+    JOIN planning_cell_months m USING (cell_x, cell_y)
+    WHERE m.month >= DATE_TRUNC('month', NOW() - INTERVAL '5 years')
+"""
+
+# The same from the raw applications, until planning_cell_months is built.
+# Radii are metres on geom_bng (British National Grid), which lets ST_DWithin
+# use the GIST index; the extra cell width takes in every application whose
+# cell centre is within the radius, and the cell test then keeps exactly those.
+# $1 = lon, $2 = lat, $3 = radius in metres
+PLANNING_METRICS_SQL = f"""
+    WITH pt AS (
+        SELECT g, ST_X(g) AS x, ST_Y(g) AS y
+        FROM ST_Transform(ST_SetSRID(ST_MakePoint($1, $2), 4326), 27700) AS g
+    )
+    SELECT
+        COUNT(*) FILTER (WHERE a.decision = 'approved')::float /
+            NULLIF(COUNT(*), 0) AS local_approval_rate,
+        AVG(a.decision_days) AS avg_decision_time_days,
+        COUNT(*)::int AS similar_applications_nearby
+    FROM planning_applications a, pt
+    WHERE ST_DWithin(a.geom_bng, pt.g, $3::float8 + {CELL_M})
+      AND {in_cell_disc_sql("ST_X(a.geom_bng)", "ST_Y(a.geom_bng)", "pt.x", "pt.y", "$3::float8")}
+      AND a.decision_date >= DATE_TRUNC('month', NOW() - INTERVAL '5 years')
+"""
+
+# $1 = lon, $2 = lat
+RECENT_APPLICATIONS_SQL = """
+    SELECT
+        COALESCE(reference, 'N/A') AS reference,
+        COALESCE(postcode, 'Unknown') AS postcode,
+        COALESCE(decision, 'unknown') AS decision,
+        TO_CHAR(decision_date, 'YYYY-MM-DD') AS decision_date,
+        COALESCE(application_type, 'Unknown') AS application_type
+    FROM planning_applications
+    WHERE ST_DWithin(
+        geom_bng,
+        ST_Transform(ST_SetSRID(ST_MakePoint($1, $2), 4326), 27700),
+        200
+    )
+    AND decision_date IS NOT NULL
+    ORDER BY decision_date DESC, id DESC
+    LIMIT 5
+"""
+
+
+async def get_planning_metrics(pool: asyncpg.Pool, lat: float, lon: float, radius_m: int = PLANNING_RADIUS_M) -> dict:
     """
     Compute local planning metrics and recent application history from
     historical IBex application data within a given radius (default 500m).
+    Computed in process when the planning store is loaded.
     """
-    metrics_query = """
-        SELECT
-            COUNT(*) FILTER (WHERE decision = 'approved')::float /
-                NULLIF(COUNT(*), 0) AS local_approval_rate,
-            AVG(decision_days) AS avg_decision_time_days,
-            COUNT(*) AS similar_applications_nearby
-        FROM planning_applications
-        WHERE ST_DWithin(
-            geom::geography,
-            ST_SetSRID(ST_MakePoint($1, $2), 4326)::geography,
-            $3
+    store = get_store()
+    if store is not None:
+        return planning_from_rows(*store.rows(lat, lon, radius_m))
+    try:
+        metrics_row, recent_rows = await asyncio.gather(
+            pool.fetchrow(metrics_sql(), lon, lat, float(radius_m)),
+            pool.fetch(RECENT_APPLICATIONS_SQL, lon, lat),
         )
-        AND decision_date >= NOW() - INTERVAL '5 years'
-    """
-    recent_query = """
-        SELECT
-            COALESCE(reference, 'N/A') AS reference,
-            COALESCE(postcode, 'Unknown') AS postcode,
-            COALESCE(decision, 'unknown') AS decision,
-            TO_CHAR(decision_date, 'YYYY-MM-DD') AS decision_date,
-            COALESCE(application_type, 'Unknown') AS application_type
-        FROM planning_applications
-        WHERE ST_DWithin(
-            geom::geography,
-            ST_SetSRID(ST_MakePoint($1, $2), 4326)::geography,
-            200
-        )
-        AND decision_date IS NOT NULL
-        ORDER BY decision_date DESC
-        LIMIT 5
-    """
-    metrics_row, recent_rows = await asyncio.gather(
-        pool.fetchrow(metrics_query, lon, lat, radius_m),
-        pool.fetch(recent_query, lon, lat),
-    )
+    except asyncpg.UndefinedTableError as e:
+        if not cells_missing(e):
+            raise
+        return await get_planning_metrics(pool, lat, lon, radius_m)
+    return planning_from_rows(metrics_row, recent_rows)
+
+
+def metrics_sql() -> str:
+    """The planning aggregate query to use: per-cell aggregates once built, else the same cells from the raw applications."""
+    return PLANNING_CELL_METRICS_SQL if _cells_available else PLANNING_METRICS_SQL
+
+
+def cells_missing(error: asyncpg.UndefinedTableError) -> bool:
+    """If `error` is about planning_cell_months, fall back to the live query for good and return True."""
+    global _cells_available
+    if not _cells_available or "planning_cell_months" not in str(error):
+        return False
+    log.warning("planning_cell_months not found; run scripts/build_planning_cells.py")
+    _cells_available = False
+    return True
+
+
+def planning_from_rows(metrics_row, recent_rows) -> dict:
     return {
         "local_approval_rate": round(float(metrics_row["local_approval_rate"] or 0.0), 4),
         "avg_decision_time_days": round(float(metrics_row["avg_decision_time_days"] or 0.0), 1),
@@ -0,0 +1,207 @@
+"""
+In-process column store of planning_applications for the planning metrics.
+
+The table is small (tens of thousands of rows), so it is held as NumPy
+columns instead of being queried per request: British National Grid x/y,
+decision, decision date and days, plus the text fields the recent
+applications list shows. Rows are sorted by a 500 m grid bucket, so every
+bucket column is one contiguous slice. A radius query reads the few slices
+covering the circle's bounding box and filters them with a vectorised
+distance test.
+
+Metrics follow the SQL in planning.py exactly: decisions in whole months
+from five years ago to date in the 100 m cells whose centre is within the
+radius, as PLANNING_CELL_METRICS_SQL sums them, and the five latest
+decisions within 200 m (RECENT_APPLICATIONS_SQL). Any radius or time window
+costs the same. Query points are converted to BNG in process (grid.wgs84_to_bng).
+
+Loaded at startup when PLANNING_STORE is on and rebuilt every
+PLANNING_STORE_REFRESH_SECONDS; a rebuild swaps in a new store in one
+assignment, so requests never see a half-built one.
+scripts/check_planning_store.py compares it with the SQL path.
+"""
+import asyncio
+import logging
+import numpy as np
+import asyncpg
+from datetime import date, datetime, timedelta, timezone
+
+from app.config import settings
+from app.services.grid import CELL_M, in_cell_disc, wgs84_to_bng
+
+log = logging.getLogger(__name__)
+
+BUCKET_M = 500
+
+RECENT_RADIUS_M = 200
+RECENT_LIMIT = 5
+METRICS_YEARS = 5
+
+# Bucket keys pack (bx, by) into one int64; offset keeps by non-negative
+_BY_OFFSET = 1 << 20
+
+_LOAD_SQL = """
+    SELECT
+        id,
+        ST_X(geom_bng) AS x,
+        ST_Y(geom_bng) AS y,
+        decision,
+        decision_date,
+        decision_days,
+        COALESCE(reference, 'N/A') AS reference,
+        COALESCE(postcode, 'Unknown') AS postcode,
+        COALESCE(application_type, 'Unknown') AS application_type
+    FROM planning_applications
+    WHERE geom_bng IS NOT NULL
+"""
+
+_EPOCH = date(1970, 1, 1)
+
+# decision_date as days since the epoch; rows without one never match a date filter
+_NO_DATE = np.iinfo(np.int32).min
+
+_store: "PlanningStore | None" = None
+_refresher: asyncio.Task | None = None
+
+
+def _bucket_keys(bx: np.ndarray, by: np.ndarray) -> np.ndarray:
+    return (bx.astype(np.int64) << 21) | (by.astype(np.int64) + _BY_OFFSET)
+
+
+class PlanningStore:
+    def __init__(self, rows: list):
+        n = len(rows)
+        x = np.fromiter((r["x"] for r in rows), dtype=np.float64, count=n)
+        y = np.fromiter((r["y"] for r in rows), dtype=np.float64, count=n)
+        keys = _bucket_keys(np.floor(x / BUCKET_M).astype(np.int64), np.floor(y / BUCKET_M).astype(np.int64))
+        order = np.argsort(keys, kind="stable")
+
+        month = np.fromiter(
+            (r["decision_date"].year * 12 + r["decision_date"].month - 1 if r["decision_date"] is not None else _NO_DATE
+             for r in rows),
+            dtype=np.int32, count=n,
+        )
+        day = np.fromiter(
+            ((r["decision_date"] - _EPOCH).days if r["decision_date"] is not None else _NO_DATE for r in rows),
+            dtype=np.int32, count=n,
+        )
+        days = np.fromiter(
+            (r["decision_days"] if r["decision_days"] is not None else np.nan for r in rows),
+            dtype=np.float64, count=n,
+        )
+        self.count = n
+        self.x, self.y = x[order], y[order]
+        self.id = np.fromiter((r["id"] for r in rows), dtype=np.int64, count=n)[order]
+        self.day = day[order]
+        self.month = month[order]
+        self.decision_days = days[order]
+        self.approved = np.fromiter((r["decision"] == "approved" for r in rows), dtype=bool, count=n)[order]
+        # Display fields, only read for the handful of recent applications
+        self.decision = np.array([r["decision"] for r in rows], dtype=object)[order]
+        self.reference = np.array([r["reference"] for r in rows], dtype=object)[order]
+        self.postcode = np.array([r["postcode"] for r in rows], dtype=object)[order]
+        self.application_type = np.array([r["application_type"] for r in rows], dtype=object)[order]
+
+        # Bucket index: the sorted distinct keys and where each one's rows start
+        sorted_keys = keys[order]
+        self._keys, self._starts = np.unique(sorted_keys, return_index=True)
+        self._ends = np.append(self._starts[1:], n)
+
+    def _within(self, x: float, y: float, radius: float) -> np.ndarray:
+        """Row indices within `radius` metres of (x, y)."""
+        bx0, bx1 = int(np.floor((x - radius) / BUCKET_M)), int(np.floor((x + radius) / BUCKET_M))
+        by0, by1 = int(np.floor((y - radius) / BUCKET_M)), int(np.floor((y + radius) / BUCKET_M))
+        # Buckets of one bx column are adjacent in key order, so each column is one row slice
+        bxs = np.arange(bx0, bx1 + 1)
+        lo = np.searchsorted(self._keys, _bucket_keys(bxs, np.full_like(bxs, by0)), side="left")
+        hi = np.searchsorted(self._keys, _bucket_keys(bxs, np.full_like(bxs, by1)), side="right")
+        slices = [np.arange(self._starts[a], self._ends[b - 1]) for a, b in zip(lo, hi) if b > a]
+        if not slices:
+            return np.empty(0, dtype=np.int64)
+        idx = np.concatenate(slices)
+        dx, dy = self.x[idx] - x, self.y[idx] - y
+        return idx[dx * dx + dy * dy <= radius * radius]
+
+    def rows(self, lat: float, lon: float, radius_m: float, today: date | None = None) -> tuple[dict, list[dict]]:
+        """(metrics row, recent application rows) as the SQL path returns them, for planning_from_rows."""
+        x, y = (float(v) for v in wgs84_to_bng(lat, lon))
+        today = today or datetime.now(timezone.utc).date()
+        # month >= DATE_TRUNC('month', NOW() - 5 years)
+        first_month = today.year * 12 + today.month - 1 - 12 * METRICS_YEARS
+
+        # A cell's centre is at most CELL_M / sqrt(2) from its applications
+        idx = self._within(x, y, radius_m + CELL_M)
+        idx = idx[in_cell_disc(self.x[idx], self.y[idx], x, y, radius_m) & (self.month[idx] >= first_month)]
+        count = len(idx)
+        days = self.decision_days[idx]
+        days = days[~np.isnan(days)]
+        metrics_row = {
+            "local_approval_rate": int(self.approved[idx].sum()) / count if count else None,
+            # SUM(decision_days_sum) / SUM(decision_days_count)
+            "avg_decision_time_days": float(days.sum()) / len(days) if len(days) else None,
+            "similar_applications_nearby": count,
+        }
+
+        near = self._within(x, y, RECENT_RADIUS_M)
+        near = near[self.day[near] != _NO_DATE]
+        # ORDER BY decision_date DESC, id DESC
+        near = near[np.lexsort((-self.id[near], -self.day[near].astype(np.int64)))][:RECENT_LIMIT]
+        recent_rows = [
+            {
+                "reference": self.reference[i],
+                "postcode": self.postcode[i],
+                "decision": self.decision[i] or "unknown",
+                "decision_date": (_EPOCH + timedelta(days=int(self.day[i]))).isoformat(),
+                "application_type": self.application_type[i],
+            }
+            for i in near
+        ]
+        return metrics_row, recent_rows
+
+
+async def build_store(pool: asyncpg.Pool) -> PlanningStore:
+    rows = await pool.fetch(_LOAD_SQL)
+    return await asyncio.to_thread(PlanningStore, rows)
+
+
+async def load_store(pool: asyncpg.Pool) -> None:
+    """Build the store if enabled and keep it refreshed in the background."""
+    global _refresher
+    if not settings.planning_store:
+        return
+    await _refresh(pool)
+    if _refresher is None:
+        _refresher = asyncio.create_task(_refresh_loop(pool))
+
+
+async def stop_refresher() -> None:
+    global _refresher
+    if _refresher is not None:
+        _refresher.cancel()
+        try:
+            await _refresher
+        except asyncio.CancelledError:
+            pass
+        _refresher = None
+
+
+async def _refresh(pool: asyncpg.Pool) -> None:
+    global _store
+    try:
+        store = await build_store(pool)
+    except Exception as e:
+        # Keep serving the previous snapshot (or SQL, if there is none)
+        log.warning("Planning store refresh failed: %s", e)
+        return
+    _store = store
+    log.info("Planning store loaded: %d applications in %d buckets", store.count, len(store._keys))
+
+
+async def _refresh_loop(pool: asyncpg.Pool) -> None:
+    while True:
+        await asyncio.sleep(settings.planning_store_refresh_seconds)
+        await _refresh(pool)
+
+
+def get_store() -> PlanningStore | None:
+    return _store
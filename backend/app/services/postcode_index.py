@@ -0,0 +1,119 @@
+"""
+Memory-mapped postcode → location lookup built from the ONS Postcode Directory.
+
+File layout (little-endian):
+    8 bytes   magic b"PPIDX001"
+    4 bytes   header length (uint32)
+    header    JSON: row count, array offsets, district and ward name tables
+    arrays    8-byte aligned:
+                postcodes  S7       sorted, normalised (no space, upper case)
+                lat, lon   float32
+                district   uint16   index into the district table
+                ward       uint16   index into the ward table
+
+Workers mmap the file instead of parsing it, so the OS shares one copy of
+the pages between them and startup is instant. A lookup is a binary search
+over the postcode column.
+
+Build with: python scripts/build_postcode_index.py
+"""
+import json
+import mmap
+import struct
+import numpy as np
+from pathlib import Path
+
+MAGIC = b"PPIDX001"
+
+_COLUMNS = [
+    ("postcodes", "S7"),
+    ("lat", "<f4"),
+    ("lon", "<f4"),
+    ("district", "<u2"),
+    ("ward", "<u2"),
+]
+
+
+class PostcodeIndex:
+    def __init__(self, path: str | Path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != MAGIC:
+            raise ValueError(f"{path} is not a postcode index file")
+        (header_len,) = struct.unpack_from("<I", self._mm, 8)
+        header = json.loads(self._mm[12:12 + header_len])
+
+        self.count: int = header["count"]
+        self.districts: list[str] = header["districts"]
+        self.wards: list[str] = header["wards"]
+        arrays = {
+            name: np.frombuffer(self._mm, dtype=dtype, count=self.count, offset=header["offsets"][name])
+            for name, dtype in _COLUMNS
+        }
+        self._postcodes = arrays["postcodes"]
+        self._lat = arrays["lat"]
+        self._lon = arrays["lon"]
+        self._district = arrays["district"]
+        self._ward = arrays["ward"]
+
+    def lookup(self, postcode: str) -> tuple[float, float, str, str] | None:
+        """Return (lat, lon, district, ward) or None if the postcode is not in the index."""
+        key = postcode.replace(" ", "").upper().encode()
+        if len(key) > 7:
+            return None
+        i = int(np.searchsorted(self._postcodes, key))
+        if i >= self.count or self._postcodes[i] != key:
+            return None
+        # float32 holds ~7 significant digits; round off the widening noise
+        return (
+            round(float(self._lat[i]), 6),
+            round(float(self._lon[i]), 6),
+            self.districts[self._district[i]],
+            self.wards[self._ward[i]],
+        )
+
+
+def write_index(
+    path: str | Path,
+    postcodes: np.ndarray,
+    lat: np.ndarray,
+    lon: np.ndarray,
+    district: np.ndarray,
+    ward: np.ndarray,
+    districts: list[str],
+    wards: list[str],
+) -> None:
+    """Write an index file. `postcodes` must already be normalised; rows are sorted here."""
+    order = np.argsort(postcodes, kind="stable")
+    columns = {
+        "postcodes": postcodes[order].astype("S7"),
+        "lat": lat[order].astype("<f4"),
+        "lon": lon[order].astype("<f4"),
+        "district": district[order].astype("<u2"),
+        "ward": ward[order].astype("<u2"),
+    }
+
+    # Offsets depend on the header length, so size the header with placeholder offsets first
+    header = {"count": len(order), "districts": districts, "wards": wards,
+              "offsets": {name: 0 for name, _ in _COLUMNS}}
+    header_len = len(json.dumps(header).encode()) + 16 * len(_COLUMNS)
+    offset = _align(12 + header_len)
+    for name, _ in _COLUMNS:
+        header["offsets"][name] = offset
+        offset = _align(offset + columns[name].nbytes)
+    header_bytes = json.dumps(header).encode().ljust(header_len)
+
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", header_len))
+        f.write(header_bytes)
+        for name, _ in _COLUMNS:
+            f.seek(header["offsets"][name])
+            f.write(columns[name].tobytes())
+    # Atomic swap so running workers never map a half-written file
+    tmp.replace(path)
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
@@ -0,0 +1,237 @@
+"""
+Memory-mapped column store of price_paid for the market metrics.
+
+File layout (little-endian):
+    8 bytes   magic b"PPSTO002"
+    4 bytes   header length (uint32)
+    header    JSON: row and cell counts, array offsets, build date
+    arrays    8-byte aligned:
+                price       int32    sale price
+                day         int32    sale date as days since 1970-01-01
+                x, y        float32  British National Grid metres
+                id          int32    price_paid.id (tie-break for comparables)
+                gx, gy      int32    grid.CELL_M cell of the sale, from the float64 coordinates
+                postcode    uint32   index into postcodes
+                postcodes   S8       interned postcode strings
+                cell_keys   uint32   Hilbert key of each non-empty cell, ascending
+                cell_starts uint32   first row of each cell, plus the row count
+
+Rows are sorted along a Hilbert curve over CELL_M BNG cells, so the cells
+around a point map to a few contiguous row ranges. A radius query looks up
+the cells covering the circle's bounding box in cell_keys, merges their
+row ranges, and filters those rows with vectorised distance and date tests.
+Metrics follow the SQL in market.py exactly: the price aggregates sum whole
+months ending with the current one over the grid cells whose centre is
+within 500 m, as PRICE_CELL_METRICS_SQL does, and the comparables are the
+latest sales within 500 m (COMPARABLE_SALES_SQL).
+
+Workers mmap the file, so every worker shares one page-cache copy, and
+startup costs nothing. The exporter writes to a temporary file and renames
+it, so a new export is picked up at the next restart.
+
+Build with: python scripts/export_price_store.py
+"""
+import json
+import mmap
+import struct
+import numpy as np
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+
+from app.services import grid
+from app.services.grid import wgs84_to_bng
+
+MAGIC = b"PPSTO002"
+
+CELL_M = 200
+# 2^13 cells of CELL_M per side: 1638 km, enough for all of GB from the BNG origin
+HILBERT_ORDER = 13
+
+RADIUS_M = 500
+COMPARABLES_LIMIT = 5
+
+_ROW_COLUMNS = [
+    ("price", "<i4"),
+    ("day", "<i4"),
+    ("x", "<f4"),
+    ("y", "<f4"),
+    ("id", "<i4"),
+    ("gx", "<i4"),
+    ("gy", "<i4"),
+    ("postcode", "<u4"),
+]
+
+_EPOCH = date(1970, 1, 1)
+
+
+def hilbert_keys(cx: np.ndarray, cy: np.ndarray, order: int = HILBERT_ORDER) -> np.ndarray:
+    """Position of each cell (cx, cy) along a Hilbert curve over a 2^order grid."""
+    n = 1 << order
+    x = np.clip(np.asarray(cx, dtype=np.int64), 0, n - 1)
+    y = np.clip(np.asarray(cy, dtype=np.int64), 0, n - 1)
+    d = np.zeros(np.shape(x), dtype=np.int64)
+    s = n >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant so the curve stays continuous
+        flip = ~ry & rx
+        x = np.where(flip, n - 1 - x, x)
+        y = np.where(flip, n - 1 - y, y)
+        x, y = np.where(~ry, y, x), np.where(~ry, x, y)
+        s >>= 1
+    return d
+
+
+def cell_of(x, y) -> tuple[np.ndarray, np.ndarray]:
+    return (np.floor(np.asarray(x) / CELL_M).astype(np.int64),
+            np.floor(np.asarray(y) / CELL_M).astype(np.int64))
+
+
+class PriceStore:
+    def __init__(self, path: str | Path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._mm[:8] != MAGIC:
+            raise ValueError(f"{path} is not a price store file in this format; re-run scripts/export_price_store.py")
+        (header_len,) = struct.unpack_from("<I", self._mm, 8)
+        header = json.loads(self._mm[12:12 + header_len])
+
+        self.count: int = header["count"]
+        self.built: str = header["built"]
+        offsets = header["offsets"]
+        for name, dtype in _ROW_COLUMNS:
+            setattr(self, f"_{name}", np.frombuffer(self._mm, dtype=dtype, count=self.count, offset=offsets[name]))
+        self._postcodes = np.frombuffer(self._mm, dtype="S8", count=header["postcodes"], offset=offsets["postcodes"])
+        self._cell_keys = np.frombuffer(self._mm, dtype="<u4", count=header["cells"], offset=offsets["cell_keys"])
+        self._cell_starts = np.frombuffer(self._mm, dtype="<u4", count=header["cells"] + 1, offset=offsets["cell_starts"])
+
+    def _within(self, x: float, y: float, radius: float) -> np.ndarray:
+        """Row indices within `radius` metres of (x, y)."""
+        (cx0, cx1), (cy0, cy1) = cell_of([x - radius, x + radius], [y - radius, y + radius])
+        gx, gy = np.meshgrid(np.arange(cx0, cx1 + 1), np.arange(cy0, cy1 + 1))
+        keys = np.sort(hilbert_keys(gx.ravel(), gy.ravel()))
+
+        # Positions of the non-empty cells among them (ascending, as keys are)
+        pos = np.searchsorted(self._cell_keys, keys)
+        found = pos < len(self._cell_keys)
+        found[found] = self._cell_keys[pos[found]] == keys[found]
+        pos = pos[found]
+        if not len(pos):
+            return np.empty(0, dtype=np.int64)
+
+        # Cells adjacent in key order have adjacent rows: merge them into runs
+        breaks = np.flatnonzero(np.diff(pos) != 1) + 1
+        run_first = np.concatenate(([pos[0]], pos[breaks]))
+        run_last = np.concatenate((pos[breaks - 1], [pos[-1]]))
+        idx = np.concatenate([
+            np.arange(self._cell_starts[a], self._cell_starts[b + 1], dtype=np.int64)
+            for a, b in zip(run_first, run_last)
+        ])
+        dx = self._x[idx].astype(np.float64) - x
+        dy = self._y[idx].astype(np.float64) - y
+        return idx[dx * dx + dy * dy <= radius * radius]
+
+    def rows(self, lat: float, lon: float, today: date | None = None) -> tuple[dict, list[dict]]:
+        """(price row, comparable rows) as the SQL path returns them, for sales_from_rows."""
+        x, y = (float(v) for v in wgs84_to_bng(lat, lon))
+        today = today or datetime.now(timezone.utc).date()
+        # Months since 1970-01 of DATE_TRUNC('month', NOW()), the last month of every window
+        this_month = (today.year - 1970) * 12 + today.month - 1
+
+        # A cell's centre is at most grid.CELL_M / sqrt(2) from its sales
+        near = self._within(x, y, RADIUS_M + grid.CELL_M)
+        cx = (self._gx[near] + 0.5) * grid.CELL_M - x
+        cy = (self._gy[near] + 0.5) * grid.CELL_M - y
+        cells = near[cx * cx + cy * cy <= RADIUS_M * RADIUS_M]
+        month = self._day[cells].astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+        price = self._price[cells].astype(np.int64)
+        # Prefix sums at this month, 12 and 24 months back: hi - lo, hi - mid, mid - lo
+        in_24 = (month > this_month - 24) & (month <= this_month)
+        recent = in_24 & (month > this_month - 12)
+        prior = in_24 & ~recent
+        avg_24 = _mean(price[in_24])
+        avg_recent, avg_prior = _mean(price[recent]), _mean(price[prior])
+        trend = None
+        if avg_recent is not None and avg_prior:
+            trend = (avg_recent - avg_prior) / avg_prior
+        price_row = {
+            "avg_price_per_m2": avg_24 / 100.0 if avg_24 is not None else None,
+            "price_trend_24m": trend,
+        }
+
+        dx = self._x[near].astype(np.float64) - x
+        dy = self._y[near].astype(np.float64) - y
+        near = near[dx * dx + dy * dy <= RADIUS_M * RADIUS_M]
+        day = self._day[near]
+        # ORDER BY sale_date DESC, id DESC LIMIT 5
+        top = near[np.lexsort((-self._id[near].astype(np.int64), -day.astype(np.int64)))][:COMPARABLES_LIMIT]
+        comp_rows = [
+            {
+                "postcode": self._postcodes[self._postcode[i]].decode() or "Unknown",
+                "price": int(self._price[i]),
+                "sale_date": (_EPOCH + timedelta(days=int(self._day[i]))).isoformat(),
+            }
+            for i in top
+        ]
+        return price_row, comp_rows
+
+
+def _mean(values: np.ndarray) -> float | None:
+    return float(values.sum()) / len(values) if len(values) else None
+
+
+def write_store(
+    path: str | Path,
+    price: np.ndarray,
+    day: np.ndarray,
+    x: np.ndarray,
+    y: np.ndarray,
+    ids: np.ndarray,
+    postcode: np.ndarray,
+    postcodes: list[str],
+) -> None:
+    """Write a store file. Rows are sorted into Hilbert order and the cell index built here."""
+    keys = hilbert_keys(*cell_of(x, y))
+    order = np.lexsort((day, keys))
+    keys = keys[order]
+    cell_keys, cell_starts = np.unique(keys, return_index=True)
+    columns = {
+        "price": price[order].astype("<i4"),
+        "day": day[order].astype("<i4"),
+        "x": x[order].astype("<f4"),
+        "y": y[order].astype("<f4"),
+        "id": ids[order].astype("<i4"),
+        "gx": np.floor(x[order] / grid.CELL_M).astype("<i4"),
+        "gy": np.floor(y[order] / grid.CELL_M).astype("<i4"),
+        "postcode": postcode[order].astype("<u4"),
+        "postcodes": np.array(postcodes, dtype="S8"),
+        "cell_keys": cell_keys.astype("<u4"),
+        "cell_starts": np.append(cell_starts, len(order)).astype("<u4"),
+    }
+
+    # Offsets depend on the header length, so size the header with placeholder offsets first
+    header = {"count": len(order), "postcodes": len(postcodes), "cells": len(cell_keys),
+              "built": date.today().isoformat(), "offsets": {name: 0 for name in columns}}
+    header_len = len(json.dumps(header).encode()) + 16 * len(columns)
+    offset = _align(12 + header_len)
+    for name, array in columns.items():
+        header["offsets"][name] = offset
+        offset = _align(offset + array.nbytes)
+    header_bytes = json.dumps(header).encode().ljust(header_len)
+
+    tmp = Path(f"{path}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", header_len))
+        f.write(header_bytes)
+        for name, array in columns.items():
+            f.seek(header["offsets"][name])
+            f.write(array.tobytes())
+    # Atomic swap so running workers never map a half-written file
+    tmp.replace(path)
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
@@ -1,11 +1,22 @@
-import httpx
+import asyncpg
+import logging
 import math
+from app.cache import overpass_tiles
+from app.cache.tiles import TileCell
+from app.config import settings
+from app.http_clients import get_client
+from app.singleflight import coalesce
 
-_OVERPASS_URL = "https://overpass-api.de/api/interpreter"
+log = logging.getLogger(__name__)
 
-# Radius in metres for the Overpass query
+_OVERPASS_PATH = "/api/interpreter"
+
+# Search radius in metres
 _RADIUS_M = 1200  # ~0.75 miles
 
+# Flipped off the first time the schools table turns out not to exist
+_schools_table_available = True
+
 
 def _haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     R = 6_371_000
@@ -52,36 +63,98 @@ def _school_phase(school_tag: str, isced: str) -> str:
     return ""
 
 
-async def get_nearby_schools(lat: float, lon: float) -> list[dict]:
+@coalesce("overpass", key=lambda cell: cell.key)
+async def _fetch_cell_schools(cell: TileCell) -> list[dict] | None:
     """
-    Fetch up to 5 nearby schools using the OpenStreetMap Overpass API.
-    Returns real school data (name, type, distance) sorted by phase then distance.
-    Note: Ofsted ratings are not available from OSM — to add them, load the DfE
-    GIAS dataset into the schools table and enable the PostGIS query path.
+    Overpass schools for a geohash cell: queried around the cell centre with
+    the radius padded by the cell half-diagonal, so it covers the radius
+    around any point in the cell. Concurrent callers in one cell share the
+    request, and the result is cached here rather than by the caller so it
+    still lands if the caller gave up waiting. None on failure (not cached).
     """
+    radius = _RADIUS_M + math.ceil(cell.half_diagonal_m)
     query = (
         f"[out:json][timeout:12];"
         f"("
-        f'node["amenity"="school"](around:{_RADIUS_M},{lat},{lon});'
-        f'way["amenity"="school"](around:{_RADIUS_M},{lat},{lon});'
+        f'node["amenity"="school"](around:{radius},{cell.lat},{cell.lon});'
+        f'way["amenity"="school"](around:{radius},{cell.lat},{cell.lon});'
         f");"
         f"out center tags;"
     )
-
     try:
-        async with httpx.AsyncClient() as client:
-            resp = await client.post(
-                _OVERPASS_URL,
-                data={"data": query},
-                timeout=14,
-            )
-            if resp.status_code != 200:
-                return []
-            data = resp.json()
+        resp = await get_client("overpass").post(_OVERPASS_PATH, data={"data": query})
+        if resp.status_code != 200:
+            return None
+        elements = resp.json().get("elements", [])
     except Exception:
-        return []
+        return None
+    overpass_tiles.set(cell, elements)
+    return elements
 
-    elements = data.get("elements", [])
+
+async def get_nearby_schools(pool: asyncpg.Pool, lat: float, lon: float) -> list[dict]:
+    """
+    Fetch up to 5 nearby schools (name, type, Ofsted rating, distance) sorted
+    by phase then distance.
+
+    Served from the GIAS schools table (scripts/ingest_schools.py) with an
+    indexed radius query. Until that table is loaded, falls back to the Overpass API if
+    schools_overpass_fallback is enabled.
+    """
+    global _schools_table_available
+    if _schools_table_available:
+        try:
+            return await get_gias_schools(pool, lat, lon)
+        except asyncpg.UndefinedTableError:
+            log.warning("schools table not found; run scripts/ingest_schools.py")
+            _schools_table_available = False
+    if settings.schools_overpass_fallback:
+        return await _get_overpass_schools(lat, lon)
+    return []
+
+
+async def get_gias_schools(pool: asyncpg.Pool, lat: float, lon: float) -> list[dict]:
+    """
+    Every school within _RADIUS_M (ST_DWithin uses the GIST index on
+    geom_bng), then the five first by phase and distance. A radius holds a
+    few dozen establishments at most, so sorting all of them is cheap and no
+    in-range school of an earlier phase is missed. Distances are metres in
+    British National Grid.
+    """
+    query = """
+        WITH pt AS (
+            SELECT ST_Transform(ST_SetSRID(ST_MakePoint($1, $2), 4326), 27700) AS geom
+        )
+        SELECT s.name, s.type, s.ofsted_rating, ROUND(ST_Distance(s.geom_bng, pt.geom))::int AS distance_m
+        FROM schools s, pt
+        WHERE ST_DWithin(s.geom_bng, pt.geom, $3)
+        ORDER BY s.phase_order, ST_Distance(s.geom_bng, pt.geom)
+        LIMIT 5
+    """
+    rows = await pool.fetch(query, lon, lat, _RADIUS_M)
+    return [
+        {
+            "name": r["name"],
+            "type": r["type"],
+            "ofsted_rating": r["ofsted_rating"],
+            "distance_m": r["distance_m"],
+        }
+        for r in rows
+    ]
+
+
+async def _get_overpass_schools(lat: float, lon: float) -> list[dict]:
+    """
+    Fetch up to 5 nearby schools using the OpenStreetMap Overpass API.
+    Ofsted ratings are not available from OSM, so they come back as "N/A".
+
+    Results are cached per geohash cell (see _fetch_cell_schools); distances
+    are computed exactly for this caller.
+    """
+    cell = overpass_tiles.cell(lat, lon)
+    elements = overpass_tiles.get(cell)
+    if elements is None:
+        elements = await _fetch_cell_schools(cell)
     if not elements:
         return []
 
@@ -99,6 +172,8 @@ async def get_nearby_schools(lat: float, lon: float) -> list[dict]:
             dist_m = _haversine_m(lat, lon, float(s_lat), float(s_lon))
         except (TypeError, ValueError):
             continue
+        if dist_m > _RADIUS_M:
+            continue   # inside the padded cell query but outside this caller's radius
 
         school_type = _school_type(tags)
 
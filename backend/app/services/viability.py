@@ -1,3 +1,8 @@
+import numpy as np
+
+from app.services.rounding import round_array
+
+
 def compute_viability(
     approval_probability: float,
     flood_zone: int,
@@ -63,11 +68,74 @@ def compute_viability(
     raw = base_score - constraint_penalty - flood_penalty - project_complexity_penalty + market_strength_bonus
     viability_score = round(max(0.0, min(100.0, raw)), 1)
 
+    # Penalties are reported as negatives; + 0.0 keeps a zero (or one that rounds to zero) from being -0.0
     breakdown = {
         "base_score": round(base_score, 2),
-        "constraint_penalty": -round(constraint_penalty, 2) if constraint_penalty else 0,
-        "flood_penalty": -round(flood_penalty, 2) if flood_penalty else 0,
+        "constraint_penalty": -round(constraint_penalty, 2) + 0.0,
+        "flood_penalty": -round(flood_penalty, 2) + 0.0,
+        "market_strength_bonus": market_strength_bonus,
+        "project_complexity_penalty": -round(project_complexity_penalty, 2) + 0.0,
+    }
+    return viability_score, breakdown
+
+
+def compute_viability_batch(
+    approval_probability,
+    flood_zone,
+    in_conservation_area,
+    in_greenbelt,
+    in_article4_zone,
+    avg_price_per_m2,
+    price_trend_24m,
+    application_type="extension",
+    num_storeys=1,
+    estimated_floor_area_m2=30.0,
+) -> tuple[np.ndarray, dict[str, np.ndarray]]:
+    """
+    compute_viability over many rows at once. Every argument is a column
+    (array-like) or a scalar applied to every row. Returns the scores and
+    the breakdown as one array per key; row i equals compute_viability's
+    result for row i exactly (terms are combined in the same order).
+    """
+    columns = np.broadcast_arrays(
+        np.asarray(approval_probability, dtype=np.float64), np.asarray(flood_zone),
+        np.asarray(in_conservation_area), np.asarray(in_greenbelt), np.asarray(in_article4_zone),
+        np.asarray(avg_price_per_m2, dtype=np.float64), np.asarray(price_trend_24m, dtype=np.float64),
+        np.asarray(application_type, dtype=object), np.asarray(num_storeys), np.asarray(estimated_floor_area_m2),
+    )
+    (prob, flood_zone, conservation, greenbelt, article4,
+     price, trend, app_type, storeys, area) = (np.atleast_1d(c) for c in columns)
+
+    base_score = prob * 80
+
+    constraint_penalty = (
+        np.where(conservation.astype(bool), 8.0, 0.0)
+        + np.where(greenbelt.astype(bool), 10.0, 0.0)
+        + np.where(article4.astype(bool), 5.0, 0.0)
+    )
+    flood_penalty = np.where(flood_zone == 3, 12.0, np.where(flood_zone == 2, 6.0, 0.0))
+
+    project_complexity_penalty = np.where(area > 100, np.minimum(8.0, (area - 100) / 50), 0.0)
+    project_complexity_penalty = project_complexity_penalty + np.where(storeys > 1, (storeys - 1) * 3, 0)
+    project_complexity_penalty = project_complexity_penalty + np.select(
+        [app_type == "new_build", app_type == "change_of_use", app_type == "listed_building", app_type == "demolition"],
+        [5.0, 4.0, 7.0, 6.0],
+        0.0,
+    )
+
+    price_bonus = np.minimum(15.0, price / 500)
+    trend_bonus = np.minimum(5.0, np.maximum(0.0, trend * 50))
+    market_strength_bonus = round_array(price_bonus + trend_bonus, 2)
+
+    raw = base_score - constraint_penalty - flood_penalty - project_complexity_penalty + market_strength_bonus
+    viability_score = round_array(np.maximum(0.0, np.minimum(100.0, raw)), 1)
+
+    # As in compute_viability: no -0.0 penalties
+    breakdown = {
+        "base_score": round_array(base_score, 2),
+        "constraint_penalty": -round_array(constraint_penalty, 2) + 0.0,
+        "flood_penalty": -round_array(flood_penalty, 2) + 0.0,
         "market_strength_bonus": market_strength_bonus,
-        "project_complexity_penalty": -round(project_complexity_penalty, 2) if project_complexity_penalty else 0,
+        "project_complexity_penalty": -round_array(project_complexity_penalty, 2) + 0.0,
     }
     return viability_score, breakdown
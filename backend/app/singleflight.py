@@ -0,0 +1,71 @@
+"""
+In-flight de-duplication ("single-flight") for concurrent identical calls.
+
+When a shared link goes out, many requests for the same postcode arrive
+within seconds. Callers that ask for a key already being fetched await the
+running call instead of starting their own, so the DB pool and upstream
+APIs see one request per key at a time. Nothing is cached once the call
+finishes — that is the cache's job.
+"""
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Hashable
+
+_groups: dict[str, "SingleFlight"] = {}
+
+
+class SingleFlight:
+    """A named group of in-flight calls keyed by an arbitrary hashable."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self._inflight: dict[Hashable, asyncio.Task] = {}
+        self.calls = 0   # executions actually started
+        self.saved = 0   # callers that joined an execution instead
+        _groups[name] = self
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        task = self._inflight.get(key)
+        if task is not None:
+            self.saved += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            # Clear the slot when the call finishes, not when the first caller
+            # returns — it may be cancelled while others are still waiting.
+            task.add_done_callback(lambda t: self._release(key, t))
+        # Shield so one cancelled caller doesn't cancel the call for everyone
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict[str, int]:
+        return {"calls": self.calls, "saved": self.saved, "in_flight": len(self._inflight)}
+
+    def _release(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        if not task.cancelled():
+            task.exception()  # mark retrieved so an error nobody awaited isn't logged
+
+
+def coalesce(name: str, key: Callable[..., Hashable] | None = None):
+    """
+    Decorate an async function so concurrent calls with the same key share one execution.
+    The key defaults to the positional and keyword arguments.
+    """
+    group = SingleFlight(name)
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            k = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            return await group.do(k, lambda: fn(*args, **kwargs))
+
+        wrapper.flight = group
+        return wrapper
+
+    return decorator
+
+
+def stats() -> dict[str, dict[str, int]]:
+    return {name: group.stats() for name, group in _groups.items()}
@@ -0,0 +1,71 @@
+"""
+Add British National Grid (EPSG:27700) point columns to planning_applications
+and price_paid, backfill them from geom, and index them.
+
+Radius queries use ST_DWithin on geom_bng in metres, which can use a GIST
+index; ST_DWithin on geom::geography casts every row and can't. Fresh loads
+via setup_db.py / ingest_ibex.py / ingest_price_paid.py populate geom_bng
+already — this is for databases loaded before the column existed.
+
+Safe to re-run: only rows with a NULL geom_bng are updated.
+
+Usage:
+    python scripts/add_bng_geometry.py
+    python scripts/add_bng_geometry.py --batch 200000
+"""
+import argparse
+import asyncio
+import asyncpg
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_URL = os.environ["DATABASE_URL"]
+
+TABLES = {
+    "planning_applications": "planning_apps_geom_bng_idx",
+    "price_paid": "price_paid_geom_bng_idx",
+}
+
+
+async def backfill(conn: asyncpg.Connection, table: str, index: str, batch: int):
+    await conn.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS geom_bng GEOMETRY(Point, 27700)")
+
+    lo, hi = await conn.fetchrow(f"SELECT MIN(id), MAX(id) FROM {table}")
+    if lo is None:
+        print(f"{table}: empty, skipping")
+        return
+
+    print(f"{table}: backfilling ids {lo:,}–{hi:,} in batches of {batch:,}...")
+    updated = 0
+    # Id-range batches keep each transaction (and its WAL) small on price_paid
+    for start in range(lo, hi + 1, batch):
+        result = await conn.execute(f"""
+            UPDATE {table}
+            SET geom_bng = ST_Transform(geom, 27700)
+            WHERE id >= $1 AND id < $2
+              AND geom IS NOT NULL
+              AND geom_bng IS NULL
+        """, start, start + batch)
+        updated += int(result.split()[-1])
+        print(f"  {min(start + batch - 1, hi):,}/{hi:,}  ({updated:,} rows updated)")
+
+    print(f"{table}: building {index}...")
+    await conn.execute(f"CREATE INDEX IF NOT EXISTS {index} ON {table} USING GIST (geom_bng)")
+    await conn.execute(f"ANALYZE {table}")
+
+
+async def run(batch: int):
+    conn = await asyncpg.connect(DB_URL)
+    for table, index in TABLES.items():
+        await backfill(conn, table, index, batch)
+    await conn.close()
+    print("BNG geometry backfill complete.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=100_000, help="Rows per UPDATE (by id range)")
+    args = parser.parse_args()
+    asyncio.run(run(args.batch))
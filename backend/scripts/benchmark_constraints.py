@@ -0,0 +1,128 @@
+"""
+Benchmark the constraint point lookups: ST_Contains on the raw layers
+(before) against ST_Intersects on the subdivided copies and the dissolved
+flood coverage (after).
+
+Sample points are the locations of random price_paid rows. Each layer's
+probe runs --runs times per point for each variant and the median latency
+per point is reported as p50 / p95 / mean across points, with the number
+of points whose answer differs between variants (expected 0, apart from
+points lying exactly on a feature boundary).
+
+Requires scripts/subdivide_layers.py and scripts/build_flood_coverage.py
+(or fresh ingests) to have built the *_subdivided tables and flood_coverage.
+A flood point on the boundary between two bands can legitimately differ.
+
+Usage:
+    python scripts/benchmark_constraints.py
+    python scripts/benchmark_constraints.py --sample 200 --runs 5 --explain
+"""
+import argparse
+import asyncio
+import asyncpg
+import os
+import statistics
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_URL = os.environ["DATABASE_URL"]
+
+_POINT = "ST_SetSRID(ST_MakePoint($1, $2), 4326)"
+_EXISTS = f"SELECT EXISTS(SELECT 1 FROM {{table}} WHERE {{test}}(geom, {_POINT}))"
+
+# layer -> (table the "after" variant reads, before sql, after sql)
+PROBES = {
+    "flood_zones": ("flood_coverage", f"""
+        SELECT zone_number FROM flood_zones
+        WHERE ST_Contains(geom, {_POINT})
+        ORDER BY zone_number DESC LIMIT 1
+    """, f"""
+        SELECT MAX(zone_number) FROM flood_coverage
+        WHERE ST_Intersects(geom, {_POINT})
+    """),
+    **{
+        layer: (
+            f"{layer}_subdivided",
+            _EXISTS.format(table=layer, test="ST_Contains"),
+            _EXISTS.format(table=f"{layer}_subdivided", test="ST_Intersects"),
+        )
+        for layer in ("conservation_areas", "greenbelt_areas", "article4_zones")
+    },
+}
+
+
+async def _time(conn: asyncpg.Connection, sql: str, lon: float, lat: float, runs: int) -> tuple[float, object]:
+    timings, value = [], None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        value = await conn.fetchval(sql, lon, lat)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings), value
+
+
+def _pct(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def run(sample: int, runs: int, explain: bool):
+    conn = await asyncpg.connect(DB_URL)
+    points = await conn.fetch("""
+        SELECT ST_X(geom) AS lon, ST_Y(geom) AS lat
+        FROM price_paid TABLESAMPLE SYSTEM (1)
+        WHERE geom IS NOT NULL
+        ORDER BY random()
+        LIMIT $1
+    """, sample)
+    print(f"Benchmarking {len(points)} points, {runs} runs each (median per point)\n")
+
+    print(f"{'layer':<22}{'variant':<8}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'differ':>9}")
+    for layer, (after_table, before, after) in PROBES.items():
+        missing = [
+            t for t in (layer, after_table)
+            if not await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", t)
+        ]
+        if missing:
+            print(f"{layer:<22}skipped: {', '.join(missing)} not found\n")
+            continue
+
+        variants = {"before": before, "after": after}
+        if explain:
+            p = points[0]
+            for label, sql in variants.items():
+                plan = await conn.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", p["lon"], p["lat"])
+                print(f"\n-- {layer} / {label}")
+                print("\n".join(r[0] for r in plan))
+            print()
+
+        latencies = {label: [] for label in variants}
+        differ = 0
+        for p in points:
+            results = {}
+            for label, sql in variants.items():
+                ms, value = await _time(conn, sql, p["lon"], p["lat"], runs)
+                latencies[label].append(ms)
+                results[label] = value
+            if results["before"] != results["after"]:
+                differ += 1
+
+        for label, values in latencies.items():
+            print(
+                f"{layer:<22}{label:<8}{_pct(values, 0.5):>10.2f}{_pct(values, 0.95):>10.2f}"
+                f"{statistics.mean(values):>10.2f}{(differ if label == 'after' else ''):>9}"
+            )
+        speedup = statistics.mean(latencies["before"]) / max(statistics.mean(latencies["after"]), 1e-9)
+        print(f"{'':<22}{'speedup':<8}{speedup:>9.1f}x\n")
+
+    await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sample", type=int, default=100, help="Number of sample points")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per probe per point")
+    parser.add_argument("--explain", action="store_true", help="Print EXPLAIN ANALYZE for the first point")
+    args = parser.parse_args()
+    asyncio.run(run(args.sample, args.runs, args.explain))
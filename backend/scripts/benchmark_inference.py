@@ -0,0 +1,131 @@
+"""
+Benchmark the approval-model inference backends (app/services/inference.py):
+sklearn (pickled XGBClassifier), booster (native XGBoost, inplace_predict)
+and numpy (pure-NumPy trees).
+
+Scores the same random feature rows through every backend and requires
+their probabilities to be identical to the sklearn backend's (bit for bit).
+Then reports, per backend:
+    load     cold start in a fresh interpreter: imports plus loading the model
+    single   median latency of a one-row predict (the /analyze and what-if path)
+    batch    rows/s for --batch rows per predict call
+
+Uses the current model version in ml/registry, or with --synthetic or no
+trained model, a 300-tree depth-5 model fitted on random data. Either way
+the model files are written to a temporary directory (the registry version
+is copied, with planning_model.json exported if it has none), so the
+registry is never modified. About
+5% of the price and trend features are NaN, to exercise the missing-value
+branches. Needs xgboost; no database. Exits non-zero on any mismatch.
+
+Usage:
+    python scripts/benchmark_inference.py
+    python scripts/benchmark_inference.py --synthetic --rows 20000 --runs 500
+"""
+import argparse
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import joblib
+import numpy as np
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.services import model_registry  # noqa: E402
+from app.services.inference import BACKENDS, load_backend  # noqa: E402
+from check_batch_scoring import feature_matrix, random_rows, synthetic_model  # noqa: E402
+
+BACKEND_DIR = Path(__file__).parent.parent
+
+_COLD_LOAD = """
+import sys, time
+t0 = time.perf_counter()
+from app.services.inference import load_backend
+from pathlib import Path
+load_backend(sys.argv[1], Path(sys.argv[2]))
+print(time.perf_counter() - t0)
+"""
+
+
+def model_dir(synthetic: bool, tmp: Path, rng: np.random.Generator) -> tuple[Path, str]:
+    version = None if synthetic else model_registry.current_version()
+    if version is not None:
+        directory = model_registry.version_dir(version)
+        for name in ("planning_model.pkl", "planning_model.json"):
+            if (directory / name).exists():
+                shutil.copy2(directory / name, tmp / name)
+        if not (tmp / "planning_model.json").exists():
+            # Older versions have only the pickle; export the booster for this run only
+            joblib.load(tmp / "planning_model.pkl").get_booster().save_model(str(tmp / "planning_model.json"))
+        return tmp, f"model {version}"
+
+    model = synthetic_model(rng, n_estimators=300, max_depth=5)
+    joblib.dump(model, tmp / "planning_model.pkl")
+    model.get_booster().save_model(str(tmp / "planning_model.json"))
+    return tmp, "synthetic 300-tree depth-5 model"
+
+
+def cold_load_seconds(kind: str, directory: Path) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", _COLD_LOAD, kind, str(directory)],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def single_row_ms(backend, X: np.ndarray, runs: int) -> float:
+    times = []
+    for i in range(runs):
+        row = X[i % len(X):i % len(X) + 1]
+        t0 = time.perf_counter()
+        backend.predict(row)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1000
+
+
+def batch_rows_per_second(backend, X: np.ndarray, batch: int) -> float:
+    t0 = time.perf_counter()
+    for start in range(0, len(X), batch):
+        backend.predict(X[start:start + batch])
+    return len(X) / (time.perf_counter() - t0)
+
+
+def run(args) -> int:
+    rng = np.random.default_rng(args.seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        directory, label = model_dir(args.synthetic, Path(tmp), rng)
+        print(f"Model: {label}")
+
+        X = feature_matrix(random_rows(args.rows, rng))
+        for col in (7, 8):  # avg_price_per_m2, price_trend_24m
+            X[rng.random(len(X)) < 0.05, col] = np.nan
+
+        backends = {kind: load_backend(kind, directory) for kind in BACKENDS}
+        reference = backends["sklearn"].predict(X)
+
+        mismatches = 0
+        print(f"\n{'backend':8s} {'load s':>8s} {'single ms':>10s} {'batch rows/s':>14s}  parity")
+        for kind, backend in backends.items():
+            probs = backend.predict(X)
+            diff = int(np.count_nonzero(probs != reference))
+            mismatches += diff
+            parity = "identical" if diff == 0 else f"{diff} differ (max {np.abs(probs - reference).max():.3g})"
+            print(
+                f"{kind:8s} {cold_load_seconds(kind, directory):8.3f} {single_row_ms(backend, X, args.runs):10.3f} "
+                f"{batch_rows_per_second(backend, X, args.batch):14,.0f}  {parity}"
+            )
+    return mismatches
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--runs", type=int, default=1000, help="single-row predictions per backend")
+    parser.add_argument("--batch", type=int, default=1000, help="rows per predict call in the batch test")
+    parser.add_argument("--synthetic", action="store_true", help="ignore ml/registry and use a synthetic model")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    sys.exit(1 if run(args) else 0)
@@ -0,0 +1,129 @@
+"""
+Benchmark the /analyze radius queries: geography casts on geom (before)
+against metre distances on the indexed geom_bng column (after).
+
+Sample points are the locations of random price_paid rows, so every point
+has data around it. Each query runs --runs times per point for each
+variant and the median latency per point is reported as p50 / p95 / mean
+across points, with row-count agreement between variants. Geodesic and
+BNG distances differ by well under 0.1% in Great Britain, so a handful of
+rows right on the radius boundary can legitimately disagree.
+
+Requires scripts/add_bng_geometry.py (or fresh ingests) to have populated geom_bng.
+
+Usage:
+    python scripts/benchmark_radius_queries.py
+    python scripts/benchmark_radius_queries.py --sample 100 --runs 5 --explain
+"""
+import argparse
+import asyncio
+import asyncpg
+import os
+import statistics
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_URL = os.environ["DATABASE_URL"]
+
+_GEOGRAPHY = "ST_DWithin(geom::geography, ST_SetSRID(ST_MakePoint($1, $2), 4326)::geography, {radius})"
+_BNG = "ST_DWithin(geom_bng, ST_Transform(ST_SetSRID(ST_MakePoint($1, $2), 4326), 27700), {radius})"
+
+# name -> (query template, radius); {where} is replaced by each variant's predicate
+QUERIES = {
+    "planning_metrics": ("""
+        SELECT COUNT(*) FILTER (WHERE decision = 'approved')::float / NULLIF(COUNT(*), 0),
+               AVG(decision_days), COUNT(*)
+        FROM planning_applications
+        WHERE {where} AND decision_date >= NOW() - INTERVAL '5 years'
+    """, 500),
+    "recent_applications": ("""
+        SELECT reference, decision_date FROM planning_applications
+        WHERE {where} AND decision_date IS NOT NULL
+        ORDER BY decision_date DESC LIMIT 5
+    """, 200),
+    "price_metrics": ("""
+        SELECT AVG(price) / 100.0, COUNT(*) FROM price_paid
+        WHERE {where} AND sale_date >= NOW() - INTERVAL '24 months'
+    """, 500),
+    "comparable_sales": ("""
+        SELECT postcode, price, sale_date FROM price_paid
+        WHERE {where} AND sale_date IS NOT NULL
+        ORDER BY sale_date DESC LIMIT 5
+    """, 500),
+}
+
+
+def _variants(template: str, radius: int) -> dict[str, str]:
+    return {
+        "before": template.format(where=_GEOGRAPHY.format(radius=radius)),
+        "after": template.format(where=_BNG.format(radius=radius)),
+    }
+
+
+async def _time(conn: asyncpg.Connection, sql: str, lon: float, lat: float, runs: int) -> tuple[float, list]:
+    timings, rows = [], []
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        rows = await conn.fetch(sql, lon, lat)
+        timings.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(timings), rows
+
+
+def _pct(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+async def run(sample: int, runs: int, explain: bool):
+    conn = await asyncpg.connect(DB_URL)
+    points = await conn.fetch("""
+        SELECT ST_X(geom) AS lon, ST_Y(geom) AS lat
+        FROM price_paid TABLESAMPLE SYSTEM (1)
+        WHERE geom IS NOT NULL
+        ORDER BY random()
+        LIMIT $1
+    """, sample)
+    print(f"Benchmarking {len(points)} points, {runs} runs each (median per point)\n")
+
+    print(f"{'query':<22}{'variant':<8}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'rows differ':>14}")
+    for name, (template, radius) in QUERIES.items():
+        variants = _variants(template, radius)
+        if explain:
+            p = points[0]
+            for label, sql in variants.items():
+                plan = await conn.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {sql}", p["lon"], p["lat"])
+                print(f"\n-- {name} / {label}")
+                print("\n".join(r[0] for r in plan))
+            print()
+
+        latencies = {label: [] for label in variants}
+        differ = 0
+        for p in points:
+            results = {}
+            for label, sql in variants.items():
+                ms, rows = await _time(conn, sql, p["lon"], p["lat"], runs)
+                latencies[label].append(ms)
+                results[label] = [tuple(r) for r in rows]
+            if results["before"] != results["after"]:
+                differ += 1
+
+        for label, values in latencies.items():
+            print(
+                f"{name:<22}{label:<8}{_pct(values, 0.5):>10.2f}{_pct(values, 0.95):>10.2f}"
+                f"{statistics.mean(values):>10.2f}{(differ if label == 'after' else ''):>14}"
+            )
+        speedup = statistics.mean(latencies["before"]) / max(statistics.mean(latencies["after"]), 1e-9)
+        print(f"{'':<22}{'speedup':<8}{speedup:>9.1f}x\n")
+
+    await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sample", type=int, default=50, help="Number of sample points")
+    parser.add_argument("--runs", type=int, default=3, help="Runs per query per point")
+    parser.add_argument("--explain", action="store_true", help="Print EXPLAIN ANALYZE for the first point")
+    args = parser.parse_args()
+    asyncio.run(run(args.sample, args.runs, args.explain))
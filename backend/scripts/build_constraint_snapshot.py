@@ -0,0 +1,76 @@
+"""
+Write the constraint layers to a snapshot file for the in-memory engine.
+
+app/services/constraint_engine.py loads this at startup (CONSTRAINT_ENGINE=true)
+instead of pulling every polygon from PostGIS, so workers start in a couple
+of seconds and never touch the database for constraints. Rebuild it after
+each constraint layer ingest.
+
+--verify samples price_paid locations and checks the engine's answers
+against the PostGIS constraint query.
+
+Usage:
+    python scripts/build_constraint_snapshot.py
+    python scripts/build_constraint_snapshot.py --out data/constraints/constraints.snap --verify 500
+"""
+import argparse
+import asyncio
+import asyncpg
+import os
+import sys
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.services.constraint_engine import ConstraintEngine  # noqa: E402
+from app.services.constraints import check_layers, constraints_from_row, constraints_sql  # noqa: E402
+
+DB_URL = os.environ["DATABASE_URL"]
+
+DEFAULT_OUT = Path(__file__).parent.parent / "data" / "constraints" / "constraints.snap"
+
+
+async def verify(pool: asyncpg.Pool, engine: ConstraintEngine, sample: int):
+    points = await pool.fetch("""
+        SELECT ST_X(geom) AS lon, ST_Y(geom) AS lat
+        FROM price_paid TABLESAMPLE SYSTEM (1)
+        WHERE geom IS NOT NULL
+        ORDER BY random()
+        LIMIT $1
+    """, sample)
+    await check_layers(pool)
+    sql = constraints_sql()
+
+    t0 = time.perf_counter()
+    answers = engine.lookup_many([p["lon"] for p in points], [p["lat"] for p in points])
+    elapsed_us = (time.perf_counter() - t0) * 1e6 / max(len(points), 1)
+
+    mismatches = 0
+    for p, answer in zip(points, answers):
+        expected = constraints_from_row(await pool.fetchrow(sql, p["lon"], p["lat"]))
+        if answer != expected:
+            mismatches += 1
+            print(f"  ({p['lat']:.6f}, {p['lon']:.6f}): engine {answer} != PostGIS {expected}")
+    print(f"Verified {len(points)} points: {mismatches} mismatches, {elapsed_us:.1f} µs/point batched")
+
+
+async def run(out: Path, sample: int):
+    pool = await asyncpg.create_pool(DB_URL, min_size=1, max_size=2)
+    print("Loading constraint layers from PostGIS...")
+    engine = await ConstraintEngine.from_postgis(pool)
+    engine.write_snapshot(out)
+    print(f"Snapshot written to {out}: {engine.pieces}")
+    if sample:
+        await verify(pool, ConstraintEngine.from_snapshot(out), sample)
+    await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", default=str(DEFAULT_OUT))
+    parser.add_argument("--verify", type=int, default=0, help="Check this many sample points against PostGIS")
+    args = parser.parse_args()
+    asyncio.run(run(Path(args.out), args.verify))
@@ -0,0 +1,213 @@
+"""
+Nightly build of the per-postcode feature store (app/services/feature_store.py).
+
+For every postcode in the coverage area — postcodes with planning history,
+plus price paid postcodes inside the bounding box of that history — builds
+the profile a live /analyze would, from the bulk tables only: the local
+postcode index (scripts/build_postcode_index.py), the PostGIS layers, the
+EPC ratings (scripts/ingest_epc.py) and GIAS schools
+(scripts/ingest_schools.py). Nothing calls postcodes.io, the EPC API or
+Overpass. A postcode missing from the index is left out, and /analyze
+fetches it live; one with no bulk EPC rating is stored with a NULL rating
+("N/A" in the profile).
+
+Postcodes are streamed from a cursor into a bounded queue and built by
+--concurrency workers, so memory stays flat however large the coverage is.
+
+When every postcode has been tried, the new version is marked live in one
+transaction, and versions older than the one it replaces are dropped.
+Requests never see a half-built version, and the previous one stays
+available for a manual rollback. The first failures are logged with their
+traceback; if more than --max-failure-rate of the postcodes fail, the new
+version is dropped, the live one is left in place and the script exits
+non-zero.
+
+Cron, e.g. nightly at 02:00:
+    0 2 * * * cd /srv/planpilot/backend && python scripts/build_feature_store.py
+
+Usage:
+    python scripts/build_feature_store.py
+    python scripts/build_feature_store.py --concurrency 16 --limit 1000 --max-failure-rate 0.01
+"""
+import argparse
+import asyncio
+import asyncpg
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.schemas.models import (  # noqa: E402
+    LocationProfile, Location, Constraints, PlanningMetrics, MarketMetrics, NearbySchool,
+)
+from app.services.feature_store import CREATE_TABLES_SQL, feature_columns  # noqa: E402
+from app.services.geocoding import load_postcode_index, lookup_local  # noqa: E402
+from app.services.location_query import get_location_data  # noqa: E402
+from app.services.market import get_bulk_epc_rating, load_price_store  # noqa: E402
+from app.services.schools import get_gias_schools  # noqa: E402
+
+log = logging.getLogger(__name__)
+
+DB_URL = os.environ["DATABASE_URL"]
+
+BATCH_SIZE = 500
+
+# Failures logged with a traceback; the rest are only counted
+LOGGED_FAILURES = 10
+
+# Normalised postcodes (no space, upper case); $1 = limit, NULL for all
+COVERAGE_SQL = """
+    WITH history AS (
+        SELECT ST_SetSRID(ST_Extent(geom), 4326) AS box FROM planning_applications
+    )
+    SELECT postcode FROM (
+        SELECT UPPER(REPLACE(postcode, ' ', '')) AS postcode
+        FROM planning_applications WHERE postcode IS NOT NULL
+        UNION
+        SELECT UPPER(REPLACE(p.postcode, ' ', '')) FROM price_paid p, history
+        WHERE p.postcode IS NOT NULL AND p.geom && history.box
+    ) c
+    ORDER BY postcode
+    LIMIT $1
+"""
+
+# Bulk tables the build reads instead of the live APIs
+REQUIRED_TABLES = {
+    "epc_postcode_ratings": "scripts/ingest_epc.py",
+    "schools": "scripts/ingest_schools.py",
+}
+
+_COLUMNS = [
+    "version", "postcode", "lat", "lon", "district", "ward",
+    "flood_zone", "in_conservation_area", "in_greenbelt", "in_article4_zone",
+    "local_approval_rate", "avg_decision_time_days", "similar_applications_nearby",
+    "avg_price_per_m2", "price_trend_24m", "avg_epc_rating", "profile",
+]
+
+
+async def build_profile(pool: asyncpg.Pool, postcode: str) -> LocationProfile | None:
+    """The profile a live /analyze would build, from the bulk tables only; None if the index doesn't know the postcode."""
+    geo = lookup_local(postcode)
+    if geo is None:
+        return None
+    data, epc, schools = await asyncio.gather(
+        get_location_data(pool, geo.lat, geo.lon),
+        get_bulk_epc_rating(pool, postcode),
+        get_gias_schools(pool, geo.lat, geo.lon),
+    )
+    return LocationProfile(
+        postcode=postcode.upper().strip(),
+        location=Location(lat=geo.lat, lon=geo.lon, district=geo.district, ward=geo.ward),
+        constraints=Constraints(**data["constraints"]),
+        planning_metrics=PlanningMetrics(**data["planning"]),
+        market_metrics=MarketMetrics(**data["market"], avg_epc_rating=epc or "N/A"),
+        nearby_schools=[NearbySchool(**s) for s in schools],
+    )
+
+
+async def run(concurrency: int, limit: int | None, max_failure_rate: float):
+    if not load_postcode_index():
+        sys.exit("No postcode index; run scripts/build_postcode_index.py first")
+    # One extra connection holds the coverage cursor open for the whole build
+    pool = await asyncpg.create_pool(DB_URL, min_size=2, max_size=concurrency + 3)
+    for table, script in REQUIRED_TABLES.items():
+        if not await pool.fetchval("SELECT to_regclass($1) IS NOT NULL", table):
+            sys.exit(f"{table} not found; run {script} first")
+    load_price_store()
+
+    await pool.execute(CREATE_TABLES_SQL)
+    version = await pool.fetchval("INSERT INTO postcode_feature_versions DEFAULT VALUES RETURNING version")
+    print(f"Building feature store version {version} ({concurrency} workers)...")
+
+    queue: asyncio.Queue[str | None] = asyncio.Queue(maxsize=concurrency * 4)
+    batch, written, missing, failed = [], 0, 0, 0
+    t0 = time.perf_counter()
+
+    async def flush():
+        nonlocal written
+        rows = batch[:]
+        batch.clear()
+        if rows:
+            placeholders = ", ".join(f"${i}" for i in range(1, len(_COLUMNS) + 1))
+            await pool.executemany(
+                f"INSERT INTO postcode_features ({', '.join(_COLUMNS)}) VALUES ({placeholders})",
+                rows,
+            )
+            written += len(rows)
+            print(f"  {written:,} written, {missing:,} not in the index, {failed:,} failed ({time.perf_counter() - t0:.0f}s)")
+
+    async def worker():
+        nonlocal missing, failed
+        while (postcode := await queue.get()) is not None:
+            try:
+                profile = await build_profile(pool, postcode)
+            except Exception:
+                failed += 1
+                if failed <= LOGGED_FAILURES:
+                    log.warning("Failed to build %s", postcode, exc_info=True)
+                continue
+            if profile is None:
+                missing += 1
+                continue
+            columns = {"version": version, "postcode": postcode, **feature_columns(profile)}
+            batch.append(tuple(columns[c] for c in _COLUMNS))
+            if len(batch) >= BATCH_SIZE:
+                await flush()
+
+    async def produce():
+        async with pool.acquire() as conn:
+            async with conn.transaction():
+                async for row in conn.cursor(COVERAGE_SQL, limit, prefetch=BATCH_SIZE):
+                    # Blocks while the workers are behind, so only a few postcodes are ever queued
+                    await queue.put(row["postcode"])
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    # A worker that dies (e.g. a failed insert) aborts the build rather than stalling the queue
+    await asyncio.gather(produce(), *(worker() for _ in range(concurrency)))
+    await flush()
+
+    tried = written + missing + failed
+    if tried and failed / tried > max_failure_rate:
+        # Drop the partial version (features cascade); the live one is untouched
+        await pool.execute("DELETE FROM postcode_feature_versions WHERE version = $1", version)
+        await pool.close()
+        sys.exit(
+            f"{failed:,} of {tried:,} postcodes failed ({failed / tried:.1%}, limit {max_failure_rate:.1%}); "
+            f"version {version} dropped, the live version is unchanged"
+        )
+
+    async with pool.acquire() as conn:
+        async with conn.transaction():
+            previous = await conn.fetchval("SELECT version FROM postcode_feature_versions WHERE live")
+            await conn.execute("UPDATE postcode_feature_versions SET live = FALSE WHERE live")
+            await conn.execute("""
+                UPDATE postcode_feature_versions
+                SET live = TRUE, built_at = NOW(), postcodes = $2
+                WHERE version = $1
+            """, version, written)
+            # Keep the version just replaced for rollback; drop the rest (features cascade)
+            await conn.execute(
+                "DELETE FROM postcode_feature_versions WHERE version <> $1 AND version IS DISTINCT FROM $2",
+                version, previous,
+            )
+        await conn.execute("ANALYZE postcode_features")
+
+    await pool.close()
+    print(f"Feature store version {version} live: {written:,} postcodes, {missing + failed:,} left to the live pipeline.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=8, help="Postcodes computed at once")
+    parser.add_argument("--limit", type=int, help="Only build the first N postcodes (testing)")
+    parser.add_argument("--max-failure-rate", type=float, default=0.05,
+                        help="Keep the live version if more than this fraction of postcodes fail (default: 0.05)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    asyncio.run(run(args.concurrency, args.limit, args.max_failure_rate))
@@ -0,0 +1,102 @@
+"""
+Build flood_coverage: a dissolved, non-overlapping version of flood_zones
+in which every area carries the highest zone of any RoFRS polygon covering it.
+
+The raw RoFRS bands overlap, so a lookup on flood_zones has to find every
+polygon containing the point and sort them by zone. On the coverage at most
+one area contains any point, so the lookup is a single index probe.
+
+Built per 0.1° tile to keep each union small: within a tile, each zone's
+polygons are clipped and dissolved, then the area of every higher zone is
+subtracted. Zone 1 (Low / Very Low) is the default when nothing matches, so
+only zones 2 and 3 are stored. The result is split with ST_Subdivide into
+pieces of at most --max-vertices vertices. Pieces meet along shared edges, so
+lookups use ST_Intersects and take MAX(zone_number) to settle a point lying
+exactly on an edge.
+
+ingest_flood.py builds it after loading; run this directly to rebuild it
+from an existing flood_zones table.
+
+Usage:
+    python scripts/build_flood_coverage.py
+    python scripts/build_flood_coverage.py --max-vertices 128
+"""
+import argparse
+import asyncio
+import asyncpg
+import os
+from dotenv import load_dotenv
+
+from subdivide_layers import DEFAULT_MAX_VERTICES
+
+load_dotenv()
+
+DB_URL = os.environ["DATABASE_URL"]
+
+TILE_DEGREES = 0.1
+
+
+async def build_coverage(conn: asyncpg.Connection, max_vertices: int = DEFAULT_MAX_VERTICES) -> int:
+    """Replace flood_coverage with a fresh build from flood_zones. Returns the number of pieces."""
+    async with conn.transaction():
+        await conn.execute("DROP TABLE IF EXISTS flood_coverage")
+        await conn.execute(f"""
+            CREATE TABLE flood_coverage AS
+            WITH tiles AS (
+                SELECT i, j, geom AS tile
+                FROM ST_SquareGrid(
+                    {TILE_DEGREES},
+                    (SELECT ST_SetSRID(ST_Extent(geom)::geometry, 4326) FROM flood_zones)
+                )
+            ),
+            bands AS (
+                -- Each zone's area within each tile, dissolved
+                SELECT
+                    t.i, t.j, f.zone_number,
+                    ST_UnaryUnion(ST_Collect(
+                        ST_CollectionExtract(ST_Intersection(ST_MakeValid(f.geom), t.tile), 3)
+                    )) AS geom
+                FROM tiles t
+                JOIN flood_zones f ON f.geom && t.tile
+                WHERE f.zone_number > 1
+                GROUP BY t.i, t.j, f.zone_number
+            ),
+            exclusive AS (
+                -- Drop the parts already covered by a higher zone in the same tile
+                SELECT
+                    b.zone_number,
+                    ST_CollectionExtract(COALESCE(
+                        ST_Difference(b.geom, (
+                            SELECT ST_UnaryUnion(ST_Collect(h.geom))
+                            FROM bands h
+                            WHERE h.i = b.i AND h.j = b.j AND h.zone_number > b.zone_number
+                        )),
+                        b.geom
+                    ), 3) AS geom
+                FROM bands b
+            )
+            SELECT
+                zone_number,
+                ST_Subdivide(geom, {int(max_vertices)})::geometry(Geometry, 4326) AS geom
+            FROM exclusive
+            WHERE NOT ST_IsEmpty(geom)
+        """)
+        await conn.execute("CREATE INDEX flood_coverage_geom_idx ON flood_coverage USING GIST (geom)")
+    await conn.execute("ANALYZE flood_coverage")
+    pieces = await conn.fetchval("SELECT COUNT(*) FROM flood_coverage")
+    print(f"flood_coverage: {pieces:,} pieces (max {max_vertices} vertices each)")
+    return pieces
+
+
+async def run(max_vertices: int):
+    conn = await asyncpg.connect(DB_URL)
+    await conn.execute("SET statement_timeout = 0")
+    await build_coverage(conn, max_vertices)
+    await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-vertices", type=int, default=DEFAULT_MAX_VERTICES)
+    args = parser.parse_args()
+    asyncio.run(run(args.max_vertices))
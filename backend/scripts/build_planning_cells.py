@@ -0,0 +1,114 @@
+"""
+Build the planning_cell_months aggregate: per 100 m British National Grid
+cell and decision month, counts of decided / approved / refused applications
+and decision-day sums.
+
+get_planning_metrics answers its 500 m radius by summing the cells whose
+centre lies inside the circle (about 80 index probes) instead of aggregating
+every application in range, so the cost no longer grows with the number of
+councils loaded.
+
+Refresh is incremental: planning_applications.cell_indexed marks rows
+already counted, and refresh_cells() folds in only the rest. ingest_ibex.py
+calls it after each run; run this script with --rebuild to recount from scratch.
+
+Usage:
+    python scripts/build_planning_cells.py            # fold in new rows
+    python scripts/build_planning_cells.py --rebuild  # recount everything
+"""
+import argparse
+import asyncio
+import asyncpg
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_URL = os.environ["DATABASE_URL"]
+
+# Must match CELL_M in app/services/grid.py
+CELL_M = 100
+
+
+async def create_table(conn: asyncpg.Connection):
+    await conn.execute(f"""
+        ALTER TABLE planning_applications
+            ADD COLUMN IF NOT EXISTS cell_indexed BOOLEAN NOT NULL DEFAULT FALSE;
+        CREATE INDEX IF NOT EXISTS planning_apps_cell_pending_idx
+            ON planning_applications (id) WHERE NOT cell_indexed;
+
+        CREATE TABLE IF NOT EXISTS planning_cell_months (
+            cell_x INTEGER NOT NULL,            -- floor(easting / {CELL_M})
+            cell_y INTEGER NOT NULL,            -- floor(northing / {CELL_M})
+            month DATE NOT NULL,                -- first day of the decision month
+            applications INTEGER NOT NULL,
+            approved INTEGER NOT NULL,
+            refused INTEGER NOT NULL,
+            decision_days_sum BIGINT NOT NULL,
+            decision_days_count INTEGER NOT NULL,  -- rows with a known decision_days
+            PRIMARY KEY (cell_x, cell_y, month)
+        );
+    """)
+
+
+async def refresh_cells(conn: asyncpg.Connection) -> int:
+    """Add applications not yet counted to their cells. Returns the number of applications added."""
+    # Marking rows and adding them happen in one statement, so a row is
+    # never counted twice or lost if the refresh is interrupted.
+    added = await conn.fetchval(f"""
+        WITH pending AS (
+            UPDATE planning_applications
+            SET cell_indexed = TRUE
+            WHERE NOT cell_indexed
+              AND geom_bng IS NOT NULL
+              AND decision_date IS NOT NULL
+            RETURNING geom_bng, decision_date, decision, decision_days
+        ),
+        upserted AS (
+            INSERT INTO planning_cell_months AS t
+                (cell_x, cell_y, month, applications, approved, refused,
+                 decision_days_sum, decision_days_count)
+            SELECT
+                FLOOR(ST_X(geom_bng) / {CELL_M})::int,
+                FLOOR(ST_Y(geom_bng) / {CELL_M})::int,
+                DATE_TRUNC('month', decision_date)::date,
+                COUNT(*),
+                COUNT(*) FILTER (WHERE decision = 'approved'),
+                COUNT(*) FILTER (WHERE decision = 'refused'),
+                COALESCE(SUM(decision_days), 0),
+                COUNT(decision_days)
+            FROM pending
+            GROUP BY 1, 2, 3
+            ON CONFLICT (cell_x, cell_y, month) DO UPDATE SET
+                applications        = t.applications + EXCLUDED.applications,
+                approved            = t.approved + EXCLUDED.approved,
+                refused             = t.refused + EXCLUDED.refused,
+                decision_days_sum   = t.decision_days_sum + EXCLUDED.decision_days_sum,
+                decision_days_count = t.decision_days_count + EXCLUDED.decision_days_count
+            RETURNING applications
+        )
+        SELECT COUNT(*) FROM pending
+    """)
+    return added
+
+
+async def run(rebuild: bool):
+    conn = await asyncpg.connect(DB_URL)
+    await create_table(conn)
+    async with conn.transaction():
+        if rebuild:
+            print("Clearing planning_cell_months...")
+            await conn.execute("TRUNCATE planning_cell_months")
+            await conn.execute("UPDATE planning_applications SET cell_indexed = FALSE WHERE cell_indexed")
+        added = await refresh_cells(conn)
+    await conn.execute("ANALYZE planning_cell_months")
+    cells = await conn.fetchval("SELECT COUNT(*) FROM planning_cell_months")
+    await conn.close()
+    print(f"Planning cells updated: {added:,} applications added ({cells:,} cell-months).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rebuild", action="store_true", help="Recount every application from scratch")
+    args = parser.parse_args()
+    asyncio.run(run(args.rebuild))
@@ -0,0 +1,84 @@
+"""
+Build the memory-mapped postcode lookup used by the geocoder.
+
+Converts the ONS Postcode Directory CSV into a compact binary file (sorted
+normalised postcodes, float32 lat/lon, interned district/ward tables) that
+app/services/postcode_index.py maps at startup. Terminated postcodes and
+postcodes without a grid reference are skipped, matching postcodes.io.
+
+ONSPD only carries GSS codes for districts and wards. Pass the names-and-codes
+CSVs from the ONSPD "Documents" folder to store display names instead
+(first column = code, second column = name).
+
+Usage:
+    python scripts/build_postcode_index.py \
+        --postcodes data/postcodes/ONSPD_latest.csv \
+        --la-names "data/postcodes/LA_UA names and codes UK as at 04_23.csv" \
+        --ward-names "data/postcodes/Ward names and codes UK as at 05_23.csv"
+"""
+import argparse
+import sys
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.services.postcode_index import write_index  # noqa: E402
+
+DEFAULT_OUT = Path(__file__).parent.parent / "data" / "postcodes" / "postcodes.idx"
+
+
+def _load_names(path: str | None) -> dict[str, str]:
+    if not path:
+        return {}
+    df = pd.read_csv(path, usecols=[0, 1], dtype=str, encoding="latin-1")
+    return dict(zip(df.iloc[:, 0], df.iloc[:, 1]))
+
+
+def _intern(codes: pd.Series, names: dict[str, str]) -> tuple[np.ndarray, list[str]]:
+    """Replace each code with an index into a small table of display names."""
+    codes = codes.fillna("")
+    idx, uniques = pd.factorize(codes, sort=True)
+    if len(uniques) > np.iinfo(np.uint16).max:
+        raise ValueError(f"Too many distinct values to intern ({len(uniques)})")
+    return idx.astype(np.uint16), [names.get(c, c) for c in uniques]
+
+
+def build(postcode_csv: str, out: Path, la_names: str | None, ward_names: str | None):
+    print("Loading ONSPD...")
+    pc = pd.read_csv(
+        postcode_csv,
+        usecols=["pcds", "lat", "long", "oslaua", "osward", "doterm"],
+        dtype={"pcds": str, "oslaua": str, "osward": str, "doterm": str},
+    )
+    pc = pc[pc["doterm"].isna()]
+    pc = pc[pc["lat"] < 99]   # ONSPD uses 99.999999 for "no grid reference"
+    print(f"  {len(pc):,} live postcodes with coordinates")
+
+    district, districts = _intern(pc["oslaua"], _load_names(la_names))
+    ward, wards = _intern(pc["osward"], _load_names(ward_names))
+    postcodes = pc["pcds"].str.replace(" ", "").str.upper().to_numpy().astype("S7")
+
+    out.parent.mkdir(parents=True, exist_ok=True)
+    write_index(
+        out,
+        postcodes=postcodes,
+        lat=pc["lat"].to_numpy(),
+        lon=pc["long"].to_numpy(),
+        district=district,
+        ward=ward,
+        districts=districts,
+        wards=wards,
+    )
+    size_mb = out.stat().st_size / 1024 / 1024
+    print(f"Wrote {out} ({size_mb:.1f} MB, {len(districts)} districts, {len(wards)} wards)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--postcodes", required=True, help="Path to ONSPD CSV")
+    parser.add_argument("--la-names", help="ONSPD LA_UA names and codes CSV (optional)")
+    parser.add_argument("--ward-names", help="ONSPD Ward names and codes CSV (optional)")
+    parser.add_argument("--out", type=Path, default=DEFAULT_OUT, help=f"Output file (default: {DEFAULT_OUT})")
+    args = parser.parse_args()
+    build(args.postcodes, args.out, args.la_names, args.ward_names)
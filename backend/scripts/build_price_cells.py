@@ -0,0 +1,94 @@
+"""
+Build the price_cell_months aggregate from price_paid: per 100 m British
+National Grid cell and sale month, the number of sales and the sum and sum
+of squares of their prices, plus running (prefix) totals of all three
+ordered by month.
+
+A window of months for a cell is then the difference of two prefix rows, so
+the market metrics (24-month average, 12 vs 12-month trend) cost three index
+probes per cell around the point instead of a scan over every sale in range.
+Both app/services/market.py and scripts/feature_engineering.py (phase 2)
+read it. Sums of squares are kept so price variance can be derived the same way.
+
+ingest_price_paid.py rebuilds it after loading; run this directly after any
+other change to price_paid.
+
+Usage:
+    python scripts/build_price_cells.py
+"""
+import asyncio
+import asyncpg
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_URL = os.environ["DATABASE_URL"]
+
+# Must match CELL_M in app/services/grid.py
+CELL_M = 100
+
+
+async def create_table(conn: asyncpg.Connection):
+    await conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS price_cell_months (
+            cell_x INTEGER NOT NULL,            -- floor(easting / {CELL_M})
+            cell_y INTEGER NOT NULL,            -- floor(northing / {CELL_M})
+            month DATE NOT NULL,                -- first day of the sale month
+            sales INTEGER NOT NULL,
+            price_sum BIGINT NOT NULL,
+            price_sumsq NUMERIC NOT NULL,
+            -- Running totals over this cell's months up to and including `month`
+            cum_sales BIGINT NOT NULL,
+            cum_price_sum BIGINT NOT NULL,
+            cum_price_sumsq NUMERIC NOT NULL,
+            PRIMARY KEY (cell_x, cell_y, month)
+        );
+    """)
+
+
+async def rebuild_cells(conn: asyncpg.Connection) -> int:
+    """Recompute every cell-month from price_paid. Returns the number of cell-months."""
+    async with conn.transaction():
+        await conn.execute("TRUNCATE price_cell_months")
+        result = await conn.execute(f"""
+            INSERT INTO price_cell_months
+                (cell_x, cell_y, month, sales, price_sum, price_sumsq,
+                 cum_sales, cum_price_sum, cum_price_sumsq)
+            SELECT
+                cell_x, cell_y, month, sales, price_sum, price_sumsq,
+                SUM(sales) OVER w,
+                SUM(price_sum) OVER w,
+                SUM(price_sumsq) OVER w
+            FROM (
+                SELECT
+                    FLOOR(ST_X(geom_bng) / {CELL_M})::int AS cell_x,
+                    FLOOR(ST_Y(geom_bng) / {CELL_M})::int AS cell_y,
+                    DATE_TRUNC('month', sale_date)::date AS month,
+                    COUNT(*) AS sales,
+                    SUM(price::bigint) AS price_sum,
+                    SUM(price::numeric * price) AS price_sumsq
+                FROM price_paid
+                WHERE geom_bng IS NOT NULL
+                  AND sale_date IS NOT NULL
+                  AND price IS NOT NULL
+                GROUP BY 1, 2, 3
+            ) g
+            WINDOW w AS (PARTITION BY cell_x, cell_y ORDER BY month)
+        """)
+    await conn.execute("ANALYZE price_cell_months")
+    return int(result.split()[-1])
+
+
+async def run():
+    conn = await asyncpg.connect(DB_URL)
+    await conn.execute("SET statement_timeout = 0")
+    await create_table(conn)
+    print("Aggregating price_paid into cell-months...")
+    count = await rebuild_cells(conn)
+    await conn.close()
+    print(f"Price cells built: {count:,} cell-months.")
+
+
+if __name__ == "__main__":
+    asyncio.run(run())
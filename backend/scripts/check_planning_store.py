@@ -0,0 +1,97 @@
+"""
+Parity check: the in-process planning store (app/services/planning_store.py)
+against the SQL planning queries the server falls back to.
+
+Builds the store from the database, then for sample points (locations of
+random planning applications, each nudged by up to 300 m so points also
+fall between applications) compares the planning metrics and recent
+applications from both paths after the same rounding. Reports mismatches,
+which should be 0: a difference means the store's cells, month window or
+ordering has drifted from PLANNING_CELL_METRICS_SQL (PLANNING_METRICS_SQL
+until planning_cell_months is built) / RECENT_APPLICATIONS_SQL.
+Also prints the per-point latency of each path.
+
+Usage:
+    python scripts/check_planning_store.py
+    python scripts/check_planning_store.py --sample 500 --radius 500 --radius 1000
+"""
+import argparse
+import asyncio
+import asyncpg
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.services.planning import (  # noqa: E402
+    PLANNING_CELL_METRICS_SQL, PLANNING_METRICS_SQL, RECENT_APPLICATIONS_SQL, planning_from_rows,
+)
+from app.services.planning_store import build_store  # noqa: E402
+
+DB_URL = os.environ["DATABASE_URL"]
+
+# Roughly 300 m in degrees of latitude
+_JITTER_DEG = 0.0027
+
+
+async def run(sample: int, radii: list[int]):
+    pool = await asyncpg.create_pool(DB_URL, min_size=1, max_size=2)
+    t0 = time.perf_counter()
+    store = await build_store(pool)
+    print(f"Store built: {store.count:,} applications in {time.perf_counter() - t0:.2f}s")
+    if await pool.fetchval("SELECT to_regclass('planning_cell_months') IS NOT NULL"):
+        metrics_sql = PLANNING_CELL_METRICS_SQL
+    else:
+        print("planning_cell_months not found; comparing with the raw-application query")
+        metrics_sql = PLANNING_METRICS_SQL
+
+    points = await pool.fetch("""
+        SELECT ST_X(geom) AS lon, ST_Y(geom) AS lat
+        FROM planning_applications
+        WHERE geom IS NOT NULL
+        ORDER BY random()
+        LIMIT $1
+    """, sample)
+    rng = random.Random(0)
+    points = [
+        (p["lat"] + rng.uniform(-_JITTER_DEG, _JITTER_DEG), p["lon"] + rng.uniform(-_JITTER_DEG, _JITTER_DEG))
+        for p in points
+    ]
+
+    for radius in radii:
+        mismatches, sql_ms, store_ms = 0, 0.0, 0.0
+        for lat, lon in points:
+            t0 = time.perf_counter()
+            metrics_row = await pool.fetchrow(metrics_sql, lon, lat, float(radius))
+            recent_rows = await pool.fetch(RECENT_APPLICATIONS_SQL, lon, lat)
+            t1 = time.perf_counter()
+            from_store = planning_from_rows(*store.rows(lat, lon, radius))
+            t2 = time.perf_counter()
+            sql_ms += (t1 - t0) * 1000
+            store_ms += (t2 - t1) * 1000
+
+            from_sql = planning_from_rows(metrics_row, recent_rows)
+            if from_sql != from_store:
+                mismatches += 1
+                if mismatches <= 5:
+                    print(f"  ({lat:.6f}, {lon:.6f}) r={radius}:\n    sql   {from_sql}\n    store {from_store}")
+        n = max(len(points), 1)
+        print(
+            f"radius {radius} m: {len(points)} points, {mismatches} mismatches; "
+            f"SQL {sql_ms / n:.2f} ms/point, store {store_ms / n:.3f} ms/point"
+        )
+
+    await pool.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sample", type=int, default=200, help="Number of sample points")
+    parser.add_argument("--radius", type=int, action="append", help="Metrics radius in metres (repeatable)")
+    args = parser.parse_args()
+    asyncio.run(run(args.sample, args.radius or [500]))
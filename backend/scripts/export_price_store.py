@@ -0,0 +1,151 @@
+"""
+Export price_paid to the memory-mapped column store used by the market service.
+
+Streams every sale with a location, date and price out of PostGIS, interns
+the postcodes, and writes app/services/price_store.py's file format: Hilbert
+ordered rows with a cell -> row-range index. The server maps the file at
+startup when it exists (PRICE_STORE_PATH), so re-run this after each
+price paid ingest and restart the workers.
+
+--verify compares the store with the SQL the server falls back to
+(PRICE_CELL_METRICS_SQL, or PRICE_METRICS_SQL until price_cell_months is
+built, and COMPARABLE_SALES_SQL) on random sale locations.
+
+Usage:
+    python scripts/export_price_store.py
+    python scripts/export_price_store.py --out data/price_paid/price_paid.store --verify 200
+"""
+import argparse
+import asyncio
+import asyncpg
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.services.market import (  # noqa: E402
+    PRICE_CELL_METRICS_SQL, PRICE_METRICS_SQL, COMPARABLE_SALES_SQL, sales_from_rows,
+)
+from app.services.price_store import PriceStore, write_store  # noqa: E402
+
+DB_URL = os.environ["DATABASE_URL"]
+
+DEFAULT_OUT = Path(__file__).parent.parent / "data" / "price_paid" / "price_paid.store"
+
+BATCH_SIZE = 200_000
+
+
+async def export(conn: asyncpg.Connection, out: Path) -> int:
+    columns = {"id": [], "price": [], "day": [], "x": [], "y": [], "postcode": []}
+    async with conn.transaction():
+        cursor = conn.cursor("""
+            SELECT
+                id,
+                price,
+                sale_date - DATE '1970-01-01' AS day,
+                ST_X(geom_bng) AS x,
+                ST_Y(geom_bng) AS y,
+                COALESCE(postcode, '') AS postcode
+            FROM price_paid
+            WHERE geom_bng IS NOT NULL
+              AND sale_date IS NOT NULL
+              AND price IS NOT NULL
+        """, prefetch=BATCH_SIZE)
+        batch = []
+        async for row in cursor:
+            batch.append(row)
+            if len(batch) == BATCH_SIZE:
+                _append(columns, batch)
+                print(f"  {sum(len(c) for c in columns['id']):,} rows read...")
+                batch = []
+        _append(columns, batch)
+
+    postcode = pd.Series(np.concatenate(columns.pop("postcode")))
+    codes, postcodes = pd.factorize(postcode, sort=True)
+    arrays = {name: np.concatenate(parts) for name, parts in columns.items()}
+    write_store(
+        out,
+        price=arrays["price"],
+        day=arrays["day"],
+        x=arrays["x"],
+        y=arrays["y"],
+        ids=arrays["id"],
+        postcode=codes,
+        postcodes=list(postcodes),
+    )
+    return len(codes)
+
+
+def _append(columns: dict[str, list], batch: list) -> None:
+    if not batch:
+        return
+    columns["id"].append(np.array([r["id"] for r in batch], dtype=np.int64))
+    columns["price"].append(np.array([r["price"] for r in batch], dtype=np.int64))
+    columns["day"].append(np.array([r["day"] for r in batch], dtype=np.int64))
+    columns["x"].append(np.array([r["x"] for r in batch], dtype=np.float64))
+    columns["y"].append(np.array([r["y"] for r in batch], dtype=np.float64))
+    columns["postcode"].append(np.array([r["postcode"] for r in batch], dtype=object))
+
+
+async def verify(conn: asyncpg.Connection, store: PriceStore, sample: int):
+    points = await conn.fetch("""
+        SELECT ST_X(geom) AS lon, ST_Y(geom) AS lat
+        FROM price_paid TABLESAMPLE SYSTEM (1)
+        WHERE geom IS NOT NULL
+        ORDER BY random()
+        LIMIT $1
+    """, sample)
+    today = await conn.fetchval("SELECT (NOW() AT TIME ZONE 'UTC')::date")
+    if await conn.fetchval("SELECT to_regclass('price_cell_months') IS NOT NULL"):
+        metrics_sql = PRICE_CELL_METRICS_SQL
+    else:
+        print("price_cell_months not found; comparing with the raw-sales query")
+        metrics_sql = PRICE_METRICS_SQL
+    mismatches, sql_ms, store_ms = 0, 0.0, 0.0
+    for p in points:
+        t0 = time.perf_counter()
+        price_row = await conn.fetchrow(metrics_sql, p["lon"], p["lat"])
+        comp_rows = await conn.fetch(COMPARABLE_SALES_SQL, p["lon"], p["lat"])
+        t1 = time.perf_counter()
+        from_store = sales_from_rows(*store.rows(p["lat"], p["lon"], today))
+        t2 = time.perf_counter()
+        sql_ms += (t1 - t0) * 1000
+        store_ms += (t2 - t1) * 1000
+
+        from_sql = sales_from_rows(price_row, comp_rows)
+        if from_sql != from_store:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  ({p['lat']:.6f}, {p['lon']:.6f}):\n    sql   {from_sql}\n    store {from_store}")
+    n = max(len(points), 1)
+    print(
+        f"Verified {len(points)} points: {mismatches} mismatches; "
+        f"SQL {sql_ms / n:.2f} ms/point, store {store_ms / n:.3f} ms/point"
+    )
+
+
+async def run(out: Path, sample: int):
+    out.parent.mkdir(parents=True, exist_ok=True)
+    conn = await asyncpg.connect(DB_URL)
+    await conn.execute("SET statement_timeout = 0")
+    print("Exporting price_paid...")
+    t0 = time.perf_counter()
+    count = await export(conn, out)
+    print(f"Price store written to {out}: {count:,} sales in {time.perf_counter() - t0:.1f}s")
+    if sample:
+        await verify(conn, PriceStore(out), sample)
+    await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--out", default=str(DEFAULT_OUT))
+    parser.add_argument("--verify", type=int, default=0, help="Check this many sample points against the SQL path")
+    args = parser.parse_args()
+    asyncio.run(run(Path(args.out), args.verify))
@@ -3,7 +3,9 @@ Compute and write ML feature columns for all rows in planning_applications.
 
 Runs in two phases:
   Phase 1 (fast, bulk SQL): constraint flags + planning history metrics
-  Phase 2 (optional, slow): market price metrics from price_paid
+  Phase 2 (optional): market price metrics — prefix sums over
+             price_cell_months (scripts/build_price_cells.py) when it exists,
+             otherwise a slow join against price_paid.
              Skip phase 2 with --skip-market for faster training data prep.
              Market metrics are computed live at inference time anyway.
 
@@ -17,12 +19,124 @@ import argparse
 import asyncio
 import asyncpg
 import os
+import sys
+from pathlib import Path
 from dotenv import load_dotenv
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.services.grid import CELL_M, cell_disc_sql, in_cell_disc_sql  # noqa: E402
+
 load_dotenv()
 
 DB_URL = os.environ["DATABASE_URL"]
 
+# Highest flood zone at each application. The raw RoFRS bands overlap, so
+# every band containing the point is found and sorted; flood_coverage
+# (scripts/build_flood_coverage.py) is dissolved to one area per point.
+FLOOD_ZONES_SQL = """
+    SELECT fz.zone_number
+    FROM flood_zones fz
+    WHERE ST_Contains(fz.geom, a.geom)
+    ORDER BY fz.zone_number DESC LIMIT 1
+"""
+
+FLOOD_COVERAGE_SQL = """
+    SELECT MAX(fc.zone_number)
+    FROM flood_coverage fc
+    WHERE ST_Intersects(fc.geom, a.geom)
+"""
+
+# Market metrics by joining every sale in the grid cells within 500m of each
+# application (slow — joins 4.6M price_paid rows). Used until
+# price_cell_months exists; the cells and windows are those of MARKET_CELLS_SQL.
+MARKET_LIVE_SQL = f"""
+    UPDATE planning_applications a
+    SET
+        avg_price_per_m2 = m.avg_24 / 100.0,
+        price_trend_24m  = (m.avg_recent - m.avg_prior) / NULLIF(m.avg_prior, 0)
+    FROM (
+        SELECT
+            a2.id,
+            SUM(p.price::bigint)::float / NULLIF(COUNT(*), 0) AS avg_24,
+            SUM(p.price::bigint) FILTER (WHERE p.sale_date >= pt.d - INTERVAL '11 months')::float /
+                NULLIF(COUNT(*) FILTER (WHERE p.sale_date >= pt.d - INTERVAL '11 months'), 0) AS avg_recent,
+            SUM(p.price::bigint) FILTER (WHERE p.sale_date < pt.d - INTERVAL '11 months')::float /
+                NULLIF(COUNT(*) FILTER (WHERE p.sale_date < pt.d - INTERVAL '11 months'), 0) AS avg_prior
+        FROM planning_applications a2
+        CROSS JOIN LATERAL (
+            SELECT (DATE_TRUNC('month', a2.decision_date) - INTERVAL '1 month')::date AS d
+        ) pt
+        JOIN price_paid p
+            ON ST_DWithin(a2.geom_bng, p.geom_bng, {500 + CELL_M})
+           AND {in_cell_disc_sql("ST_X(p.geom_bng)", "ST_Y(p.geom_bng)", "ST_X(a2.geom_bng)", "ST_Y(a2.geom_bng)", "500")}
+           AND p.sale_date >= pt.d - INTERVAL '23 months'
+           AND p.sale_date < pt.d + INTERVAL '1 month'
+           AND p.price IS NOT NULL
+        WHERE a2.id IN ({{id_list}})
+          AND a2.geom_bng IS NOT NULL
+          AND a2.decision_date IS NOT NULL
+        GROUP BY a2.id
+    ) m
+    WHERE a.id = m.id
+"""
+
+# Same metrics from the per-cell monthly prefix sums (scripts/build_price_cells.py):
+# three index probes per grid cell within 500m of the application, windows
+# in whole months ending with the month before the decision month. The
+# decision month itself is left out: its running total includes sales made
+# after the decision, which the model could not have known about.
+MARKET_CELLS_SQL = f"""
+    UPDATE planning_applications a
+    SET
+        avg_price_per_m2 = m.avg_24 / 100.0,
+        price_trend_24m  = (m.avg_recent - m.avg_prior) / NULLIF(m.avg_prior, 0)
+    FROM (
+        SELECT
+            w.id,
+            SUM(w.s_24)::float / NULLIF(SUM(w.n_24), 0)         AS avg_24,
+            SUM(w.s_recent)::float / NULLIF(SUM(w.n_recent), 0) AS avg_recent,
+            SUM(w.s_prior)::float / NULLIF(SUM(w.n_prior), 0)   AS avg_prior
+        FROM (
+            SELECT
+                a2.id,
+                COALESCE(hi.n, 0) - COALESCE(lo.n, 0)   AS n_24,
+                COALESCE(hi.s, 0) - COALESCE(lo.s, 0)   AS s_24,
+                COALESCE(hi.n, 0) - COALESCE(mid.n, 0)  AS n_recent,
+                COALESCE(hi.s, 0) - COALESCE(mid.s, 0)  AS s_recent,
+                COALESCE(mid.n, 0) - COALESCE(lo.n, 0)  AS n_prior,
+                COALESCE(mid.s, 0) - COALESCE(lo.s, 0)  AS s_prior
+            FROM planning_applications a2
+            CROSS JOIN LATERAL (
+                SELECT
+                    ST_X(a2.geom_bng) AS x,
+                    ST_Y(a2.geom_bng) AS y,
+                    (DATE_TRUNC('month', a2.decision_date) - INTERVAL '1 month')::date AS d
+            ) pt
+            CROSS JOIN LATERAL ({cell_disc_sql("pt.x", "pt.y", "500")}) c
+            LEFT JOIN LATERAL (
+                SELECT cum_sales AS n, cum_price_sum AS s FROM price_cell_months pc
+                WHERE pc.cell_x = c.cell_x AND pc.cell_y = c.cell_y AND pc.month <= pt.d
+                ORDER BY pc.month DESC LIMIT 1
+            ) hi ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT cum_sales AS n, cum_price_sum AS s FROM price_cell_months pc
+                WHERE pc.cell_x = c.cell_x AND pc.cell_y = c.cell_y AND pc.month <= pt.d - INTERVAL '12 months'
+                ORDER BY pc.month DESC LIMIT 1
+            ) mid ON TRUE
+            LEFT JOIN LATERAL (
+                SELECT cum_sales AS n, cum_price_sum AS s FROM price_cell_months pc
+                WHERE pc.cell_x = c.cell_x AND pc.cell_y = c.cell_y AND pc.month <= pt.d - INTERVAL '24 months'
+                ORDER BY pc.month DESC LIMIT 1
+            ) lo ON TRUE
+            WHERE a2.id IN ({{id_list}})
+              AND a2.geom_bng IS NOT NULL
+              AND a2.decision_date IS NOT NULL
+        ) w
+        GROUP BY w.id
+    ) m
+    WHERE a.id = m.id
+"""
+
 
 async def run(chunk_size: int, skip_market: bool):
     conn = await asyncpg.connect(DB_URL)
@@ -34,6 +148,13 @@ async def run(chunk_size: int, skip_market: bool):
         ORDER BY id
     """)
     ids = [r["id"] for r in id_rows]
+    flood_coverage = await conn.fetchval("SELECT to_regclass('flood_coverage') IS NOT NULL")
+    if not flood_coverage:
+        print("flood_coverage not found — flood zones use the overlapping raw bands (run scripts/build_flood_coverage.py)")
+    flood_sql = FLOOD_COVERAGE_SQL if flood_coverage else FLOOD_ZONES_SQL
+    price_cells = await conn.fetchval("SELECT to_regclass('price_cell_months') IS NOT NULL")
+    if not skip_market and not price_cells:
+        print("price_cell_months not found — market metrics use the slow live join (run scripts/build_price_cells.py)")
     total = len(ids)
     print(f"Computing features for {total:,} applications (chunk={chunk_size}, skip_market={skip_market})...")
 
@@ -46,13 +167,7 @@ async def run(chunk_size: int, skip_market: bool):
         await conn.execute(f"""
             UPDATE planning_applications a
             SET
-                flood_zone = COALESCE(
-                    (SELECT fz.zone_number
-                     FROM flood_zones fz
-                     WHERE ST_Contains(fz.geom, a.geom)
-                     ORDER BY fz.zone_number DESC LIMIT 1),
-                    1
-                ),
+                flood_zone = COALESCE(({flood_sql}), 1),
                 in_conservation_area = EXISTS(
                     SELECT 1 FROM conservation_areas ca WHERE ST_Contains(ca.geom, a.geom)
                 ),
@@ -66,6 +181,9 @@ async def run(chunk_size: int, skip_market: bool):
         """)
 
         # ── Step 2: Planning history metrics (medium — self-join on 36k rows) ─
+        # Served metrics count whole months in the 100 m cells whose centre is
+        # within 500m (planning.PLANNING_CELL_METRICS_SQL); here the months end
+        # the month before the decision, as the market windows do.
         await conn.execute(f"""
             UPDATE planning_applications a
             SET
@@ -81,10 +199,10 @@ async def run(chunk_size: int, skip_market: bool):
                     COUNT(*)                     AS count_nearby
                 FROM planning_applications a2
                 JOIN planning_applications b
-                    ON ST_DWithin(a2.geom::geography, b.geom::geography, 500)
-                   AND b.id <> a2.id
-                   AND b.decision_date < a2.decision_date
-                   AND b.decision_date >= a2.decision_date - INTERVAL '5 years'
+                    ON ST_DWithin(a2.geom_bng, b.geom_bng, 500 + {CELL_M})
+                   AND {in_cell_disc_sql("ST_X(b.geom_bng)", "ST_Y(b.geom_bng)", "ST_X(a2.geom_bng)", "ST_Y(a2.geom_bng)", "500")}
+                   AND b.decision_date < DATE_TRUNC('month', a2.decision_date)
+                   AND b.decision_date >= DATE_TRUNC('month', a2.decision_date - INTERVAL '5 years')
                 WHERE a2.id IN ({id_list})
                   AND a2.geom IS NOT NULL
                   AND a2.decision_date IS NOT NULL
@@ -94,43 +212,9 @@ async def run(chunk_size: int, skip_market: bool):
         """)
 
         if not skip_market:
-            # ── Step 3: Market price metrics (slow — joins 4.6M price_paid rows) ─
-            await conn.execute(f"""
-                UPDATE planning_applications a
-                SET
-                    avg_price_per_m2 = m.avg_price,
-                    price_trend_24m  = m.trend
-                FROM (
-                    SELECT
-                        a2.id,
-                        AVG(p.price) / 100.0    AS avg_price,
-                        (
-                            AVG(p.price) FILTER (
-                                WHERE p.sale_date >= a2.decision_date - INTERVAL '12 months'
-                            ) -
-                            AVG(p.price) FILTER (
-                                WHERE p.sale_date BETWEEN a2.decision_date - INTERVAL '24 months'
-                                                      AND a2.decision_date - INTERVAL '12 months'
-                            )
-                        ) / NULLIF(
-                            AVG(p.price) FILTER (
-                                WHERE p.sale_date BETWEEN a2.decision_date - INTERVAL '24 months'
-                                                      AND a2.decision_date - INTERVAL '12 months'
-                            ),
-                            0
-                        )                       AS trend
-                    FROM planning_applications a2
-                    JOIN price_paid p
-                        ON ST_DWithin(a2.geom::geography, p.geom::geography, 500)
-                       AND p.sale_date BETWEEN a2.decision_date - INTERVAL '24 months'
-                                           AND a2.decision_date
-                    WHERE a2.id IN ({id_list})
-                      AND a2.geom IS NOT NULL
-                      AND a2.decision_date IS NOT NULL
-                    GROUP BY a2.id
-                ) m
-                WHERE a.id = m.id
-            """)
+            # ── Step 3: Market price metrics ─────────────────────────────────
+            market_sql = MARKET_CELLS_SQL if price_cells else MARKET_LIVE_SQL
+            await conn.execute(market_sql.format(id_list=id_list))
 
         done += len(chunk_ids)
         pct = done / total * 100
@@ -0,0 +1,113 @@
+"""
+Ingest the bulk EPC domestic certificates download and precompute mean
+ratings per full postcode and per outward code.
+
+Source: https://epc.opendatacommunities.org/downloads/domestic
+Download "All domestic certificates" and unzip into data/epc/. The archive
+holds one folder per local authority, each with a certificates.csv.
+
+The market service reads the two lookup tables with an indexed primary-key
+query and only calls the live EPC API for postcodes missing from them.
+Ratings are scored A=7 … G=1 and averaged, matching the live API path.
+
+Usage:
+    python scripts/ingest_epc.py --dir data/epc/all-domestic-certificates
+"""
+import argparse
+import asyncio
+import asyncpg
+import pandas as pd
+import os
+from pathlib import Path
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_URL = os.environ["DATABASE_URL"]
+
+RATING_SCORES = {"A": 7, "B": 6, "C": 5, "D": 4, "E": 3, "F": 2, "G": 1}
+
+
+async def create_tables(conn: asyncpg.Connection):
+    await conn.execute("""
+        CREATE TABLE IF NOT EXISTS epc_postcode_ratings (
+            postcode TEXT PRIMARY KEY,      -- normalised, no space e.g. 'SW98JH'
+            mean_score DOUBLE PRECISION,
+            certificates INTEGER
+        );
+        CREATE TABLE IF NOT EXISTS epc_outward_ratings (
+            outward TEXT PRIMARY KEY,       -- e.g. 'SW9'
+            mean_score DOUBLE PRECISION,
+            certificates INTEGER
+        );
+    """)
+
+
+def aggregate(paths: list[Path]) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Sum scores and counts per postcode across every certificates file."""
+    totals = []
+    for i, path in enumerate(paths, 1):
+        df = pd.read_csv(path, usecols=["POSTCODE", "CURRENT_ENERGY_RATING"], dtype=str)
+        df["score"] = df["CURRENT_ENERGY_RATING"].str.strip().str.upper().map(RATING_SCORES)
+        df = df.dropna(subset=["POSTCODE", "score"])
+        df["postcode"] = df["POSTCODE"].str.replace(" ", "").str.upper()
+        totals.append(df.groupby("postcode")["score"].agg(["sum", "count"]))
+        print(f"  [{i}/{len(paths)}] {path.parent.name}: {len(df):,} certificates")
+
+    by_postcode = pd.concat(totals).groupby(level=0).sum()
+    # The inward code is always the last 3 characters
+    by_outward = by_postcode.groupby(by_postcode.index.str[:-3])[["sum", "count"]].sum()
+
+    for df in (by_postcode, by_outward):
+        df["mean_score"] = df["sum"] / df["count"]
+    return by_postcode, by_outward
+
+
+def _records(df: pd.DataFrame) -> list[tuple]:
+    return list(zip(df.index, df["mean_score"].astype(float), df["count"].astype(int)))
+
+
+async def load(db_url: str, by_postcode: pd.DataFrame, by_outward: pd.DataFrame):
+    conn = await asyncpg.connect(db_url)
+    await create_tables(conn)
+
+    async with conn.transaction():
+        # Full refresh — the bulk download is a complete snapshot
+        await conn.execute("TRUNCATE epc_postcode_ratings, epc_outward_ratings")
+        await conn.copy_records_to_table(
+            "epc_postcode_ratings",
+            records=_records(by_postcode),
+            columns=["postcode", "mean_score", "certificates"],
+        )
+        await conn.copy_records_to_table(
+            "epc_outward_ratings",
+            records=_records(by_outward),
+            columns=["outward", "mean_score", "certificates"],
+        )
+
+    await conn.execute("ANALYZE epc_postcode_ratings; ANALYZE epc_outward_ratings;")
+    await conn.close()
+
+
+def ingest(directory: str, db_url: str):
+    paths = sorted(Path(directory).rglob("certificates.csv"))
+    if not paths:
+        raise SystemExit(f"No certificates.csv files found under {directory}")
+
+    print(f"Aggregating {len(paths)} certificate files...")
+    by_postcode, by_outward = aggregate(paths)
+
+    print(f"Loading {len(by_postcode):,} postcodes and {len(by_outward):,} outward codes...")
+    asyncio.run(load(db_url, by_postcode, by_outward))
+    print("EPC ingestion complete.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--dir",
+        required=True,
+        help="Unzipped bulk download e.g. data/epc/all-domestic-certificates",
+    )
+    args = parser.parse_args()
+    ingest(args.dir, DB_URL)
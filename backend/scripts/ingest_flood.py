@@ -22,6 +22,8 @@ import asyncpg
 import os
 from dotenv import load_dotenv
 
+from build_flood_coverage import build_coverage
+
 load_dotenv()
 
 DB_URL = os.environ["DATABASE_URL"]
@@ -85,6 +87,9 @@ async def transform_to_flood_zones(db_url: str):
         label = {3: "High (zone 3)", 2: "Medium (zone 2)", 1: "Low/Very Low (zone 1)"}
         print(f"  {label.get(row['zone_number'], row['zone_number'])}: {row['count']:,} polygons")
 
+    # Non-overlapping max-zone areas for the constraint lookup (see scripts/build_flood_coverage.py)
+    await build_coverage(conn)
+
     await conn.close()
 
 
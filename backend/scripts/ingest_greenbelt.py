@@ -49,9 +49,23 @@ def add_index(db_url: str):
     asyncio.run(_run())
 
 
+def subdivide(db_url: str):
+    """Build greenbelt_areas_subdivided, which the constraint lookup queries."""
+    import asyncpg, asyncio
+    from subdivide_layers import LAYERS, subdivide_layer
+
+    async def _run():
+        conn = await asyncpg.connect(db_url)
+        await subdivide_layer(conn, "greenbelt_areas", *LAYERS["greenbelt_areas"])
+        await conn.close()
+
+    asyncio.run(_run())
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--file", required=True)
     args = parser.parse_args()
     ingest(args.file, DB_URL)
     add_index(DB_URL)
+    subdivide(DB_URL)
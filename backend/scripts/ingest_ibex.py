@@ -2,8 +2,8 @@
 Ingest historical planning application data from the IBex Planning API.
 
 Pulls applications for given council IDs and inserts into the
-planning_applications table. Geometry is returned in BNG (EPSG:27700) and
-converted to WGS84 centroids via PostGIS.
+planning_applications table. Geometry is returned in BNG (EPSG:27700); its
+centroid is stored as-is in geom_bng and converted to WGS84 for geom.
 
 Feature columns are left NULL at this stage — run feature_engineering.py
 afterwards to populate them.
@@ -25,6 +25,8 @@ from dateutil.relativedelta import relativedelta
 from dotenv import load_dotenv
 import os
 
+from build_planning_cells import create_table as create_cell_table, refresh_cells
+
 load_dotenv()
 
 DB_URL = os.environ["DATABASE_URL"]
@@ -93,15 +95,13 @@ async def fetch_month(
 
 
 async def insert_batch(conn: asyncpg.Connection, batch: list[tuple]):
-    """Insert records; geometry is BNG WKT → PostGIS centroid → WGS84."""
+    """Insert records; geometry is BNG WKT → PostGIS centroid (kept in BNG, and as WGS84)."""
     await conn.executemany("""
         INSERT INTO planning_applications
             (reference, postcode, decision, decision_date, decision_days,
-             application_type, geom)
-        VALUES (
-            $1, $2, $3, $4, $5, $6,
-            ST_Transform(ST_Centroid(ST_GeomFromText($7, 27700)), 4326)
-        )
+             application_type, geom, geom_bng)
+        SELECT $1, $2, $3, $4, $5, $6, ST_Transform(c.geom_bng, 4326), c.geom_bng
+        FROM (SELECT ST_Centroid(ST_GeomFromText($7, 27700)) AS geom_bng) c
         ON CONFLICT (reference) DO NOTHING
     """, batch)
 
@@ -189,6 +189,11 @@ async def run(council_ids: list[int], years: int):
             print(f"  Inserted: {len(batch)}  |  Skipped: {skipped}")
             chunk_start += relativedelta(months=1)
 
+    # Fold the new rows into the per-cell planning aggregates
+    await create_cell_table(conn)
+    added = await refresh_cells(conn)
+    print(f"Planning cells: {added:,} applications added")
+
     await conn.close()
     print(f"\nIBex ingestion complete. Total inserted: {total_inserted}  |  Total skipped: {total_skipped}")
 
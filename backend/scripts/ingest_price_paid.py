@@ -19,6 +19,8 @@ import pandas as pd
 import os
 from dotenv import load_dotenv
 
+from build_price_cells import create_table as create_cell_table, rebuild_cells
+
 load_dotenv()
 
 DB_URL = os.environ["DATABASE_URL"]
@@ -40,9 +42,11 @@ async def create_table(conn: asyncpg.Connection):
             sale_date DATE,
             property_type TEXT,
             price_per_m2 NUMERIC,
-            geom GEOMETRY(Point, 4326)
+            geom GEOMETRY(Point, 4326),
+            geom_bng GEOMETRY(Point, 27700)     -- British National Grid, for metre-radius queries
         );
         CREATE INDEX IF NOT EXISTS price_paid_geom_idx ON price_paid USING GIST (geom);
+        CREATE INDEX IF NOT EXISTS price_paid_geom_bng_idx ON price_paid USING GIST (geom_bng);
         CREATE INDEX IF NOT EXISTS price_paid_postcode_idx ON price_paid (postcode);
     """)
 
@@ -85,17 +89,22 @@ async def ingest(csv_path: str, postcode_csv: str, db_url: str):
         ))
         if len(batch) >= 5000:
             await conn.executemany("""
-                INSERT INTO price_paid (postcode, price, sale_date, property_type, price_per_m2, geom)
-                VALUES ($1, $2, $3, $4, $5, ST_GeomFromEWKT($6))
+                INSERT INTO price_paid (postcode, price, sale_date, property_type, price_per_m2, geom, geom_bng)
+                VALUES ($1, $2, $3, $4, $5, ST_GeomFromEWKT($6), ST_Transform(ST_GeomFromEWKT($6), 27700))
             """, batch)
             batch.clear()
 
     if batch:
         await conn.executemany("""
-            INSERT INTO price_paid (postcode, price, sale_date, property_type, price_per_m2, geom)
-            VALUES ($1, $2, $3, $4, $5, ST_GeomFromEWKT($6))
+            INSERT INTO price_paid (postcode, price, sale_date, property_type, price_per_m2, geom, geom_bng)
+            VALUES ($1, $2, $3, $4, $5, ST_GeomFromEWKT($6), ST_Transform(ST_GeomFromEWKT($6), 27700))
         """, batch)
 
+    print("Rebuilding per-cell monthly price aggregates...")
+    await create_cell_table(conn)
+    cells = await rebuild_cells(conn)
+    print(f"  {cells:,} cell-months")
+
     await conn.close()
     print("Price Paid ingestion complete.")
 
@@ -0,0 +1,127 @@
+"""
+Ingest open schools (with Ofsted ratings) from DfE Get Information About
+Schools (GIAS) into PostGIS.
+
+Source: https://get-information-schools.service.gov.uk/Downloads
+Download "All establishment data" (edubasealldataYYYYMMDD.csv) and place it
+in data/schools/
+
+GIAS gives locations as BNG easting/northing, stored as-is in geom_bng
+(EPSG:27700) so the nearby-schools radius query works in true metres.
+Replaces the Overpass lookup in app/services/schools.py.
+
+Usage:
+    python scripts/ingest_schools.py --csv data/schools/edubasealldata20240101.csv
+"""
+import argparse
+import asyncio
+import asyncpg
+import pandas as pd
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_URL = os.environ["DATABASE_URL"]
+
+GIAS_COLUMNS = {
+    "URN": "urn",
+    "EstablishmentName": "name",
+    "TypeOfEstablishment (name)": "establishment_type",
+    "EstablishmentTypeGroup (name)": "type_group",
+    "EstablishmentStatus (name)": "status",
+    "PhaseOfEducation (name)": "phase",
+    "OfstedRating (name)": "ofsted_rating",
+    "Postcode": "postcode",
+    "Easting": "easting",
+    "Northing": "northing",
+}
+
+# Sort order used by the API: primary first, secondary second, others last
+PRIMARY_PHASES = {"Nursery", "Primary", "Middle deemed primary"}
+SECONDARY_PHASES = {"Secondary", "Middle deemed secondary", "All-through", "16 plus"}
+
+
+def _phase(phase: str) -> tuple[str, int]:
+    if phase in PRIMARY_PHASES:
+        return "Primary", 0
+    if phase in SECONDARY_PHASES:
+        return ("Secondary" if phase != "All-through" else "All-through"), 1
+    return "", 2
+
+
+def _school_type(establishment_type: str, type_group: str, phase: str) -> str:
+    """Human-readable type, matching the labels the Overpass path produces."""
+    if type_group == "Independent schools":
+        return "Independent School"
+    if type_group == "Free Schools":
+        return "Free School"
+    if "academy" in establishment_type.lower():
+        return f"{phase} Academy" if phase else "Academy"
+    if establishment_type == "Community school":
+        return f"Community {phase}" if phase else "Community School"
+    return phase or "School"
+
+
+async def create_table(conn: asyncpg.Connection):
+    await conn.execute("""
+        DROP TABLE IF EXISTS schools;
+        CREATE TABLE schools (
+            urn INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            type TEXT NOT NULL,
+            ofsted_rating TEXT NOT NULL,
+            phase_order SMALLINT NOT NULL,
+            postcode TEXT,
+            geom GEOMETRY(Point, 4326),
+            geom_bng GEOMETRY(Point, 27700)
+        );
+    """)
+
+
+async def ingest(csv_path: str, db_url: str):
+    print(f"Loading GIAS establishments from {csv_path}...")
+    df = pd.read_csv(csv_path, usecols=list(GIAS_COLUMNS), dtype=str, encoding="latin-1")
+    df = df.rename(columns=GIAS_COLUMNS).fillna("")
+    df = df[(df["status"] == "Open") & (df["easting"] != "") & (df["northing"] != "")]
+    print(f"  {len(df):,} open establishments with a location")
+
+    records = []
+    for row in df.itertuples(index=False):
+        phase, phase_order = _phase(row.phase)
+        records.append((
+            int(row.urn),
+            row.name,
+            _school_type(row.establishment_type, row.type_group, phase),
+            row.ofsted_rating or "N/A",
+            phase_order,
+            row.postcode or None,
+            float(row.easting),
+            float(row.northing),
+        ))
+
+    conn = await asyncpg.connect(db_url)
+    # One transaction, so the API keeps reading the old table until the new one is complete
+    async with conn.transaction():
+        await create_table(conn)
+        await conn.executemany("""
+            INSERT INTO schools (urn, name, type, ofsted_rating, phase_order, postcode, geom_bng)
+            VALUES ($1, $2, $3, $4, $5, $6, ST_SetSRID(ST_MakePoint($7, $8), 27700))
+        """, records)
+
+        print("Deriving WGS84 geometry and building spatial indexes...")
+        await conn.execute("""
+            UPDATE schools SET geom = ST_Transform(geom_bng, 4326);
+            CREATE INDEX schools_geom_bng_idx ON schools USING GIST (geom_bng);
+            CREATE INDEX schools_geom_idx ON schools USING GIST (geom);
+        """)
+    await conn.execute("ANALYZE schools")
+    await conn.close()
+    print(f"Schools ingestion complete ({len(records):,} rows).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", required=True, help="Path to GIAS edubasealldata CSV")
+    args = parser.parse_args()
+    asyncio.run(ingest(args.csv, DB_URL))
@@ -0,0 +1,43 @@
+"""
+List the approval model versions in ml/registry, or make one current.
+
+Making a version current (promoting a --no-promote build, or rolling back
+to an earlier one) rewrites ml/registry/CURRENT atomically; running servers
+swap it in on their next registry poll, or at once via
+POST /api/v1/admin/model/reload.
+
+Usage:
+    python scripts/promote_model.py                     # list versions
+    python scripts/promote_model.py 20261017T020000Z    # make it current
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.services import model_registry  # noqa: E402
+
+
+def list_versions() -> None:
+    current = model_registry.current_version()
+    available = model_registry.versions()
+    if not available:
+        print(f"No versions in {model_registry.REGISTRY_DIR}")
+        return
+    print(f"  {'version':18s} {'auc':>6s} {'rows':>8s}  training data")
+    for version in available:
+        meta = model_registry.read_metadata(version)
+        marker = "*" if version == current else " "
+        print(f"{marker} {version:18s} {meta.get('auc', float('nan')):6.4f} {meta.get('training_rows', 0):8,d}  "
+              f"{meta.get('training_data_sha256', '')[:12]}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("version", nargs="?", help="version to make current")
+    args = parser.parse_args()
+    if args.version:
+        model_registry.set_current(args.version)
+        print(f"{args.version} is now current")
+    else:
+        list_versions()
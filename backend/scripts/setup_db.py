@@ -33,6 +33,8 @@ async def setup():
             decision_days INTEGER,
             application_type TEXT,
             geom GEOMETRY(Point, 4326),
+            geom_bng GEOMETRY(Point, 27700),    -- British National Grid, for metre-radius queries
+            cell_indexed BOOLEAN NOT NULL DEFAULT FALSE,  -- counted in planning_cell_months
 
             -- Pre-computed features (populated by feature engineering step)
             flood_zone INTEGER,
@@ -50,6 +52,9 @@ async def setup():
         CREATE INDEX IF NOT EXISTS planning_apps_geom_idx
             ON planning_applications USING GIST (geom);
 
+        CREATE INDEX IF NOT EXISTS planning_apps_geom_bng_idx
+            ON planning_applications USING GIST (geom_bng);
+
         CREATE INDEX IF NOT EXISTS planning_apps_decision_date_idx
             ON planning_applications (decision_date);
     """)
@@ -0,0 +1,86 @@
+"""
+Build subdivided copies of the planning constraint layers for point lookups.
+
+Green belt polygons can have tens of thousands of vertices, so every GIST
+hit on the raw layers is followed by an expensive exact containment test.
+ST_Subdivide splits each feature into pieces of at most --max-vertices
+vertices with tight bounding boxes. A point lookup then tests one small
+piece. Each piece keeps its source feature id (source_id).
+
+Flood is handled separately by build_flood_coverage.py, which also
+dissolves the overlapping bands.
+
+The ingest_*.py layer scripts call subdivide_layer() after loading; run this
+to (re)build every layer's copy for data that is already loaded.
+
+Usage:
+    python scripts/subdivide_layers.py
+    python scripts/subdivide_layers.py --max-vertices 128
+"""
+import argparse
+import asyncio
+import asyncpg
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+DB_URL = os.environ["DATABASE_URL"]
+
+DEFAULT_MAX_VERTICES = 256
+
+# source table -> (id column, extra columns carried onto each piece)
+LAYERS = {
+    "conservation_areas": ("ogc_fid", ()),
+    "greenbelt_areas": ("ogc_fid", ()),
+    "article4_zones": ("ogc_fid", ()),
+}
+
+
+async def subdivide_layer(
+    conn: asyncpg.Connection,
+    source: str,
+    id_column: str,
+    carry: tuple[str, ...] = (),
+    max_vertices: int = DEFAULT_MAX_VERTICES,
+) -> int:
+    """Replace {source}_subdivided with fresh pieces of `source`. Returns the number of pieces."""
+    target = f"{source}_subdivided"
+    extra = "".join(f", {c}" for c in carry)
+    async with conn.transaction():
+        await conn.execute(f"DROP TABLE IF EXISTS {target}")
+        # ST_MakeValid first: ST_Subdivide rejects invalid input, which ogr2ogr loads as-is
+        await conn.execute(f"""
+            CREATE TABLE {target} AS
+            SELECT
+                {id_column} AS source_id{extra},
+                ST_Subdivide(ST_CollectionExtract(ST_MakeValid(geom), 3), {int(max_vertices)})::geometry(Geometry, 4326) AS geom
+            FROM {source}
+            WHERE geom IS NOT NULL
+        """)
+        await conn.execute(f"""
+            CREATE INDEX {target}_geom_idx ON {target} USING GIST (geom);
+            CREATE INDEX {target}_source_idx ON {target} (source_id);
+        """)
+    await conn.execute(f"ANALYZE {target}")
+    pieces = await conn.fetchval(f"SELECT COUNT(*) FROM {target}")
+    print(f"{target}: {pieces:,} pieces (max {max_vertices} vertices each)")
+    return pieces
+
+
+async def run(max_vertices: int):
+    conn = await asyncpg.connect(DB_URL)
+    await conn.execute("SET statement_timeout = 0")
+    for source, (id_column, carry) in LAYERS.items():
+        if not await conn.fetchval("SELECT to_regclass($1) IS NOT NULL", source):
+            print(f"{source}: not loaded, skipping")
+            continue
+        await subdivide_layer(conn, source, id_column, carry, max_vertices)
+    await conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-vertices", type=int, default=DEFAULT_MAX_VERTICES)
+    args = parser.parse_args()
+    asyncio.run(run(args.max_vertices))
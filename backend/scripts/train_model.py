@@ -2,16 +2,27 @@
 Train the XGBoost approval prediction model.
 
 Pulls feature-engineered training data from the planning_applications table
-and saves the trained model to ml/planning_model.pkl.
+and publishes the trained model as a new version in ml/registry (see
+app/services/model_registry.py): the pickle, the native booster for the
+booster and numpy inference backends, and metadata.json with the feature
+list, ROC-AUC, a hash of the training data and the creation time.
+
+The new version becomes current, and running servers swap it in within
+ML_WATCH_INTERVAL_SECONDS. With --no-promote it is only registered;
+promote it later with scripts/promote_model.py.
 
 Usage:
     python scripts/train_model.py
+    python scripts/train_model.py --no-promote
 """
+import argparse
 import asyncio
 import asyncpg
-import joblib
+import hashlib
+import sys
 import numpy as np
 import pandas as pd
+import xgboost
 from pathlib import Path
 from xgboost import XGBClassifier
 from sklearn.model_selection import train_test_split
@@ -19,26 +30,15 @@ from sklearn.metrics import roc_auc_score
 import os
 from dotenv import load_dotenv
 
+sys.path.insert(0, str(Path(__file__).parent.parent))
+from app.services.model_registry import FEATURE_COLS, REGISTRY_DIR, write_version  # noqa: E402
+
 load_dotenv()
 
 DB_URL = os.environ["DATABASE_URL"]
-MODEL_PATH = Path(__file__).parent.parent / "ml" / "planning_model.pkl"
 
 EPC_MAP = {"A": 7, "B": 6, "C": 5, "D": 4, "E": 3, "F": 2, "G": 1}
 
-FEATURE_COLS = [
-    "flood_zone",
-    "in_conservation_area",
-    "in_greenbelt",
-    "in_article4_zone",
-    "local_approval_rate",
-    "avg_decision_time_days",
-    "similar_applications_nearby",
-    "avg_price_per_m2",
-    "price_trend_24m",
-    "epc_score",
-]
-
 
 async def fetch_training_data(db_url: str) -> pd.DataFrame:
     """
@@ -99,17 +99,32 @@ def train(df: pd.DataFrame):
     for feat, score in sorted(importance.items(), key=lambda x: -x[1]):
         print(f"  {feat:40s} {score:.4f}")
 
-    return model
+    return model, float(auc)
+
+
+def training_data_hash(df: pd.DataFrame) -> str:
+    """SHA-256 of the feature and target values, independent of row order."""
+    row_hashes = pd.util.hash_pandas_object(df[FEATURE_COLS + ["approved"]], index=False).values
+    return hashlib.sha256(np.sort(row_hashes).tobytes()).hexdigest()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--no-promote", action="store_true", help="register the version without making it current")
+    args = parser.parse_args()
+
     print("Fetching training data...")
     df = asyncio.run(fetch_training_data(DB_URL))
     print(f"Loaded {len(df):,} records. Class balance: {df['approved'].mean():.2%} approved")
 
     print("\nTraining XGBoost model...")
-    model = train(df)
-
-    MODEL_PATH.parent.mkdir(exist_ok=True)
-    joblib.dump(model, MODEL_PATH)
-    print(f"\nModel saved to {MODEL_PATH}")
+    model, auc = train(df)
+
+    version = write_version(model, {
+        "features": FEATURE_COLS,
+        "auc": round(auc, 4),
+        "training_rows": len(df),
+        "training_data_sha256": training_data_hash(df),
+        "xgboost_version": xgboost.__version__,
+    }, promote=not args.no_promote)
+    print(f"\nModel saved to {REGISTRY_DIR / version}" + ("" if args.no_promote else " (now current)"))
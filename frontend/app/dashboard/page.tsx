@@ -5,7 +5,7 @@ import { useRouter, useSearchParams } from 'next/navigation'
 import dynamic from 'next/dynamic'
 import { motion, AnimatePresence } from 'framer-motion'
 import { supabase } from '@/lib/supabase'
-import { analyzePostcode, fetchReport } from '@/lib/api'
+import { analyzePostcode, streamAnalysis, fetchReport } from '@/lib/api'
 import { exportToCSV } from '@/lib/csv'
 import { AnalyzeResponse, ReportResponse, ProjectParams, ManualOverrides } from '@/lib/types'
 import { Sidebar, Tab, HistoryEntry, TABS } from '@/components/Sidebar'
@@ -60,6 +60,22 @@ function SectionHeader({ title, subtitle }: { title: string; subtitle?: string }
   )
 }
 
+// Opt-in: render each section as /analyze/stream delivers it instead of waiting for the whole result
+const STREAM_ANALYSIS = process.env.NEXT_PUBLIC_STREAM_ANALYSIS === 'true'
+
+// What the tabs render: a complete result, or a streamed one from its first (location) chunk on
+type ShownAnalysis = Partial<AnalyzeResponse> & Pick<AnalyzeResponse, 'postcode' | 'project_params' | 'location'>
+
+const PENDING = '…'
+
+const DEGRADED_LABELS: Record<string, string> = {
+  constraints: 'Planning constraints',
+  planning: 'Planning history',
+  market: 'Sales data',
+  epc: 'EPC ratings',
+  schools: 'Nearby schools',
+}
+
 // ── Stat card helper ──────────────────────────────────────────────────────────
 function StatCard({
   label, value, sub, color = 'text-swiss-black', icon: Icon,
@@ -85,7 +101,7 @@ function StatCard({
 function OverviewTab({
   data, reportData, reportLoading, loading,
 }: {
-  data: AnalyzeResponse | null
+  data: ShownAnalysis | null
   reportData: ReportResponse | null
   reportLoading: boolean
   loading: boolean
@@ -106,38 +122,54 @@ function OverviewTab({
 
   if (!data) return <EmptyState />
 
-  const approvalPct = data.ml_prediction.approval_probability * 100
-  const trendPct = data.market_metrics.price_trend_24m * 100
+  // Streamed results fill in section by section; the prediction chunk arrives last
+  const scored = data.ml_prediction !== undefined
+  const approvalPct = data.ml_prediction ? data.ml_prediction.approval_probability * 100 : null
+  const viability = data.viability_score ?? null
+  const market = data.market_metrics
+  const trendPct = market ? market.price_trend_24m * 100 : 0
+  const degraded = data.degraded_sections ?? []
 
   return (
     <motion.div initial={{ opacity: 0 }} animate={{ opacity: 1 }} className="space-y-6 sm:space-y-8">
+      {degraded.length > 0 && (
+        <div className="border-4 border-amber-500 bg-amber-50 dark:bg-amber-500/10 p-4 flex items-start gap-3">
+          <AlertCircle className="w-5 h-5 text-amber-600 flex-shrink-0 mt-0.5" />
+          <p className="text-sm">
+            <span className="font-black uppercase tracking-wider">Partial data.</span>{' '}
+            {degraded.map(s => DEGRADED_LABELS[s]).join(', ')} could not be loaded and {degraded.length === 1 ? 'is' : 'are'} shown as placeholders.
+            {scored && approvalPct === null && ' Approval probability and viability need this data, so they are not scored. Try again shortly or enter the values manually.'}
+          </p>
+        </div>
+      )}
+
       {/* KPI strip */}
       <div className="grid grid-cols-2 lg:grid-cols-4 gap-3 sm:gap-4">
         <StatCard
           icon={Percent}
           label="Approval Probability"
-          value={`${approvalPct.toFixed(1)}%`}
-          color={approvalPct >= 70 ? 'text-green-600' : approvalPct >= 45 ? 'text-amber-600' : 'text-red-600'}
-          sub="ML prediction"
+          value={!scored ? PENDING : approvalPct === null ? '—' : `${approvalPct.toFixed(1)}%`}
+          color={approvalPct === null ? 'opacity-40' : approvalPct >= 70 ? 'text-green-600' : approvalPct >= 45 ? 'text-amber-600' : 'text-red-600'}
+          sub={!scored ? 'Calculating' : approvalPct === null ? 'Unavailable' : 'ML prediction'}
         />
         <StatCard
           icon={BarChart2}
           label="Viability Score"
-          value={`${data.viability_score.toFixed(0)}/100`}
-          color={data.viability_score >= 70 ? 'text-green-600' : data.viability_score >= 40 ? 'text-amber-600' : 'text-red-600'}
-          sub="Overall rating"
+          value={!scored ? PENDING : viability === null ? '—' : `${viability.toFixed(0)}/100`}
+          color={viability === null ? 'opacity-40' : viability >= 70 ? 'text-green-600' : viability >= 40 ? 'text-amber-600' : 'text-red-600'}
+          sub={!scored ? 'Calculating' : viability === null ? 'Unavailable' : 'Overall rating'}
         />
         <StatCard
           icon={PoundSterling}
           label="Avg Price / m²"
-          value={`£${data.market_metrics.avg_price_per_m2.toLocaleString('en-GB')}`}
-          sub={`${trendPct >= 0 ? '▲' : '▼'} ${Math.abs(trendPct).toFixed(1)}% (24m)`}
+          value={market ? `£${market.avg_price_per_m2.toLocaleString('en-GB')}` : PENDING}
+          sub={market ? `${trendPct >= 0 ? '▲' : '▼'} ${Math.abs(trendPct).toFixed(1)}% (24m)` : undefined}
           color={trendPct >= 0 ? 'text-swiss-black' : 'text-red-600'}
         />
         <StatCard
           icon={Zap}
           label="Avg EPC Rating"
-          value={data.market_metrics.avg_epc_rating}
+          value={market ? market.avg_epc_rating : PENDING}
           sub={data.location.district}
         />
       </div>
@@ -147,8 +179,21 @@ function OverviewTab({
         <SectionHeader title="Location & Scores" subtitle="Geocoded location with ML approval prediction and viability rating" />
         <div className="grid lg:grid-cols-3 gap-6">
           <PlanningMap location={data.location} postcode={data.postcode} />
-          <ApprovalProbability probability={data.ml_prediction.approval_probability} />
-          <ViabilityScore score={data.viability_score} breakdown={data.viability_breakdown} />
+          {!scored ? (
+            <>
+              <SkeletonGauge />
+              <SkeletonGauge />
+            </>
+          ) : data.ml_prediction && viability !== null && data.viability_breakdown ? (
+            <>
+              <ApprovalProbability probability={data.ml_prediction.approval_probability} />
+              <ViabilityScore score={viability} breakdown={data.viability_breakdown} />
+            </>
+          ) : (
+            <div className="swiss-card lg:col-span-2 flex items-center justify-center text-center py-8 opacity-40">
+              <p className="text-sm uppercase tracking-wider">Scores unavailable — location data incomplete</p>
+            </div>
+          )}
         </div>
       </div>
 
@@ -173,7 +218,7 @@ function OverviewTab({
   )
 }
 
-function PlanningTab({ data, loading }: { data: AnalyzeResponse | null; loading: boolean }) {
+function PlanningTab({ data, loading }: { data: ShownAnalysis | null; loading: boolean }) {
   if (loading && !data) return <div className="space-y-6"><SkeletonCard /><SkeletonCard /></div>
   if (!data) return <EmptyState />
 
@@ -181,19 +226,19 @@ function PlanningTab({ data, loading }: { data: AnalyzeResponse | null; loading:
     <motion.div initial={{ opacity: 0 }} animate={{ opacity: 1 }} className="space-y-6 sm:space-y-10">
       <div>
         <SectionHeader title="Regulatory Constraints" subtitle="Planning designations that affect permitted development and application requirements" />
-        <ConstraintsPanel constraints={data.constraints} />
+        {data.constraints ? <ConstraintsPanel constraints={data.constraints} /> : <SkeletonCard />}
       </div>
       <div>
         <SectionHeader title="Local Application Data" subtitle="Historical planning decisions within 500m radius over the past 5 years" />
-        <PlanningMetrics metrics={data.planning_metrics} />
+        {data.planning_metrics ? <PlanningMetrics metrics={data.planning_metrics} /> : <SkeletonCard />}
       </div>
     </motion.div>
   )
 }
 
-function MarketTab({ data, loading }: { data: AnalyzeResponse | null; loading: boolean }) {
-  if (loading && !data) return <div className="space-y-6"><SkeletonCard /><SkeletonCard /></div>
-  if (!data) return <EmptyState />
+function MarketTab({ data, loading }: { data: ShownAnalysis | null; loading: boolean }) {
+  if (loading && !data?.market_metrics) return <div className="space-y-6"><SkeletonCard /><SkeletonCard /></div>
+  if (!data?.market_metrics) return <EmptyState />
 
   return (
     <motion.div initial={{ opacity: 0 }} animate={{ opacity: 1 }} className="space-y-6 sm:space-y-10">
@@ -209,10 +254,12 @@ function MarketTab({ data, loading }: { data: AnalyzeResponse | null; loading: b
   )
 }
 
-function SustainabilityTab({ data, loading }: { data: AnalyzeResponse | null; loading: boolean }) {
+function SustainabilityTab({ data, loading }: { data: ShownAnalysis | null; loading: boolean }) {
   if (loading && !data) return <SkeletonCard />
   if (!data) return <EmptyState />
 
+  const epc = data.market_metrics?.avg_epc_rating
+
   return (
     <motion.div initial={{ opacity: 0 }} animate={{ opacity: 1 }} className="space-y-6 sm:space-y-10">
       <div>
@@ -223,38 +270,42 @@ function SustainabilityTab({ data, loading }: { data: AnalyzeResponse | null; lo
       </div>
       <div>
         <SectionHeader title="Energy Performance" subtitle="Average EPC rating for residential properties in this postcode" />
-        <div className="bg-white dark:bg-[#111] border-4 border-black dark:border-white/15 p-4 sm:p-8 max-w-2xl">
-          <div className="flex flex-col sm:flex-row sm:items-center gap-4 sm:gap-6">
-            <div className="text-center flex-shrink-0">
-              <p className="text-4xl sm:text-6xl font-black">{data.market_metrics.avg_epc_rating}</p>
-              <p className="text-xs uppercase tracking-widest opacity-50 mt-1">Avg EPC</p>
-            </div>
-            <div className="flex-1">
-              <div className="flex gap-1 h-5 mb-2">
-                {['A','B','C','D','E','F','G'].map(r => {
-                  const colors: Record<string,string> = {
-                    A:'bg-green-700', B:'bg-green-500', C:'bg-lime-500', D:'bg-amber-400', E:'bg-amber-600', F:'bg-red-500', G:'bg-red-700'
-                  }
-                  return (
-                    <div key={r} className={`flex-1 border border-black/20 dark:border-white/10 ${colors[r]} ${r === data.market_metrics.avg_epc_rating ? 'opacity-100 ring-2 ring-black dark:ring-white' : 'opacity-25'}`} />
-                  )
-                })}
+        {epc === undefined ? (
+          <div className="max-w-2xl"><SkeletonCard /></div>
+        ) : (
+          <div className="bg-white dark:bg-[#111] border-4 border-black dark:border-white/15 p-4 sm:p-8 max-w-2xl">
+            <div className="flex flex-col sm:flex-row sm:items-center gap-4 sm:gap-6">
+              <div className="text-center flex-shrink-0">
+                <p className="text-4xl sm:text-6xl font-black">{epc}</p>
+                <p className="text-xs uppercase tracking-widest opacity-50 mt-1">Avg EPC</p>
+              </div>
+              <div className="flex-1">
+                <div className="flex gap-1 h-5 mb-2">
+                  {['A','B','C','D','E','F','G'].map(r => {
+                    const colors: Record<string,string> = {
+                      A:'bg-green-700', B:'bg-green-500', C:'bg-lime-500', D:'bg-amber-400', E:'bg-amber-600', F:'bg-red-500', G:'bg-red-700'
+                    }
+                    return (
+                      <div key={r} className={`flex-1 border border-black/20 dark:border-white/10 ${colors[r]} ${r === epc ? 'opacity-100 ring-2 ring-black dark:ring-white' : 'opacity-25'}`} />
+                    )
+                  })}
+                </div>
+                <div className="flex justify-between text-xs opacity-30"><span>A — Best</span><span>G — Worst</span></div>
+                <p className="text-sm opacity-60 mt-3">
+                  Properties rated C or below may require improvement under upcoming MEES regulations (2028). This affects landlords and development valuations.
+                </p>
               </div>
-              <div className="flex justify-between text-xs opacity-30"><span>A — Best</span><span>G — Worst</span></div>
-              <p className="text-sm opacity-60 mt-3">
-                Properties rated C or below may require improvement under upcoming MEES regulations (2028). This affects landlords and development valuations.
-              </p>
             </div>
           </div>
-        </div>
+        )}
       </div>
     </motion.div>
   )
 }
 
-function CommunityTab({ data, loading }: { data: AnalyzeResponse | null; loading: boolean }) {
-  if (loading && !data) return <SkeletonCard />
-  if (!data) return <EmptyState />
+function CommunityTab({ data, loading }: { data: ShownAnalysis | null; loading: boolean }) {
+  if (loading && !data?.nearby_schools) return <SkeletonCard />
+  if (!data?.nearby_schools) return <EmptyState />
 
   return (
     <motion.div initial={{ opacity: 0 }} animate={{ opacity: 1 }} className="space-y-6 sm:space-y-10">
@@ -286,6 +337,8 @@ function DashboardContent() {
   const [token, setToken] = useState<string | null>(null)
   const [loading, setLoading] = useState(false)
   const [analyzeData, setAnalyzeData] = useState<AnalyzeResponse | null>(null)
+  // Sections received so far while a streamed analysis is in progress
+  const [partialData, setPartialData] = useState<Partial<AnalyzeResponse> | null>(null)
   const [reportData, setReportData] = useState<ReportResponse | null>(null)
   const [reportLoading, setReportLoading] = useState(false)
   const [error, setError] = useState<string | null>(null)
@@ -367,16 +420,26 @@ function DashboardContent() {
     setReportLoading(true)
     setError(null)
     setAnalyzeData(null)
+    setPartialData(null)
     setReportData(null)
     setActiveTab('overview')
     setSidebarOpen(false)
     setShowForm(false)
 
     try {
-      const result: AnalyzeResponse = await analyzePostcode(postcode, activeToken, params, overrides)
+      const result: AnalyzeResponse = STREAM_ANALYSIS
+        ? await streamAnalysis(postcode, activeToken, partial => setPartialData(partial), params, overrides)
+        : await analyzePostcode(postcode, activeToken, params, overrides)
       setAnalyzeData(result)
+      setPartialData(null)
       setLoading(false)
 
+      // Unscored (degraded) results have nothing to keep in history or report on
+      if (result.ml_prediction === null || result.viability_score === null) {
+        setReportLoading(false)
+        return
+      }
+
       // Persist to history
       const entry: HistoryEntry = {
         postcode: result.postcode,
@@ -387,7 +450,7 @@ function DashboardContent() {
       setSearchHistory(pushHistory(entry))
 
       try {
-        const report = await fetchReport(postcode, activeToken)
+        const report = await fetchReport(postcode, activeToken, params, overrides)
         setReportData(report)
       } catch (e) {
         console.error('Report failed:', e)
@@ -396,6 +459,7 @@ function DashboardContent() {
       }
     } catch (err: any) {
       setError(err.message || 'Analysis failed')
+      setPartialData(null)
       setLoading(false)
       setReportLoading(false)
     }
@@ -404,6 +468,10 @@ function DashboardContent() {
   // Keep ref in sync so the URL-param effect can call handleAnalyze
   useEffect(() => { handleAnalyzeRef.current = handleAnalyze }, [handleAnalyze])
 
+  // Tabs render streamed sections as soon as the location has arrived
+  const shownData: ShownAnalysis | null = analyzeData
+    ?? (partialData?.location ? partialData as ShownAnalysis : null)
+
   const handleSignOut = async () => {
     await supabase.auth.signOut()
     document.documentElement.classList.remove('dark')
@@ -502,14 +570,14 @@ function DashboardContent() {
 
           {/* Breadcrumb */}
           <div className="flex-1 min-w-0">
-            {analyzeData ? (
+            {shownData ? (
               <div className="flex items-center gap-3 flex-wrap">
                 <div className="flex items-center gap-2">
                   <MapPin className="w-4 h-4 text-swiss-accent flex-shrink-0" />
-                  <span className="text-2xl font-black tracking-tighter">{analyzeData.postcode}</span>
+                  <span className="text-2xl font-black tracking-tighter">{shownData.postcode}</span>
                 </div>
                 <span className="text-black/20 dark:text-white/20 font-black hidden sm:block">·</span>
-                <span className="text-sm font-bold opacity-50 hidden sm:block">{analyzeData.location.district}</span>
+                <span className="text-sm font-bold opacity-50 hidden sm:block">{shownData.location.district}</span>
                 <span className="text-black/20 dark:text-white/20 font-black hidden sm:block">·</span>
                 <span className="text-sm uppercase tracking-wider font-bold opacity-40 hidden sm:block">{activeTabMeta.label}</span>
               </div>
@@ -653,7 +721,7 @@ function DashboardContent() {
             )}
 
             {/* Loading state for share URL auto-analyze */}
-            {loading && !analyzeData && !showForm && !showComparison && (
+            {loading && !shownData && !showForm && !showComparison && (
               <div className="flex flex-col items-center justify-center py-32 text-center">
                 <div className="w-12 h-12 border-4 border-black/20 dark:border-white/20 border-t-swiss-accent animate-spin rounded-full mb-6" />
                 <p className="text-xl font-black uppercase tracking-tighter opacity-60">Analyzing…</p>
@@ -679,7 +747,7 @@ function DashboardContent() {
             )}
 
             {/* Show results when data is loaded and form is hidden */}
-            {analyzeData && !showForm && !showComparison && (
+            {shownData && !showForm && !showComparison && (
               <AnimatePresence mode="wait">
                 <motion.div
                   key={activeTab}
@@ -689,26 +757,26 @@ function DashboardContent() {
                   transition={{ duration: 0.2 }}
                 >
                   {activeTab === 'overview' && (
-                    <OverviewTab data={analyzeData} reportData={reportData} reportLoading={reportLoading} loading={loading} />
+                    <OverviewTab data={shownData} reportData={reportData} reportLoading={reportLoading} loading={loading} />
                   )}
                   {activeTab === 'planning' && (
-                    <PlanningTab data={analyzeData} loading={loading} />
+                    <PlanningTab data={shownData} loading={loading} />
                   )}
                   {activeTab === 'market' && (
-                    <MarketTab data={analyzeData} loading={loading} />
+                    <MarketTab data={shownData} loading={loading} />
                   )}
                   {activeTab === 'sustainability' && (
-                    <SustainabilityTab data={analyzeData} loading={loading} />
+                    <SustainabilityTab data={shownData} loading={loading} />
                   )}
                   {activeTab === 'community' && (
-                    <CommunityTab data={analyzeData} loading={loading} />
+                    <CommunityTab data={shownData} loading={loading} />
                   )}
                 </motion.div>
               </AnimatePresence>
             )}
 
             {/* Empty state only when no data and not showing form (shouldn't happen but fallback) */}
-            {!analyzeData && !showForm && !showComparison && !loading && <EmptyState />}
+            {!shownData && !showForm && !showComparison && !loading && <EmptyState />}
           </div>
         </main>
       </div>
@@ -129,11 +129,11 @@ export function ComparisonMode({ token, initialData }: ComparisonModeProps) {
                 <div className="flex gap-3 mt-2">
                   <div>
                     <p className="text-[10px] uppercase tracking-widest opacity-40">Approval</p>
-                    <p className="text-lg font-black">{(slot.data.ml_prediction.approval_probability * 100).toFixed(0)}%</p>
+                    <p className="text-lg font-black">{slot.data.ml_prediction ? `${(slot.data.ml_prediction.approval_probability * 100).toFixed(0)}%` : '—'}</p>
                   </div>
                   <div>
                     <p className="text-[10px] uppercase tracking-widest opacity-40">Viability</p>
-                    <p className="text-lg font-black">{slot.data.viability_score.toFixed(0)}/100</p>
+                    <p className="text-lg font-black">{slot.data.viability_score !== null ? `${slot.data.viability_score.toFixed(0)}/100` : '—'}</p>
                   </div>
                 </div>
               </div>
@@ -200,7 +200,7 @@ export function ComparisonMode({ token, initialData }: ComparisonModeProps) {
 
             <MetricRow
               label="Approval"
-              values={filledSlots.map(s => s.data!.ml_prediction.approval_probability)}
+              values={filledSlots.map(s => s.data!.ml_prediction?.approval_probability ?? null)}
               format={(v: number) => `${(v * 100).toFixed(1)}%`}
               colorFn={(v: number) => v >= 0.7 ? 'text-green-600' : v >= 0.45 ? 'text-amber-600' : 'text-red-600'}
             />
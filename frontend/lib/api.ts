@@ -1,4 +1,4 @@
-import type { ProjectParams, ManualOverrides, DocumentExtraction } from './types'
+import type { ProjectParams, ManualOverrides, DocumentExtraction, AnalyzeChunk, AnalyzeResponse } from './types'
 
 const BASE = process.env.NEXT_PUBLIC_BACKEND_URL || 'http://localhost:8000'
 
@@ -20,12 +20,7 @@ async function apiFetch(path: string, token: string) {
   return res.json()
 }
 
-export const analyzePostcode = (
-  postcode: string,
-  token: string,
-  params?: ProjectParams,
-  overrides?: ManualOverrides,
-) => {
+function analysisQuery(postcode: string, params?: ProjectParams, overrides?: ManualOverrides) {
   const query = new URLSearchParams({
     postcode,
     ...(params?.application_type && { application_type: params.application_type }),
@@ -48,11 +43,67 @@ export const analyzePostcode = (
     if (overrides.avg_epc_rating != null) query.set('manual_epc', overrides.avg_epc_rating)
   }
 
-  return apiFetch(`/api/v1/analyze?${query.toString()}`, token)
+  return query
 }
 
-export const fetchReport = (postcode: string, token: string) =>
-  apiFetch(`/api/v1/report?postcode=${encodeURIComponent(postcode)}`, token)
+export const analyzePostcode = (
+  postcode: string,
+  token: string,
+  params?: ProjectParams,
+  overrides?: ManualOverrides,
+) => apiFetch(`/api/v1/analyze?${analysisQuery(postcode, params, overrides).toString()}`, token)
+
+// Streaming /analyze: calls onChunk with the merged partial result as each
+// section arrives, and resolves with the complete response.
+export async function streamAnalysis(
+  postcode: string,
+  token: string,
+  onChunk: (partial: Partial<AnalyzeResponse>, chunk: AnalyzeChunk) => void,
+  params?: ProjectParams,
+  overrides?: ManualOverrides,
+): Promise<AnalyzeResponse> {
+  const res = await fetch(`${BASE}/api/v1/analyze/stream?${analysisQuery(postcode, params, overrides).toString()}`, {
+    headers: { Authorization: `Bearer ${token}` },
+  })
+  if (!res.ok || !res.body) {
+    let message = `Request failed (${res.status})`
+    try {
+      const body = await res.json()
+      if (body.detail) message = body.detail
+    } catch {
+      message = res.statusText || message
+    }
+    throw new Error(message)
+  }
+
+  const reader = res.body.getReader()
+  const decoder = new TextDecoder()
+  let partial: Partial<AnalyzeResponse> = {}
+  let buffered = ''
+  for (;;) {
+    const { done, value } = await reader.read()
+    buffered += decoder.decode(value, { stream: !done })
+    const lines = buffered.split('\n')
+    buffered = lines.pop() ?? ''
+    for (const line of lines) {
+      if (!line.trim()) continue
+      const chunk: AnalyzeChunk = JSON.parse(line)
+      if (chunk.section === 'error') throw new Error(chunk.data.detail || 'Analysis failed')
+      partial = { ...partial, ...chunk.data }
+      onChunk(partial, chunk)
+    }
+    if (done) break
+  }
+  return partial as AnalyzeResponse
+}
+
+// Same params as /analyze so the report is generated for the analysed project
+export const fetchReport = (
+  postcode: string,
+  token: string,
+  params?: ProjectParams,
+  overrides?: ManualOverrides,
+) => apiFetch(`/api/v1/report?${analysisQuery(postcode, params, overrides).toString()}`, token)
 
 export const checkHealth = () =>
   fetch(`${BASE}/api/v1/health`).then(r => r.json())
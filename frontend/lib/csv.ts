@@ -30,18 +30,23 @@ export function exportToCSV(data: AnalyzeResponse) {
 
   // ML Prediction
   rows.push(['--- ML PREDICTION ---'])
-  rows.push(['Approval Probability', `${(data.ml_prediction.approval_probability * 100).toFixed(1)}%`])
-  rows.push(['Viability Score', `${data.viability_score.toFixed(0)}/100`])
+  rows.push(['Approval Probability', data.ml_prediction ? `${(data.ml_prediction.approval_probability * 100).toFixed(1)}%` : 'Unavailable'])
+  rows.push(['Viability Score', data.viability_score !== null ? `${data.viability_score.toFixed(0)}/100` : 'Unavailable'])
+  if (data.degraded_sections?.length) {
+    rows.push(['Unavailable Data', data.degraded_sections.join('; ')])
+  }
   rows.push([])
 
   // Viability Breakdown
-  rows.push(['--- VIABILITY BREAKDOWN ---'])
-  rows.push(['Base Score', String(data.viability_breakdown.base_score)])
-  rows.push(['Constraint Penalty', String(data.viability_breakdown.constraint_penalty)])
-  rows.push(['Flood Penalty', String(data.viability_breakdown.flood_penalty)])
-  rows.push(['Market Strength Bonus', String(data.viability_breakdown.market_strength_bonus)])
-  rows.push(['Project Complexity Penalty', String(data.viability_breakdown.project_complexity_penalty)])
-  rows.push([])
+  if (data.viability_breakdown) {
+    rows.push(['--- VIABILITY BREAKDOWN ---'])
+    rows.push(['Base Score', String(data.viability_breakdown.base_score)])
+    rows.push(['Constraint Penalty', String(data.viability_breakdown.constraint_penalty)])
+    rows.push(['Flood Penalty', String(data.viability_breakdown.flood_penalty)])
+    rows.push(['Market Strength Bonus', String(data.viability_breakdown.market_strength_bonus)])
+    rows.push(['Project Complexity Penalty', String(data.viability_breakdown.project_complexity_penalty)])
+    rows.push([])
+  }
 
   // Constraints
   rows.push(['--- CONSTRAINTS ---'])
@@ -59,23 +59,32 @@ export interface AnalyzeResponse {
       sale_date: string
     }>
   }
+  // null when a section the model needs is degraded and not overridden
   ml_prediction: {
     approval_probability: number
-  }
-  viability_score: number
+  } | null
+  viability_score: number | null
   viability_breakdown: {
     base_score: number
     constraint_penalty: number
     flood_penalty: number
     market_strength_bonus: number
     project_complexity_penalty: number
-  }
+  } | null
   nearby_schools: Array<{
     name: string
     type: string
     ofsted_rating: string
     distance_m: number
   }>
+  // Sections filled with placeholders because their data source was slow or down
+  degraded_sections?: Array<'constraints' | 'planning' | 'market' | 'epc' | 'schools'>
+}
+
+// One line of /analyze/stream: `data` is a slice of AnalyzeResponse
+export interface AnalyzeChunk {
+  section: 'location' | 'constraints' | 'planning' | 'market' | 'schools' | 'prediction' | 'error'
+  data: Partial<AnalyzeResponse> & { detail?: string }
 }
 
 export interface ReportResponse {